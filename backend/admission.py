@@ -0,0 +1,292 @@
+import asyncio
+import json
+import math
+import os
+import time
+
+# Admission control for the API. Every request is put in a priority class:
+#   interactive  dashboard reads and streams, never queued
+#   normal       other API calls
+#   heavy        commands that do real work (per command, see
+#                CommandRegistry.is_heavy), scan triggers, log maintenance:
+#                limited concurrency, bounded wait queue. A slot is held until the
+#                handler starts its response; streaming routes (SSE command
+#                output, exports) are bounded by their own command slots and
+#                job/DB queues instead, so they never starve the others.
+# Token buckets (one global, one per client address) shed lower classes
+# first: a class may only take a global token while the bucket holds more
+# than its reserve, so when the sensor is busy heavy work is refused
+# before dashboard polling is. Refusals are 429 with Retry-After.
+#
+#   NETGUARDIAN_RATE_GLOBAL       requests/s for all clients, default 100
+#   NETGUARDIAN_RATE_CLIENT       requests/s per client address, default 20
+#   NETGUARDIAN_HEAVY_CONCURRENCY heavy requests running at once, default 4
+#   NETGUARDIAN_HEAVY_QUEUE       heavy requests waiting for a slot, default 16
+
+CLASSES = ("interactive", "normal", "heavy")
+# Share of the global burst that must remain before a class may take a token
+RESERVE = {"interactive": 0.0, "normal": 0.2, "heavy": 0.5}
+HEAVY_WAIT = 10.0        # seconds a heavy request may wait for a slot
+MAX_CLIENTS = 10000      # per-client buckets kept before idle ones are dropped
+
+INTERACTIVE_PREFIXES = ("/api/devices", "/api/health", "/api/network", "/api/inventory",
+                        "/api/scan/stream", "/api/scan/schedule", "/api/jobs", "/api/bettercap/data",
+                        "/api/honeypot/stats", "/api/passive/stats", "/api/admission")
+HEAVY_ROUTES = (("POST", "/api/scan"), ("POST", "/api/logs/maintenance"))
+# Classified by the command in its JSON body
+COMMAND_ROUTE = ("POST", "/api/execute")
+MAX_COMMAND_BODY = 65536
+EXEMPT = ("/api/admission",)
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.stamp = time.monotonic()
+
+    def _fill(self):
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.stamp) * self.rate)
+        self.stamp = now
+
+    def take(self, reserve=0.0):
+        """Take one token if more than `reserve` tokens would be left. Returns seconds to wait (0 = taken)."""
+        self._fill()
+        if self.tokens - 1 >= reserve:
+            self.tokens -= 1
+            return 0.0
+        return (reserve + 1 - self.tokens) / self.rate if self.rate else 60.0
+
+    def refund(self):
+        """Give back a token taken for a request that was refused further on."""
+        self.tokens = min(self.burst, self.tokens + 1)
+
+
+class HeavyGate:
+    """Concurrency limit with a bounded queue, for the heavy class."""
+
+    def __init__(self, slots, max_queue, wait=HEAVY_WAIT):
+        self.slots = slots
+        self.max_queue = max_queue
+        self.wait = wait
+        self.active = 0
+        self.waiting = 0
+        self.max_seen = 0
+        self.sem = None
+
+    async def acquire(self):
+        if self.sem is None:
+            self.sem = asyncio.Semaphore(self.slots)
+        if self.sem.locked() and self.waiting >= self.max_queue:
+            return False
+        self.waiting += 1
+        self.max_seen = max(self.max_seen, self.waiting)
+        try:
+            await asyncio.wait_for(self.sem.acquire(), self.wait)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.waiting -= 1
+        self.active += 1
+        return True
+
+    def release(self):
+        self.active -= 1
+        self.sem.release()
+
+
+class AdmissionController:
+    def __init__(self, global_rate=100, client_rate=20, heavy_slots=4, heavy_queue=16):
+        self.global_bucket = TokenBucket(global_rate, global_rate * 2)
+        self.client_rate = client_rate
+        self.clients = {}
+        self.heavy = HeavyGate(heavy_slots, heavy_queue)
+        self.metrics = {c: {"admitted": 0, "rejected_client": 0, "rejected_global": 0,
+                            "rejected_queue": 0} for c in CLASSES}
+
+    @classmethod
+    def from_env(cls):
+        return cls(global_rate=_env_float("NETGUARDIAN_RATE_GLOBAL", 100),
+                   client_rate=_env_float("NETGUARDIAN_RATE_CLIENT", 20),
+                   heavy_slots=int(_env_float("NETGUARDIAN_HEAVY_CONCURRENCY", 4)),
+                   heavy_queue=int(_env_float("NETGUARDIAN_HEAVY_QUEUE", 16)))
+
+    def classify(self, method, path, body=None):
+        """`body` is the decoded JSON of a command request, None when it could not be read."""
+        if (method, path) == COMMAND_ROUTE:
+            return "heavy" if _command_is_heavy(body) else "normal"
+        for m, prefix in HEAVY_ROUTES:
+            if method == m and (path == prefix or (prefix.endswith("/") and path.startswith(prefix))):
+                return "heavy"
+        if not path.startswith("/api/") or (method == "GET" and path.startswith(INTERACTIVE_PREFIXES)):
+            return "interactive"
+        return "normal"
+
+    def _client_bucket(self, client):
+        bucket = self.clients.get(client)
+        if bucket is None:
+            if len(self.clients) >= MAX_CLIENTS:
+                # Drop buckets that have refilled completely, they carry no state
+                now = time.monotonic()
+                for key in [k for k, b in self.clients.items()
+                            if b.tokens + (now - b.stamp) * b.rate >= b.burst]:
+                    del self.clients[key]
+            bucket = self.clients[client] = TokenBucket(self.client_rate, self.client_rate * 2)
+        return bucket
+
+    async def admit(self, client, method, path, body=None):
+        """
+        Returns (priority class, None) when admitted, or (class, (reason,
+        retry_after)) when not. Admitted heavy requests must call release().
+        """
+        cls = self.classify(method, path, body)
+        metrics = self.metrics[cls]
+
+        bucket = self._client_bucket(client)
+        wait = bucket.take()
+        if wait:
+            metrics["rejected_client"] += 1
+            return cls, ("client rate limit", wait)
+        wait = self.global_bucket.take(RESERVE[cls] * self.global_bucket.burst)
+        if wait:
+            # Not the client's fault, it keeps its token
+            bucket.refund()
+            metrics["rejected_global"] += 1
+            return cls, ("server busy", wait)
+        if cls == "heavy" and not await self.heavy.acquire():
+            metrics["rejected_queue"] += 1
+            return cls, ("heavy request queue full", HEAVY_WAIT)
+        metrics["admitted"] += 1
+        return cls, None
+
+    def release(self, cls):
+        if cls == "heavy":
+            self.heavy.release()
+
+    def retry_after(self, seconds):
+        return str(max(1, math.ceil(seconds)))
+
+    def stats(self):
+        return {
+            "global": {"rate": self.global_bucket.rate, "burst": self.global_bucket.burst,
+                       "tokens": round(self.global_bucket.tokens, 2)},
+            "client_rate": self.client_rate,
+            "clients": len(self.clients),
+            "heavy": {"slots": self.heavy.slots, "active": self.heavy.active,
+                      "queue_depth": self.heavy.waiting, "max_queue": self.heavy.max_queue,
+                      "max_queue_seen": self.heavy.max_seen},
+            "classes": {c: dict(m) for c, m in self.metrics.items()}
+        }
+
+
+def _command_is_heavy(body):
+    if body is None:
+        return True     # unread (too large, or no body given): assume the worst
+    if not isinstance(body, dict):
+        return False    # rejected by validation without running anything
+    if body.get("background"):
+        return False    # only queued here, the job queue bounds it
+    args = body.get("args") or []
+    if not isinstance(args, list):
+        return False
+    from backend.commands import registry
+    return registry.is_heavy(str(body.get("command", "")).lower(), [str(a) for a in args])
+
+
+async def _read_body(receive):
+    """
+    Read a request body of up to MAX_COMMAND_BODY bytes. Returns (decoded
+    JSON, messages read) so the messages can be replayed; the JSON is None
+    when the body was too large or the client left, {} when it is not JSON.
+    """
+    messages, size = [], 0
+    while True:
+        message = await receive()
+        messages.append(message)
+        if message["type"] != "http.request":
+            return None, messages
+        size += len(message.get("body", b""))
+        if size > MAX_COMMAND_BODY:
+            return None, messages
+        if not message.get("more_body"):
+            break
+    try:
+        return json.loads(b"".join(m.get("body", b"") for m in messages)), messages
+    except ValueError:
+        return {}, messages
+
+
+def _replay(messages, receive):
+    messages = list(messages)
+
+    async def replayed():
+        return messages.pop(0) if messages else await receive()
+    return replayed
+
+
+class AdmissionMiddleware:
+    """
+    Pure ASGI, so the endpoint runs in the request's own task and streaming
+    responses still see client disconnects (BaseHTTPMiddleware hides them).
+    """
+
+    def __init__(self, app, controller=None):
+        self.app = app
+        self.controller = controller or admission
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(EXEMPT):
+            await self.app(scope, receive, send)
+            return
+        controller = self.controller
+        client = scope["client"][0] if scope.get("client") else "unknown"
+        body = None
+        if (scope["method"], scope["path"]) == COMMAND_ROUTE:
+            body, consumed = await _read_body(receive)
+            receive = _replay(consumed, receive)
+        cls, rejected = await controller.admit(client, scope["method"], scope["path"], body)
+        if rejected:
+            reason, wait = rejected
+            payload = json.dumps({"status": "error", "message": f"Too many requests: {reason}"}).encode()
+            await send({"type": "http.response.start", "status": 429,
+                        "headers": [(b"content-type", b"application/json"),
+                                    (b"content-length", str(len(payload)).encode()),
+                                    (b"retry-after", controller.retry_after(wait).encode())]})
+            await send({"type": "http.response.body", "body": payload})
+            return
+        if cls != "heavy":
+            await self.app(scope, receive, send)
+            return
+
+        held = True
+
+        def release():
+            nonlocal held
+            if held:
+                held = False
+                controller.release(cls)
+
+        async def send_released(message):
+            # The work is done once the response starts; the body may trickle out freely
+            if message["type"] == "http.response.start":
+                release()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_released)
+        except BaseException:
+            release()
+            raise
+        release()
+
+
+admission = AdmissionController.from_env()
@@ -0,0 +1,83 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from backend.database import READER_POOL_SIZE
+
+# Async access to the blocking database helpers. Queries run on a dedicated
+# executor so they never compete with Starlette's threadpool (used by sync
+# endpoints and long-running commands), and the backlog is bounded.
+
+SLOW_QUERY = 0.5  # seconds, logged when exceeded
+
+
+class DBBusy(RuntimeError):
+    """Raised when too many queries are already queued."""
+
+
+class AsyncDB:
+    def __init__(self, workers=READER_POOL_SIZE + 1, max_queue=64):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="db")
+        self.workers = workers
+        self.max_queue = max_queue
+        self.pending = 0
+        self.rejected = 0
+        self.timings = {}
+        self.lock = threading.Lock()
+
+    def _release(self, future):
+        with self.lock:
+            self.pending -= 1
+
+    def _record(self, name, wait, elapsed):
+        with self.lock:
+            t = self.timings.get(name)
+            if t is None:
+                t = self.timings[name] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0, "wait_ms": 0.0}
+            t["count"] += 1
+            t["total_ms"] += elapsed * 1000
+            t["max_ms"] = max(t["max_ms"], elapsed * 1000)
+            t["wait_ms"] += wait * 1000
+        if elapsed > SLOW_QUERY:
+            print(f"[db] slow query {name}: {elapsed * 1000:.0f} ms (queued {wait * 1000:.0f} ms)")
+
+    async def run(self, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) on the DB executor. Raises DBBusy when the queue is full."""
+        name = getattr(fn, "__name__", "query")
+        with self.lock:
+            if self.pending >= self.max_queue:
+                self.rejected += 1
+                raise DBBusy(f"{self.pending} database queries queued")
+            self.pending += 1
+        queued = time.perf_counter()
+
+        def call():
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self._record(name, started - queued, time.perf_counter() - started)
+
+        future = self.executor.submit(call)
+        # Fires once, whether the query ran or was cancelled before starting
+        future.add_done_callback(self._release)
+        return await asyncio.wrap_future(future)
+
+    def stats(self):
+        with self.lock:
+            queries = {}
+            for name, t in self.timings.items():
+                queries[name] = dict(t, avg_ms=round(t["total_ms"] / t["count"], 3))
+                queries[name]["total_ms"] = round(t["total_ms"], 3)
+                queries[name]["max_ms"] = round(t["max_ms"], 3)
+                queries[name]["wait_ms"] = round(t["wait_ms"], 3)
+            return {
+                "workers": self.workers,
+                "max_queue": self.max_queue,
+                "pending": self.pending,
+                "rejected": self.rejected,
+                "queries": queries
+            }
+
+
+adb = AsyncDB()
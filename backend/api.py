@@ -1,12 +1,23 @@
-from fastapi import FastAPI, BackgroundTasks
+from fastapi import FastAPI, Request, Response, Query
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import StreamingResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
-from backend.database import get_all_devices
-from backend.scanner import scanner, get_local_ip, get_gateway
+from pydantic import BaseModel
+from backend.database import (get_bettercap_logs, db, get_devices_page, get_device_changes,
+                              check_device_fields)
+from backend.aiodb import adb, DBBusy
+from backend.inventory import inventory
+from backend.history import list_scans, inventory_at, diff_scans
+from backend.scanner import scanner
+from backend.netenv import netenv
+from backend.netstats import sampler, parse_duration
 from backend.bettercap_service import bettercap_runner
-import subprocess
+from backend.events import sse_stream
+from backend.admission import admission, AdmissionMiddleware
+from backend.commands import registry, CommandRejected
+from backend.jobs import jobs, JobQueueFull
+from backend.scheduler import scheduler
 import os
-import psutil
 import time
 
 app = FastAPI()
@@ -17,218 +28,339 @@ app.add_middleware(
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor", "X-Inventory-Version"],
 )
 
-def get_ssid():
-    try:
-        # Windows command to get SSID
-        out = subprocess.check_output("netsh wlan show interfaces", shell=True).decode('cp850', errors='ignore')
-        for line in out.split('\n'):
-            line = line.strip()
-            if line.startswith("SSID") and ":" in line:
-                return line.split(":")[1].strip()
-    except:
-        pass
-    return "Unknown / Wired"
+app.add_middleware(AdmissionMiddleware)
+
+@app.get("/api/admission")
+def admission_stats():
+    """Admission control: bucket levels, heavy queue depth, admitted/rejected per class."""
+    return {"requests": admission.stats(), "commands": registry.stats(), "jobs": jobs.stats(),
+            "db": adb.stats()}
+
+@app.exception_handler(DBBusy)
+async def db_busy_handler(request, exc):
+    return JSONResponse(status_code=429, content={"status": "error", "message": str(exc)},
+                        headers={"Retry-After": "1"})
+
+@app.exception_handler(CommandRejected)
+async def command_rejected_handler(request, exc):
+    return JSONResponse(status_code=429, content={"type": "error", "output": str(exc)},
+                        headers={"Retry-After": admission.retry_after(exc.retry_after)})
+
+def _etag_matches(request, etag):
+    header = request.headers.get("if-none-match")
+    return header is not None and (header.strip() == "*" or etag in [t.strip() for t in header.split(",")])
+
+def _field_list(fields):
+    return [f.strip() for f in fields.split(",") if f.strip()] if fields else None
 
 @app.get("/api/devices")
-def read_devices():
-    return get_all_devices()
+async def read_devices(request: Request, cursor: str | None = None, limit: int | None = None,
+                       fields: str | None = None):
+    """
+    Without parameters: the full list, as before. `limit`/`cursor` page
+    through devices ordered by MAC (next cursor in X-Next-Cursor), `fields`
+    is a comma separated projection. Answers 304 while the inventory
+    version in the ETag is unchanged and, when lastSeen is returned, no
+    device has been seen since.
+    """
+    field_list = _field_list(fields)
+    try:
+        if field_list:
+            check_device_fields(field_list)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"status": "error", "message": str(e)})
+
+    # Read before the rows: a stale tag only costs the client one extra fetch
+    version, last_seen = await adb.run(inventory.get_tag_state)
+    # The version ignores last_seen-only refreshes, so responses carrying
+    # lastSeen also key on the newest sighting
+    if field_list is None or {"last_seen", "lastSeen"} & set(field_list):
+        seen = "".join(ch for ch in (last_seen or "") if ch.isdigit())
+        etag = f'W/"inv-{version}-{seen}"'
+    else:
+        etag = f'W/"inv-{version}"'
+    headers = {"ETag": etag, "X-Inventory-Version": str(version)}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    if cursor is None and limit is None and field_list is None:
+        return JSONResponse(await adb.run(inventory.get_devices), headers=headers)
+
+    devices, next_cursor = await adb.run(get_devices_page, cursor, min(max(limit or 100, 1), 1000), field_list)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+    return JSONResponse(devices, headers=headers)
+
+@app.get("/api/devices/changes")
+async def read_device_changes(since: int = 0, limit: int = 500, fields: str | None = None):
+    """Devices changed after inventory version `since`; continue with `next` while `more`."""
+    try:
+        return await adb.run(get_device_changes, since, min(max(limit, 1), 5000), _field_list(fields))
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"status": "error", "message": str(e)})
+
+@app.get("/api/inventory")
+async def inventory_summary():
+    """Precomputed counts: total, online, offline, untrusted, by type."""
+    return await adb.run(inventory.get_aggregates)
+
+@app.post("/api/inventory/invalidate")
+async def invalidate_inventory():
+    # For tools that write netguardian.db from another process
+    inventory.invalidate()
+    return {"status": "ok", "message": "Inventory cache will reload on next read."}
+
+@app.get("/api/db/stats")
+async def db_stats():
+    return {"connections": db.stats(), "queries": adb.stats(), "inventory": inventory.stats()}
+
+class ScanRequest(BaseModel):
+    targets: list[str] = []     # CIDR ranges, e.g. ["10.0.0.0/22"]
+    interfaces: list[str] = []  # scan the networks attached to these NICs
+    incremental: bool = False   # only probe unknown/stale/changed addresses
 
 @app.post("/api/scan")
-def trigger_scan(background_tasks: BackgroundTasks):
-    if not scanner.scanning:
-        background_tasks.add_task(scanner.start_scan)
-        return {"status": "started", "message": "Scan initiated"}
-    return {"status": "busy", "message": "Scan in progress"}
+def trigger_scan(req: ScanRequest | None = None):
+    req = req or ScanRequest()
+    run, started = scanner.ensure_scan(req.targets, req.interfaces, req.incremental)
+    if started:
+        return {"status": "started", "message": "Scan initiated", "scan": run.to_dict()}
+    return {"status": "busy", "message": "Scan in progress, joined it", "scan": run.to_dict()}
+
+@app.post("/api/scan/stop")
+def stop_scan():
+    run = scanner.stop_scan()
+    if run is None:
+        return {"status": "idle", "message": "No scan running"}
+    return {"status": "stopping", "message": "Scan cancellation requested", "scan": run.to_dict()}
+
+class ScheduleRequest(BaseModel):
+    interval: float | None = None   # seconds, 0 disables
+    jitter: float | None = None     # +/- fraction of interval
+    incremental: bool | None = None
+    full_every: int | None = None
+
+@app.get("/api/scan/schedule")
+def scan_schedule():
+    return scheduler.status()
+
+@app.post("/api/scan/schedule")
+def configure_scan_schedule(req: ScheduleRequest):
+    scheduler.configure(req.interval, req.jitter, req.incremental, req.full_every)
+    return scheduler.status()
+
+@app.on_event("startup")
+def check_oui_index():
+    # Warns once if backend/data/oui.bin has not been built
+    from backend.oui import get_index
+    get_index()
+
+@app.on_event("startup")
+def start_scheduler():
+    if scheduler.interval:
+        scheduler.start()
+
+@app.get("/api/scan/stream")
+async def scan_stream():
+    """Server-Sent Events: progress, device and done events for the running scan."""
+    return StreamingResponse(
+        sse_stream(scanner.events, initial=[("progress", scanner.progress)]),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Scan history (delta-encoded, see backend/history.py)
+@app.get("/api/history")
+async def scan_history(limit: int = 100, before: int | None = None):
+    return await adb.run(list_scans, min(max(limit, 1), 1000), before)
+
+@app.get("/api/history/inventory")
+async def history_inventory(at: str):
+    """Inventory as of `at` (ISO time or unix timestamp)."""
+    try:
+        when = float(at)
+    except ValueError:
+        when = at
+    try:
+        result = await adb.run(inventory_at, when)
+    except ValueError:
+        return JSONResponse(status_code=400, content={"status": "error", "message": f"Invalid time: {at}"})
+    if result is None:
+        return JSONResponse(status_code=404, content={"status": "error", "message": "No scan recorded before that time"})
+    return result
+
+@app.get("/api/history/diff")
+async def history_diff(from_scan: int, to_scan: int):
+    return await adb.run(diff_scans, from_scan, to_scan)
+
+@app.on_event("startup")
+def start_netenv():
+    netenv.start()
+    sampler.start()
 
 @app.get("/api/network")
 def network_info():
-    net_stats = psutil.net_io_counters()
-    return {
-        "ip": get_local_ip(),
-        "gateway": get_gateway(),
-        "ssid": get_ssid(),
-        "bytes_sent": net_stats.bytes_sent,
-        "bytes_recv": net_stats.bytes_recv
-    }
+    # Interfaces, gateway and SSID come from the cached environment (backend/netenv.py),
+    # byte counters from the throughput sampler's last sample (backend/netstats.py)
+    return dict(netenv.get(), **sampler.totals(), rates=sampler.latest())
+
+@app.get("/api/network/history")
+def network_history(iface: str | None = None, window: str = "1h", resolution: str = "auto"):
+    """
+    Per-second rates (bytes, packets, errors, drops) over the last `window`
+    (e.g. 300, 15m, 6h, 7d) at 1s, 1m or 1h resolution. No iface = all interfaces summed.
+    """
+    try:
+        seconds = parse_duration(window)
+        return sampler.history(iface, seconds, resolution)
+    except KeyError:
+        return JSONResponse(status_code=404, content={"status": "error", "message": f"Unknown interface '{iface}'",
+                                                      "interfaces": sampler.interfaces()})
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"status": "error", "message": str(e)})
+
+@app.get("/api/network/sampler")
+def network_sampler_stats():
+    return dict(sampler.stats(), environment=netenv.status())
 
-from pydantic import BaseModel
-from backend.tools import ping_host, traceroute_host, scan_ports
 
 class CommandRequest(BaseModel):
     command: str
     args: list[str] = []
+    background: bool = False    # run as a job, poll /api/jobs/{id} for the result
 
 @app.post("/api/execute")
 def execute_command(req: CommandRequest):
-    cmd = req.command.lower()
-    target = req.args[0] if req.args else ""
-    
-    if cmd == "ping":
-        if not target: return {"type": "error", "output": "Target required."}
-        return {"type": "output", "output": ping_host(target)}
-        
-    elif cmd == "trace":
-        if not target: return {"type": "error", "output": "Target required."}
-        return {"type": "output", "output": traceroute_host(target)}
-        
-    elif cmd == "ports":
-        if not target: return {"type": "error", "output": "Target IP/Domain required."}
-        from backend.tools import scan_ports
-        return {"type": "port_list", "data": scan_ports(target)}
-        
-    elif cmd == "scan":
-        # Trigger scan
-        if not scanner.scanning:
-            scanner.start_scan()
-            return {"type": "info", "output": "Network Discovery initiated... Check 'Devices' tab for results."}
-        else:
-            return {"type": "error", "output": "Scan already in progress."}
-            
-    # New Commands
-    elif cmd in ["ifconfig", "ipa", "ipconfig"]:
-        from backend.tools import get_ifconfig
-        return {"type": "output", "output": get_ifconfig()}
-        
-    elif cmd == "nslookup":
-        if not target: return {"type": "error", "output": "Target domain required."}
-        from backend.tools import run_nslookup
-        return {"type": "output", "output": run_nslookup(target)}
-        
-    elif cmd == "netstat":
-        from backend.tools import run_netstat
-        return {"type": "output", "output": run_netstat()}
-        
-    elif cmd == "system":
-        from backend.tools import system_info
-        return {"type": "output", "output": system_info()}
-        
-    elif cmd == "recon":
-        from backend.tools import get_wifi_networks
-        return {"type": "output", "output": get_wifi_networks()}
-        
-    elif cmd == "vuln":
-        if not target: return {"type": "error", "output": "Target IP required."}
-        from backend.tools import check_vulnerabilities
-        return {"type": "output", "output": check_vulnerabilities(target)}
-        
-    elif cmd == "stress":
-        if not target: return {"type": "error", "output": "Target IP required."}
-        from backend.tools import run_stress_test
-        return {"type": "output", "output": run_stress_test(target)}
-
-    # --- New Cyber Commands ---
-    elif cmd == "wifi_keys":
-        from backend.tools import get_wifi_keys
-        return {"type": "output", "output": get_wifi_keys()}
-        
-    elif cmd == "geoip":
-        if not target: return {"type": "error", "output": "Usage: geoip <ip>"}
-        from backend.tools import geo_locate_ip
-        return {"type": "output", "output": geo_locate_ip(target)}
-        
-    elif cmd == "domain_intel":
-        if not target: return {"type": "error", "output": "Target Domain required."}
-        from backend.tools import run_domain_intel
-        return {"type": "domain_intel_data", "data": run_domain_intel(target)}
-        
-    elif cmd == "whois":
-        if not target: return {"type": "error", "output": "Usage: whois <domain>"}
-        from backend.tools import whois_lite
-        return {"type": "output", "output": whois_lite(target)}
-        
-    elif cmd == "speedtest":
-        from backend.tools import run_speed_test
-        # Returns dict, handle in frontend
-        return {"type": "speedtest_result", "data": run_speed_test()}
-        
-    elif cmd == "wifi_scan":
-        from backend.tools import scan_wifi_networks
-        return {"type": "wifi_data", "data": scan_wifi_networks()}
-        
-    elif cmd == "map_data":
-        from backend.tools import get_active_threat_map
-        return {"type": "map_data", "data": get_active_threat_map()}
-        
-    elif cmd == "detect_os":
-        from backend.tools import detect_os_ttl
-        return {"type": "os_data", "data": detect_os_ttl(target)}
-        
-    elif cmd == "web_hunter":
-        if not target: return {"type": "error", "output": "Target URL required."}
-        mode = 'dirbuster'
-        # Check if args has a second item for mode
-        if req.args and len(req.args) > 1:
-            mode = req.args[1]
-        from backend.tools import run_web_hunter
-        return {"type": "web_hunter_data", "data": run_web_hunter(target, mode)}
-        
-    elif cmd == "subfinder":
-        if not target: return {"type": "error", "output": "Target Domain required."}
-        from backend.tools import find_subdomains
-        return {"type": "subdomain_data", "data": find_subdomains(target)}
-            
-    elif cmd == "bettercap_exec":
-        if not target: return {"type": "error", "output": "Command required"}
-        from backend.bettercap_service import bettercap_runner
-        if bettercap_runner.execute(target):
-             return {"type": "success", "output": f"Executed: {target}"}
-        return {"type": "error", "output": "Bettercap not running or failed."}
-
-    elif cmd == "generate_payload":
-        if not target: return {"type": "error", "output": "Text content required."}
-        ptype = 'python'
-        if req.args and len(req.args) > 1: ptype = req.args[1]
-        
-        from backend.tools import generate_badusb_script
-        return {"type": "payload_data", "data": generate_badusb_script(target, ptype)}
+    if req.background:
+        cmd = req.command.lower()
+        args = list(req.args)
+        try:
+            job = jobs.submit(cmd, args, lambda job: run_command(cmd, args, job),
+                              parser=registry.progress_parser(cmd))
+        except JobQueueFull as e:
+            return JSONResponse(status_code=429, content={"type": "error", "output": f"Job queue full: {e}"},
+                                headers={"Retry-After": "5"})
+        return {"type": "job", "job": job.to_dict()}
+    return run_command(req.command.lower(), req.args)
+
+@app.get("/api/execute/stream")
+async def execute_stream(command: str, args: list[str] = Query([])):
+    """
+    Server-Sent Events for one command: output lines as they are produced,
+    progress events (ping replies, traceroute hops with RTTs) and a final
+    end event carrying the result. Disconnecting kills the command.
+    """
+    cmd = command.lower()
+    try:
+        job = jobs.submit(cmd, args, lambda job: run_command(cmd, args, job),
+                          parser=registry.progress_parser(cmd))
+    except JobQueueFull as e:
+        return JSONResponse(status_code=429, content={"type": "error", "output": f"Job queue full: {e}"},
+                            headers={"Retry-After": "5"})
+
+    async def frames():
+        try:
+            async for frame in sse_stream(job.events, initial=lambda: _job_initial(job), until={"end"}):
+                yield frame
+        finally:
+            # Client went away (or the stream ended): stop the child process
+            if not job.done:
+                jobs.cancel(job.id)
+
+    return StreamingResponse(frames(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no",
+                                      "X-Job-Id": job.id})
+
+def run_command(cmd, args, job=None):
+    """Execute one terminal command. With a job, output is streamed into it and cancel works."""
+    return registry.execute(cmd, args, job)
+
+@app.get("/api/commands")
+def list_commands():
+    """Registered commands with their limits and hit/miss counters."""
+    return {"commands": registry.describe(), "stats": registry.stats()}
+
+# Background jobs (see backend/jobs.py)
+@app.get("/api/jobs")
+def list_jobs():
+    return {"jobs": jobs.list(), "stats": jobs.stats()}
+
+def _job_initial(job):
+    """Catch-up events for a job stream: status, output so far, end if finished."""
+    lines, _ = job.lines_since(0)
+    first = job.truncated
+    events = [("status", job.to_dict())]
+    events += [("output", {"seq": first + i, "line": line}) for i, line in enumerate(lines)]
+    if job.done:
+        events.append(("end", job.to_dict(with_result=True)))
+    return events
+
+def _job_or_404(job_id):
+    job = jobs.get(job_id)
+    if job is None:
+        return None, JSONResponse(status_code=404, content={"status": "error", "message": "Unknown job"})
+    return job, None
+
+@app.get("/api/jobs/{job_id}")
+def get_job(job_id: str, offset: int = 0):
+    """Status plus output lines from `offset` on; the result once finished."""
+    job, missing = _job_or_404(job_id)
+    if missing:
+        return missing
+    lines, next_offset = job.lines_since(offset)
+    return dict(job.to_dict(with_result=True), output=lines, next_offset=next_offset)
 
-    elif cmd == "generate_flipper":
-        ftype = req.args[0] if req.args else 'ir'
-        param = req.args[1] if len(req.args) > 1 else ''
-        from backend.tools import generate_flipper_file
-        return {"type": "file_data", "data": generate_flipper_file(ftype, param)}
+@app.get("/api/jobs/{job_id}/result")
+def get_job_result(job_id: str):
+    """The finished command's response, as /api/execute would have returned it."""
+    job, missing = _job_or_404(job_id)
+    if missing:
+        return missing
+    if not job.done:
+        return JSONResponse(status_code=202, content=job.to_dict())
+    if job.status != "done":
+        return {"type": "error", "output": job.error or f"Job {job.status}."}
+    return job.result
 
-    return {"type": "error", "output": f"Command '{cmd}' not recognized by backend kernel."}
+@app.get("/api/jobs/{job_id}/stream")
+async def stream_job(job_id: str):
+    """Server-Sent Events: status, output lines and a final end event."""
+    job, missing = _job_or_404(job_id)
+    if missing:
+        return missing
+    return StreamingResponse(
+        sse_stream(job.events, initial=lambda: _job_initial(job), until={"end"}),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    job = jobs.cancel(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"status": "error", "message": "Unknown job"})
+    return job.to_dict()
 
 # System Health Check Endpoint
 @app.get("/api/health")
-def get_system_health():
+async def get_system_health():
     # 1. WiFi Encryption Score
-    wifi_output = get_ssid() # We need channel/encryption data really. 
-    # For now, let's look at get_wifi_networks() logic or rely on frontend to parse 'recon'
-    # Actually, let's do a quick local check if possible or simulate score
     # Real logic: check if 'WPA3' is in current connection profile status... hard on windows cmd without detailed parsing.
     # We will assume a baseline and checking for Rogue devices.
     
     # 2. Rogue Devices
     # Check DB for untrusted devices
-    from backend.database import get_db
     try:
-        conn = get_db() # Wait, get_db is not in imports? It is not exposed in database.py commonly? 
-        # Actually scanner.py uses sqlite3 directly for this newly added feature.
-        # Let's use direct sqlite3 for now similar to scanner.py
-        import sqlite3
-        conn = sqlite3.connect("netguardian.db")
-        conn.row_factory = sqlite3.Row
-        c = conn.cursor()
-        c.execute("SELECT * FROM known_devices WHERE is_trusted=0 ORDER BY last_seen DESC")
-        rows = c.fetchall()
-        
-        rogue_count = len(rows)
-        rogue_list = []
-        for r in rows:
-            rogue_list.append({
-                "mac": r["mac"],
-                "vendor": r["vendor"],
-                "last_seen": r["last_seen"]
-            })
-        conn.close()
+        rogue_list = await adb.run(inventory.get_untrusted)
+    except DBBusy:
+        raise
     except Exception as e:
         print(f"Health check error: {e}")
-        rogue_count = 0
         rogue_list = []
+    rogue_count = len(rogue_list)
         
     score = 100
     risk_factors = []
@@ -245,12 +377,14 @@ def get_system_health():
     if score < 60: health_status = "Critical"
     elif score < 85: health_status = "Warning"
     
+    env = netenv.get()
     return {
         "score": score,
         "status": health_status,
         "rogue_devices": rogue_count,
         "rogue_list": rogue_list,
-        "risks": risk_factors
+        "risks": risk_factors,
+        "network": {"ip": env["ip"], "gateway": env["gateway"], "ssid": env["ssid"]}
     }
 
 # Bettercap Endpoints
@@ -266,9 +400,60 @@ def stop_bettercap_service():
     return {"status": "stopped", "message": "Bettercap listener stopped."}
 
 @app.get("/api/bettercap/data")
-def get_bettercap_data():
+async def get_bettercap_data():
     return bettercap_runner.get_dashboard_data()
 
+@app.get("/api/bettercap/logs")
+async def read_bettercap_logs(limit: int = 100, since: str | None = None, device_ip: str | None = None):
+    return await adb.run(get_bettercap_logs, min(max(limit, 1), 1000), since, device_ip)
+
+# Log retention and rollups (see backend/logstore.py)
+from backend.logstore import log_maintenance, traffic_summary, traffic_timeline
+
+@app.on_event("startup")
+def start_log_maintenance():
+    log_maintenance.start()
+
+@app.get("/api/bettercap/summary")
+async def bettercap_summary(since: str | None = None, until: str | None = None, by: str = "platform"):
+    """Counts grouped by device_ip/device_mac/platform/traffic_type, served from hourly rollups."""
+    return await adb.run(traffic_summary, since, until, _field_list(by))
+
+@app.get("/api/bettercap/timeline")
+async def bettercap_timeline(since: str | None = None, until: str | None = None,
+                             platform: str | None = None, device_ip: str | None = None):
+    return await adb.run(traffic_timeline, since, until, platform, device_ip)
+
+@app.get("/api/logs/maintenance")
+def log_maintenance_status():
+    return log_maintenance.status()
+
+@app.post("/api/logs/maintenance")
+def run_log_maintenance(convert_vacuum: bool = False):
+    # Runs in the request thread; rollup and pruning work in small batches.
+    # convert_vacuum does the one-time full VACUUM (blocks writers until done).
+    return log_maintenance.run_once(convert_vacuum or None)
+
+# Streaming exports (see backend/export.py)
+from backend.export import export_stream, FORMATS
+
+@app.get("/api/export/{dataset}")
+def export_dataset(dataset: str, format: str = "ndjson", gzip: bool = False,
+                   since: str | None = None, until: str | None = None):
+    """devices, known_devices, bettercap_logs or intrusions as NDJSON/CSV, `since` <= time < `until`."""
+    try:
+        stream = export_stream(dataset, format, since, until, gzip)
+    except KeyError:
+        return JSONResponse(status_code=404, content={"status": "error", "message": f"Unknown dataset '{dataset}'"})
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"status": "error", "message": str(e)})
+    filename = f"{dataset}-{time.strftime('%Y%m%d-%H%M%S')}.{'csv' if format == 'csv' else 'ndjson'}"
+    headers = {"Content-Disposition": f'attachment; filename="{filename}{".gz" if gzip else ""}"'}
+    media_type = FORMATS[format]
+    if gzip:
+        media_type = "application/gzip"
+    return StreamingResponse(stream, media_type=media_type, headers=headers)
+
 # HoneyPort Endpoints
 from backend.honeypot import honeypot_runner
 
@@ -293,6 +478,32 @@ def get_honeypot_stats():
     return honeypot_runner.get_stats()
 
 
+# Passive discovery (mDNS/SSDP listener)
+from backend.passive import passive_discovery
+
+@app.on_event("startup")
+def start_passive_discovery():
+    # On by default; NETGUARDIAN_PASSIVE=0 disables it
+    if os.environ.get("NETGUARDIAN_PASSIVE", "1") != "0":
+        passive_discovery.start()
+
+@app.post("/api/passive/start")
+def start_passive():
+    success, msg = passive_discovery.start()
+    if success:
+        return {"status": "started", "message": msg}
+    return {"status": "error", "message": msg}
+
+@app.post("/api/passive/stop")
+def stop_passive():
+    passive_discovery.stop()
+    return {"status": "stopped", "message": "Passive discovery stopped."}
+
+@app.get("/api/passive/stats")
+def get_passive_stats():
+    return passive_discovery.get_stats()
+
+
 DIST_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "dist")
 
 if os.path.exists(DIST_DIR):
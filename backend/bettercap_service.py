@@ -3,37 +3,32 @@ import threading
 import re
 import time
 import json
-import sqlite3
 import os
 from datetime import datetime
 from queue import Queue
+from backend.database import db
 
-# Database Setup for Logs
-DB_PATH = os.path.join(os.path.dirname(__file__), "..", "netguardian.db")
-
+# Database Setup for Logs (same file and writer as the rest of the backend)
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS bettercap_logs 
-                 (id INTEGER PRIMARY KEY AUTOINCREMENT, 
-                  timestamp TEXT, 
-                  device_ip TEXT, 
-                  device_mac TEXT, 
-                  platform TEXT, 
-                  protocol TEXT, 
-                  traffic_type TEXT,
-                  details TEXT)''')
-    
-    # Table for Rogue Device Detection
-    c.execute('''CREATE TABLE IF NOT EXISTS known_devices 
-                 (mac TEXT PRIMARY KEY, 
-                  first_seen TEXT, 
-                  last_seen TEXT, 
-                  vendor TEXT,
-                  is_trusted INTEGER DEFAULT 0)''')
+    with db.writer() as conn:
+        c = conn.cursor()
+        c.execute('''CREATE TABLE IF NOT EXISTS bettercap_logs 
+                     (id INTEGER PRIMARY KEY AUTOINCREMENT, 
+                      timestamp TEXT, 
+                      device_ip TEXT, 
+                      device_mac TEXT, 
+                      platform TEXT, 
+                      protocol TEXT, 
+                      traffic_type TEXT,
+                      details TEXT)''')
     
-    conn.commit()
-    conn.close()
+        # Table for Rogue Device Detection
+        c.execute('''CREATE TABLE IF NOT EXISTS known_devices 
+                     (mac TEXT PRIMARY KEY, 
+                      first_seen TEXT, 
+                      last_seen TEXT, 
+                      vendor TEXT,
+                      is_trusted INTEGER DEFAULT 0)''')
 
 init_db()
 
@@ -233,12 +228,9 @@ class BettercapService:
 
     def _log_to_db(self, ip, mac, platform, protocol, t_type, details):
         try:
-            conn = sqlite3.connect(DB_PATH)
-            c = conn.cursor()
-            c.execute("INSERT INTO bettercap_logs (timestamp, device_ip, device_mac, platform, protocol, traffic_type, details) VALUES (?,?,?,?,?,?,?)",
-                      (datetime.now().isoformat(), ip, mac, platform, protocol, t_type, details))
-            conn.commit()
-            conn.close()
+            with db.writer() as conn:
+                conn.execute("INSERT INTO bettercap_logs (timestamp, device_ip, device_mac, platform, protocol, traffic_type, details) VALUES (?,?,?,?,?,?,?)",
+                             (datetime.now().isoformat(), ip, mac, platform, protocol, t_type, details))
         except Exception as e:
             print(f"DB Error: {e}")
 
@@ -0,0 +1,367 @@
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from backend import tools
+
+# Terminal commands for /api/execute. Each command declares its positional
+# arguments, a timeout, how many may run at once and how long a result may
+# be reused. Identical cacheable requests that arrive while one is running
+# wait for that one instead of repeating the network work. When all slots
+# are busy a bounded number of requests wait; beyond that CommandRejected
+# is raised and the API answers 429. A command runs in the thread that asked
+# for it (request or job), holding its slot for as long as the work runs.
+
+
+class CommandRejected(RuntimeError):
+    """The command's wait queue is full. retry_after is a hint in seconds."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Arg:
+    def __init__(self, name, required=None, default=""):
+        self.name = name
+        self.required = required  # error message when missing, None = optional
+        self.default = default
+
+
+class Command:
+    def __init__(self, name, handler, args=(), timeout=60, max_concurrency=4, ttl=0,
+                 aliases=(), streams=False, progress=None, max_queue=None, heavy=True):
+        self.name = name
+        self.handler = handler        # handler(args dict, hooks dict) -> response dict
+        self.args = list(args)
+        self.timeout = timeout
+        self.max_concurrency = max_concurrency
+        self.ttl = ttl                # seconds a result is reused, 0 = never
+        self.aliases = aliases
+        self.streams = streams        # takes on_line/stop_event (subprocess based tools)
+        self.progress = progress      # output line -> progress event dict or None
+        self.max_queue = max_queue if max_queue is not None else max_concurrency * 2
+        self.heavy = heavy            # real work, admitted through the API's heavy class
+        self.waiting = 0              # requests queued for a slot
+        self.slots = threading.BoundedSemaphore(max_concurrency)
+        self.counters = {"calls": 0, "hits": 0, "misses": 0, "shared": 0, "timeouts": 0,
+                         "errors": 0, "rejected": 0}
+
+    def parse(self, raw):
+        """Map positional args to names. Returns (args, error message)."""
+        values = {}
+        for i, arg in enumerate(self.args):
+            value = raw[i] if len(raw) > i and raw[i] != "" else arg.default
+            if arg.required and not value:
+                return None, arg.required
+            values[arg.name] = value
+        return values, None
+
+    def describe(self):
+        return {
+            "name": self.name,
+            "aliases": list(self.aliases),
+            "args": [{"name": a.name, "required": bool(a.required), "default": a.default} for a in self.args],
+            "timeout": self.timeout,
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "queue_depth": self.waiting,
+            "ttl": self.ttl,
+            "streams": self.streams,
+            "heavy": self.heavy,
+            "stats": dict(self.counters)
+        }
+
+
+class _AnySet:
+    """Looks like an Event to iter_command: set when any of the events is."""
+
+    def __init__(self, *events):
+        self.events = [e for e in events if e is not None]
+
+    def is_set(self):
+        return any(e.is_set() for e in self.events)
+
+
+class _Deadline:
+    """Looks like an Event to iter_command: set once the monotonic deadline passes."""
+
+    def __init__(self, at):
+        self.at = at
+
+    def is_set(self):
+        return time.monotonic() >= self.at
+
+
+class CommandRegistry:
+    def __init__(self):
+        self.commands = {}
+        self.names = {}
+        self.cache = {}       # key -> (expires, response)
+        self.inflight = {}    # key -> Future
+        self.lock = threading.Lock()
+
+    def register(self, name, handler, **options):
+        cmd = Command(name, handler, **options)
+        self.commands[name] = cmd
+        for alias in (name,) + tuple(cmd.aliases):
+            self.names[alias] = cmd
+        return cmd
+
+    def command(self, name, **options):
+        """Decorator form of register()."""
+        def wrap(handler):
+            self.register(name, handler, **options)
+            return handler
+        return wrap
+
+    def _count(self, cmd, counter):
+        with self.lock:
+            cmd.counters[counter] += 1
+
+    def _finished(self, cmd, key, future):
+        with self.lock:
+            if self.inflight.get(key) is future:
+                del self.inflight[key]
+            if cmd.ttl and future.exception() is None:
+                response = future.result()
+                if response.get("type") != "error":
+                    self.cache[key] = (time.monotonic() + cmd.ttl, response)
+
+    def _acquire(self, cmd):
+        """Take a run slot, waiting in the bounded per-command queue. False when rejected."""
+        if cmd.slots.acquire(blocking=False):
+            return True
+        with self.lock:
+            if cmd.waiting >= cmd.max_queue:
+                return False
+            cmd.waiting += 1
+        try:
+            return cmd.slots.acquire(timeout=min(cmd.timeout, 5))
+        finally:
+            with self.lock:
+                cmd.waiting -= 1
+
+    def _run(self, cmd, args, hooks, future):
+        try:
+            future.set_result(cmd.handler(args, hooks))
+        except Exception as e:
+            future.set_exception(e)
+        finally:
+            cmd.slots.release()
+
+    def execute(self, name, raw_args=(), job=None):
+        """Run a command and return its response dict, as /api/execute sends it."""
+        cmd = self.names.get(name)
+        if cmd is None:
+            return {"type": "error", "output": f"Command '{name}' not recognized by backend kernel."}
+        args, error = cmd.parse(list(raw_args))
+        if error:
+            return {"type": "error", "output": error}
+
+        key = (cmd.name,) + tuple(args.values())
+        shared = cmd.ttl > 0
+        leader = False
+        with self.lock:
+            cmd.counters["calls"] += 1
+            future = None
+            if shared:
+                cached = self.cache.get(key)
+                if cached and cached[0] > time.monotonic():
+                    cmd.counters["hits"] += 1
+                    return cached[1]
+                self.cache.pop(key, None)
+                future = self.inflight.get(key)
+                if future is not None:
+                    cmd.counters["shared"] += 1
+            if future is None:
+                # Registered before running so identical requests join it
+                cmd.counters["misses"] += 1
+                future = Future()
+                leader = True
+                if shared:
+                    self.inflight[key] = future
+        if leader:
+            future.add_done_callback(lambda f: self._finished(cmd, key, f))
+
+        timed_out = {"type": "error", "output": f"'{cmd.name}' timed out after {cmd.timeout}s."}
+        if leader:
+            if not self._acquire(cmd):
+                self._count(cmd, "rejected")
+                error = CommandRejected(f"Too many '{cmd.name}' commands running, try again shortly.",
+                                        min(cmd.timeout, 5))
+                future.set_exception(error)
+                raise error
+            deadline = time.monotonic() + cmd.timeout
+            hooks = {}
+            if cmd.streams:
+                # Subprocess based tools stop themselves at the deadline
+                hooks = {"stop_event": _AnySet(_Deadline(deadline), job.cancel_event if job else None)}
+                if job:
+                    hooks["on_line"] = job.emit
+            self._run(cmd, args, hooks, future)
+            if time.monotonic() > deadline:
+                self._count(cmd, "timeouts")
+                return timed_out
+
+        try:
+            return future.result(timeout=cmd.timeout)
+        except CommandRejected:
+            # Joined a request that was turned away
+            raise
+        except FutureTimeout:
+            # Only followers wait here; the leader's run is bounded by its own deadline
+            self._count(cmd, "timeouts")
+            return timed_out
+        except Exception as e:
+            self._count(cmd, "errors")
+            return {"type": "error", "output": f"'{cmd.name}' failed: {e}"}
+
+    def is_heavy(self, name, raw_args=()):
+        """
+        Whether this request means real work. Unknown or light commands, bad
+        arguments and results still cached are answered without any.
+        """
+        cmd = self.names.get(name)
+        if cmd is None or not cmd.heavy:
+            return False
+        args, error = cmd.parse(list(raw_args))
+        if error:
+            return False
+        if cmd.ttl:
+            with self.lock:
+                cached = self.cache.get((cmd.name,) + tuple(args.values()))
+            if cached and cached[0] > time.monotonic():
+                return False
+        return True
+
+    def stats(self):
+        with self.lock:
+            totals = {}
+            for cmd in self.commands.values():
+                for k, v in cmd.counters.items():
+                    totals[k] = totals.get(k, 0) + v
+            return {"cached": len(self.cache), "inflight": len(self.inflight),
+                    "queued": sum(cmd.waiting for cmd in self.commands.values()), "totals": totals}
+
+    def describe(self):
+        return [cmd.describe() for cmd in self.commands.values()]
+
+    def progress_parser(self, name):
+        cmd = self.names.get(name)
+        return cmd.progress if cmd else None
+
+
+registry = CommandRegistry()
+command = registry.command
+
+TARGET = Arg("target", "Target required.")
+
+
+@command("ping", args=[TARGET], timeout=30, max_concurrency=8, streams=True, progress=tools.parse_ping_line)
+def _ping(a, hooks):
+    return {"type": "output", "output": tools.ping_host(a["target"], **hooks)}
+
+@command("trace", args=[TARGET], timeout=90, max_concurrency=4, streams=True, progress=tools.parse_trace_line)
+def _trace(a, hooks):
+    return {"type": "output", "output": tools.traceroute_host(a["target"], **hooks)}
+
+@command("ports", args=[Arg("target", "Target IP/Domain required.")], timeout=120, max_concurrency=2)
+def _ports(a, hooks):
+    return {"type": "port_list", "data": tools.scan_ports(a["target"])}
+
+@command("scan", timeout=10, max_concurrency=4, heavy=False)
+def _scan(a, hooks):
+    # Trigger scan (joins a running one instead of starting a second sweep)
+    from backend.scanner import scanner
+    _, started = scanner.ensure_scan()
+    if started:
+        return {"type": "info", "output": "Network Discovery initiated... Check 'Devices' tab for results."}
+    return {"type": "error", "output": "Scan already in progress."}
+
+@command("ifconfig", aliases=("ipa", "ipconfig"), timeout=15, streams=True)
+def _ifconfig(a, hooks):
+    return {"type": "output", "output": tools.get_ifconfig(**hooks)}
+
+@command("nslookup", args=[Arg("target", "Target domain required.")], timeout=20, max_concurrency=8, ttl=300)
+def _nslookup(a, hooks):
+    return {"type": "output", "output": tools.run_nslookup(a["target"])}
+
+@command("netstat", timeout=20, max_concurrency=2, ttl=5)
+def _netstat(a, hooks):
+    return {"type": "output", "output": tools.run_netstat()}
+
+@command("system", timeout=10, ttl=5, heavy=False)
+def _system(a, hooks):
+    return {"type": "output", "output": tools.system_info()}
+
+@command("recon", timeout=30, max_concurrency=1, ttl=10)
+def _recon(a, hooks):
+    return {"type": "output", "output": tools.get_wifi_networks()}
+
+@command("vuln", args=[Arg("target", "Target IP required.")], timeout=120, max_concurrency=2, ttl=60)
+def _vuln(a, hooks):
+    return {"type": "output", "output": tools.check_vulnerabilities(a["target"])}
+
+@command("stress", args=[Arg("target", "Target IP required.")], timeout=60, max_concurrency=1, streams=True,
+         progress=tools.parse_ping_line)
+def _stress(a, hooks):
+    return {"type": "output", "output": tools.run_stress_test(a["target"], **hooks)}
+
+# --- New Cyber Commands ---
+@command("wifi_keys", timeout=30, max_concurrency=1)
+def _wifi_keys(a, hooks):
+    return {"type": "output", "output": tools.get_wifi_keys()}
+
+@command("geoip", args=[Arg("target", "Usage: geoip <ip>")], timeout=20, max_concurrency=4, ttl=3600)
+def _geoip(a, hooks):
+    return {"type": "output", "output": tools.geo_locate_ip(a["target"])}
+
+@command("domain_intel", args=[Arg("target", "Target Domain required.")], timeout=120, max_concurrency=2, ttl=900)
+def _domain_intel(a, hooks):
+    return {"type": "domain_intel_data", "data": tools.run_domain_intel(a["target"])}
+
+@command("whois", args=[Arg("target", "Usage: whois <domain>")], timeout=30, max_concurrency=4, ttl=3600)
+def _whois(a, hooks):
+    return {"type": "output", "output": tools.whois_lite(a["target"])}
+
+@command("speedtest", timeout=120, max_concurrency=1, ttl=30)
+def _speedtest(a, hooks):
+    # Returns dict, handle in frontend
+    return {"type": "speedtest_result", "data": tools.run_speed_test()}
+
+@command("wifi_scan", timeout=30, max_concurrency=1, ttl=10)
+def _wifi_scan(a, hooks):
+    return {"type": "wifi_data", "data": tools.scan_wifi_networks()}
+
+@command("map_data", timeout=30, max_concurrency=2, ttl=10)
+def _map_data(a, hooks):
+    return {"type": "map_data", "data": tools.get_active_threat_map()}
+
+@command("detect_os", args=[Arg("target")], timeout=30, max_concurrency=4, ttl=120)
+def _detect_os(a, hooks):
+    return {"type": "os_data", "data": tools.detect_os_ttl(a["target"])}
+
+@command("web_hunter", args=[Arg("target", "Target URL required."), Arg("mode", default="dirbuster")],
+         timeout=300, max_concurrency=2)
+def _web_hunter(a, hooks):
+    return {"type": "web_hunter_data", "data": tools.run_web_hunter(a["target"], a["mode"])}
+
+@command("subfinder", args=[Arg("target", "Target Domain required.")], timeout=180, max_concurrency=2, ttl=900)
+def _subfinder(a, hooks):
+    return {"type": "subdomain_data", "data": tools.find_subdomains(a["target"])}
+
+@command("bettercap_exec", args=[Arg("target", "Command required")], timeout=10, heavy=False)
+def _bettercap_exec(a, hooks):
+    from backend.bettercap_service import bettercap_runner
+    if bettercap_runner.execute(a["target"]):
+        return {"type": "success", "output": f"Executed: {a['target']}"}
+    return {"type": "error", "output": "Bettercap not running or failed."}
+
+@command("generate_payload", args=[Arg("target", "Text content required."), Arg("ptype", default="python")],
+         timeout=10, heavy=False)
+def _generate_payload(a, hooks):
+    return {"type": "payload_data", "data": tools.generate_badusb_script(a["target"], a["ptype"])}
+
+@command("generate_flipper", args=[Arg("ftype", default="ir"), Arg("param")], timeout=10, heavy=False)
+def _generate_flipper(a, hooks):
+    return {"type": "file_data", "data": tools.generate_flipper_file(a["ftype"], a["param"])}
@@ -1,18 +1,162 @@
 import sqlite3
 import json
 import os
+import queue
+import threading
+from contextlib import contextmanager
 from datetime import datetime
 
-DB_PATH = 'netguardian.db'
+DB_PATH = os.environ.get('NETGUARDIAN_DB', 'netguardian.db')
+
+# Connection settings. WAL lets readers run while a scan is writing; NORMAL
+# sync is safe with WAL (a crash can lose the last commits, not corrupt).
+BUSY_TIMEOUT = 5.0            # seconds to wait on a locked database
+READER_POOL_SIZE = 4
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-16000",      # KiB, ~16 MB page cache per connection
+    "PRAGMA mmap_size=268435456",    # 256 MB
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA foreign_keys=ON",
+)
+
+
+class ConnectionManager:
+    """
+    One shared writer connection, serialized by a lock, and a small pool of
+    read-only connections. Connections are opened lazily.
+    """
+
+    def __init__(self, path, readers=READER_POOL_SIZE, busy_timeout=BUSY_TIMEOUT):
+        self.path = path
+        self.change_listeners = []  # called with the staged changes of each commit
+        self._staged = []
+        self.busy_timeout = busy_timeout
+        self.write_lock = threading.RLock()
+        self._writer = None
+        self._readers = queue.LifoQueue()
+        self._reader_slots = threading.BoundedSemaphore(readers)
+        self._opened = 0
+        self._lock = threading.Lock()
+
+    def _connect(self, readonly=False):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout * 1000)}")
+        for pragma in PRAGMAS:
+            if readonly and "journal_mode" in pragma:
+                continue
+            conn.execute(pragma)
+        if readonly:
+            conn.execute("PRAGMA query_only=ON")
+        return conn
+
+    @contextmanager
+    def writer(self):
+        """Yield the writer connection inside a transaction (commit or rollback)."""
+        with self.write_lock:
+            if self._writer is None:
+                self._writer = self._connect()
+            conn = self._writer
+            if conn.in_transaction:
+                # Nested use from the same thread joins the outer transaction
+                yield conn
+                return
+            try:
+                yield conn
+                conn.commit()
+            except:
+                conn.rollback()
+                self._staged = []
+                raise
+            staged, self._staged = self._staged, []
+            # Still under the write lock, so listeners see commits in order
+            if staged:
+                for listener in self.change_listeners:
+                    try:
+                        listener(staged)
+                    except Exception as e:
+                        print(f"DB change listener error: {e}")
+
+    @contextmanager
+    def exclusive(self):
+        """
+        Yield the writer connection outside any transaction, for statements
+        that cannot run inside one (VACUUM). Other writers wait meanwhile.
+        """
+        with self.write_lock:
+            if self._writer is None:
+                self._writer = self._connect()
+            conn = self._writer
+            if conn.in_transaction:
+                raise sqlite3.OperationalError("exclusive() inside a write transaction")
+            yield conn
+
+    def on_change(self, listener):
+        """
+        Register a write-through callback. It gets the list of (kind, payload)
+        staged by the committed transaction, see stage().
+        """
+        self.change_listeners.append(listener)
+
+    def stage(self, kind, payload):
+        """Queue a change for on_change listeners; delivered only if the transaction commits."""
+        with self.write_lock:
+            self._staged.append((kind, payload))
+
+    @contextmanager
+    def reader(self):
+        """Yield a pooled read-only connection. Blocks while all are in use."""
+        if not self._reader_slots.acquire(timeout=self.busy_timeout * 2):
+            raise sqlite3.OperationalError("no reader connection available")
+        try:
+            try:
+                conn = self._readers.get_nowait()
+            except queue.Empty:
+                conn = self._connect(readonly=True)
+                with self._lock:
+                    self._opened += 1
+            try:
+                yield conn
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+                self._readers.put(conn)
+        finally:
+            self._reader_slots.release()
+
+    def close(self):
+        with self.write_lock:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+        while True:
+            try:
+                self._readers.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def stats(self):
+        return {
+            "path": os.path.abspath(self.path),
+            "readers_open": self._opened,
+            "readers_idle": self._readers.qsize(),
+            "writer_open": self._writer is not None
+        }
+
+
+db = ConnectionManager(DB_PATH)
 
 def get_db():
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Standalone connection with the same settings, for callers that manage their own."""
+    return db._connect()
 
 def init_db():
-    conn = get_db()
-    c = conn.cursor()
+    with db.writer() as conn:
+        _create_tables(conn.cursor())
+
+def _create_tables(c):
     
     # Devices table
     c.execute('''CREATE TABLE IF NOT EXISTS devices (
@@ -27,6 +171,34 @@ def init_db():
         os TEXT
     )''')
     
+    # Columns added after the first release
+    columns = [r[1] for r in c.execute("PRAGMA table_info(devices)")]
+    if 'model' not in columns:
+        c.execute("ALTER TABLE devices ADD COLUMN model TEXT")
+    if 'row_version' not in columns:
+        c.execute("ALTER TABLE devices ADD COLUMN row_version INTEGER DEFAULT 0")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_devices_row_version ON devices (row_version)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_devices_last_seen ON devices (last_seen)")
+    
+    # Inventory version: bumped by triggers whenever a device row is added or
+    # changes, and stamped on the row. A last_seen-only refresh is not a change.
+    c.execute('''CREATE TABLE IF NOT EXISTS inventory_version (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        version INTEGER
+    )''')
+    c.execute("INSERT OR IGNORE INTO inventory_version VALUES (1, 0)")
+    bump = '''
+        UPDATE inventory_version SET version = version + 1;
+        UPDATE devices SET row_version = (SELECT version FROM inventory_version) WHERE mac = NEW.mac;'''
+    c.execute(f'''CREATE TRIGGER IF NOT EXISTS devices_version_insert AFTER INSERT ON devices
+        BEGIN {bump} END''')
+    c.execute(f'''CREATE TRIGGER IF NOT EXISTS devices_version_update
+        AFTER UPDATE OF ip, name, vendor, type, status, os, model ON devices
+        WHEN NEW.ip IS NOT OLD.ip OR NEW.name IS NOT OLD.name OR NEW.vendor IS NOT OLD.vendor
+            OR NEW.type IS NOT OLD.type OR NEW.status IS NOT OLD.status OR NEW.os IS NOT OLD.os
+            OR NEW.model IS NOT OLD.model
+        BEGIN {bump} END''')
+    
     # Scan history/snapshots
     c.execute('''CREATE TABLE IF NOT EXISTS scan_usage (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -34,81 +206,245 @@ def init_db():
         device_count INTEGER,
         snapshot JSON
     )''')
-    
-    conn.commit()
-    conn.close()
+
+DEVICE_UPSERT = '''INSERT INTO devices
+    (mac, ip, name, vendor, type, status, first_seen, last_seen, os)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(mac) DO UPDATE SET
+        ip=excluded.ip,
+        name=CASE WHEN excluded.name LIKE 'Device-%' AND devices.name IS NOT NULL
+                       AND devices.name NOT LIKE 'Device-%'
+                  THEN devices.name ELSE excluded.name END,
+        vendor=excluded.vendor,
+        status=excluded.status,
+        last_seen=excluded.last_seen,
+        type=CASE WHEN excluded.name LIKE 'Device-%' AND devices.name IS NOT NULL
+                       AND devices.name NOT LIKE 'Device-%'
+                  THEN devices.type ELSE excluded.type END,
+        os=excluded.os'''
 
 def upsert_device(device):
-    conn = get_db()
-    c = conn.cursor()
-    
+    upsert_devices([device])
+
+def upsert_devices(devices):
+    """
+    Store a batch of scan results in one transaction. A resolved name (and
+    the type derived with it) is kept when the new record only has a
+    "Device-" placeholder.
+    """
+    if not devices:
+        return
     now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    
-    # Check if exists
-    c.execute("SELECT * FROM devices WHERE mac=?", (device['mac'],))
-    existing = c.fetchone()
-    
-    if existing:
-        c.execute('''UPDATE devices SET 
-            ip=?, name=?, vendor=?, status=?, last_seen=?, type=?, os=?
-            WHERE mac=?''', 
-            (device['ip'], device['name'], device['vendor'], 
-             device['status'], now, device['type'], device.get('os', 'Unknown'), device['mac']))
-    else:
-        c.execute('''INSERT INTO devices 
-            (mac, ip, name, vendor, type, status, first_seen, last_seen, os)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
-            (device['mac'], device['ip'], device['name'], device['vendor'], 
-             device['type'], device['status'], now, now, device.get('os', 'Unknown')))
-    
-    conn.commit()
-    conn.close()
+    rows = [(d['mac'], d['ip'], d['name'], d['vendor'], d['type'], d['status'],
+             now, now, d.get('os', 'Unknown')) for d in devices]
+    with db.writer() as conn:
+        conn.executemany(DEVICE_UPSERT, rows)
+        _stage_devices(conn, [d['mac'] for d in devices])
+
+def _load_temp(conn, table, column, values):
+    """Fill a connection-local temp table used for set joins."""
+    conn.execute(f"CREATE TEMP TABLE IF NOT EXISTS {table} ({column} TEXT PRIMARY KEY)")
+    conn.execute(f"DELETE FROM {table}")
+    conn.executemany(f"INSERT OR IGNORE INTO {table} VALUES (?)", [(v,) for v in values])
+
+def _stage_devices(conn, macs):
+    """
+    Stage the written state of these devices (after triggers ran) and the
+    inventory version for write-through caches. Skipped when nobody listens.
+    """
+    if not db.change_listeners or not macs:
+        return
+    _load_temp(conn, "changed_macs", "mac", macs)
+    rows = conn.execute("SELECT d.* FROM devices d JOIN changed_macs c ON c.mac = d.mac").fetchall()
+    version = conn.execute("SELECT version FROM inventory_version").fetchone()[0]
+    db.stage("devices", (version, rows))
+
+def record_known_devices(devices):
+    """
+    Add devices to known_devices and refresh last_seen for the ones already
+    there. Returns the devices that were not known before.
+    """
+    if not devices:
+        return []
+    now = datetime.now().isoformat()
+    with db.writer() as conn:
+        _load_temp(conn, "batch_macs", "mac", [d['mac'] for d in devices])
+        known = {r[0] for r in conn.execute(
+            "SELECT k.mac FROM known_devices k JOIN batch_macs b ON b.mac = k.mac")}
+        new = []
+        for d in devices:
+            if d['mac'] not in known:
+                known.add(d['mac'])
+                new.append(d)
+        conn.execute("UPDATE known_devices SET last_seen = ? WHERE mac IN (SELECT mac FROM batch_macs)", (now,))
+        conn.executemany("INSERT INTO known_devices (mac, first_seen, last_seen, vendor, is_trusted) "
+                         "VALUES (?, ?, ?, ?, 0)", [(d['mac'], now, now, d['vendor']) for d in new])
+        db.stage("known_devices", len(new))
+    return new
+
+def record_sighting(device, weak_model=False):
+    """
+    Upsert a passively observed device (mDNS/SSDP). Marks it online and keeps
+    an existing real name. A weak model (SSDP server string) only fills gaps.
+    """
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    with db.writer() as conn:
+        conn.execute('''INSERT INTO devices
+            (mac, ip, name, vendor, type, status, first_seen, last_seen, os, model)
+            VALUES (?, ?, ?, ?, ?, 'online', ?, ?, 'Unknown', ?)
+            ON CONFLICT(mac) DO UPDATE SET
+                ip=excluded.ip,
+                status='online',
+                last_seen=excluded.last_seen,
+                name=CASE WHEN devices.name IS NULL OR devices.name LIKE 'Device-%'
+                          THEN excluded.name ELSE devices.name END,
+                model=CASE WHEN ? THEN COALESCE(devices.model, excluded.model)
+                           ELSE COALESCE(excluded.model, devices.model) END''',
+            (device['mac'], device['ip'], device['name'], device['vendor'], device['type'],
+             now, now, device.get('model'), 1 if weak_model else 0))
+        _stage_devices(conn, [device['mac']])
+
+DEVICE_FIELDS = ("mac", "ip", "name", "vendor", "type", "status", "first_seen", "last_seen",
+                 "os", "model", "row_version")
+# Aliases kept for the frontend: id = mac, camelCase timestamps
+FIELD_ALIASES = {"id": "mac", "lastSeen": "last_seen", "firstSeen": "first_seen"}
+
+def _device_dict(row, fields=None):
+    d = dict(row)
+    # Add 'id' field for frontend compatibility
+    d['id'] = d['mac']
+    # Map snake_case to camelCase for frontend
+    d['lastSeen'] = d.get('last_seen', '')
+    d['firstSeen'] = d.get('first_seen', '')
+    if fields:
+        d = {f: d[f] for f in fields}
+    return d
+
+def _select_columns(fields):
+    if not fields:
+        return "*"
+    # mac is always read, it is the cursor
+    columns = {"mac"} | {FIELD_ALIASES.get(f, f) for f in fields}
+    return ", ".join(c for c in DEVICE_FIELDS if c in columns)
+
+def check_device_fields(fields):
+    """Raise ValueError for names that are neither columns nor aliases."""
+    unknown = [f for f in fields if f not in DEVICE_FIELDS and f not in FIELD_ALIASES]
+    if unknown:
+        raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
 
 def get_all_devices():
-    conn = get_db()
-    c = conn.cursor()
-    c.execute("SELECT * FROM devices ORDER BY last_seen DESC")
-    rows = c.fetchall()
-    conn.close()
-    
-    devices = []
-    for row in rows:
-        d = dict(row)
-        # Add 'id' field for frontend compatibility
-        d['id'] = d['mac']
-        # Map snake_case to camelCase for frontend
-        d['lastSeen'] = d.get('last_seen', '')
-        d['firstSeen'] = d.get('first_seen', '')
-        devices.append(d)
-    return devices
+    with db.reader() as conn:
+        rows = conn.execute("SELECT * FROM devices ORDER BY last_seen DESC").fetchall()
+    return [_device_dict(row) for row in rows]
+
+def get_inventory_version():
+    with db.reader() as conn:
+        return conn.execute("SELECT version FROM inventory_version").fetchone()[0]
+
+def get_devices_page(cursor=None, limit=100, fields=None):
+    """
+    Keyset page ordered by MAC. Returns (devices, next_cursor); next_cursor
+    is None on the last page. `fields` restricts the keys of each device.
+    """
+    if fields:
+        check_device_fields(fields)
+    query = f"SELECT {_select_columns(fields)} FROM devices"
+    params = []
+    if cursor:
+        query += " WHERE mac > ?"
+        params.append(cursor)
+    query += " ORDER BY mac LIMIT ?"
+    params.append(limit)
+    with db.reader() as conn:
+        rows = conn.execute(query, params).fetchall()
+    next_cursor = rows[-1]['mac'] if len(rows) == limit else None
+    return [_device_dict(row, fields) for row in rows], next_cursor
+
+def get_device_changes(since=0, limit=500, fields=None):
+    """
+    Devices added or changed after inventory version `since`, oldest change
+    first. Returns {"version", "next", "more", "devices"}; pass `next` as
+    `since` to continue.
+    """
+    if fields:
+        check_device_fields(fields)
+        fields = list(fields) + (["row_version"] if "row_version" not in fields else [])
+    with db.reader() as conn:
+        conn.execute("BEGIN")
+        version = conn.execute("SELECT version FROM inventory_version").fetchone()[0]
+        rows = conn.execute(f"SELECT {_select_columns(fields)} FROM devices WHERE row_version > ? "
+                            "ORDER BY row_version LIMIT ?", (since, limit)).fetchall()
+        conn.execute("COMMIT")
+    more = len(rows) == limit
+    return {
+        "version": version,
+        "next": rows[-1]['row_version'] if more else version,
+        "more": more,
+        "devices": [_device_dict(row, fields) for row in rows]
+    }
+
+def get_untrusted_devices():
+    """Devices in known_devices that were never marked trusted, newest first."""
+    with db.reader() as conn:
+        rows = conn.execute("SELECT mac, vendor, last_seen FROM known_devices "
+                            "WHERE is_trusted=0 ORDER BY last_seen DESC").fetchall()
+    return [dict(r) for r in rows]
+
+def get_bettercap_logs(limit=100, since=None, device_ip=None):
+    """Latest traffic log rows, optionally only after `since` (ISO time) or for one device."""
+    query = "SELECT * FROM bettercap_logs WHERE 1=1"
+    params = []
+    if since:
+        query += " AND timestamp > ?"
+        params.append(since)
+    if device_ip:
+        query += " AND device_ip = ?"
+        params.append(device_ip)
+    query += " ORDER BY id DESC LIMIT ?"
+    params.append(limit)
+    with db.reader() as conn:
+        rows = conn.execute(query, params).fetchall()
+    return [dict(r) for r in rows]
 
 def update_online_status(active_macs):
     """Mark devices as offline if they are not in the active_macs list."""
     if not active_macs:
         return
-        
-    conn = get_db()
-    c = conn.cursor()
     
-    # Create placeholders for SQL query
-    placeholders = ','.join('?' * len(active_macs))
-    
-    # Set online for active ones (redundant if upsert does it, but good for safety)
-    # Actually upsert handles 'online'. We just need to handle 'offline'.
-    
-    # Set ALL others to offline
-    query = f"UPDATE devices SET status='offline' WHERE mac NOT IN ({placeholders})"
-    c.execute(query, active_macs)
+    # Upsert already marks the active ones online; set ALL others to offline.
+    # Joined against a temp table, a placeholder list does not scale.
+    with db.writer() as conn:
+        _load_temp(conn, "scan_active", "mac", active_macs)
+        changed = conn.execute('''UPDATE devices SET status='offline'
+            WHERE status != 'offline' AND mac NOT IN (SELECT mac FROM scan_active)
+            RETURNING mac''').fetchall()
+        _stage_devices(conn, [r[0] for r in changed])
+
+def update_device_name(mac, name, dev_type=None):
+    """Fill in a late-resolved name, unless the device already has a real one."""
+    with db.writer() as conn:
+        changed = conn.execute("UPDATE devices SET name=?, type=COALESCE(?, type) "
+                               "WHERE mac=? AND name LIKE 'Device-%' RETURNING mac",
+                               (name, dev_type, mac)).fetchall()
+        _stage_devices(conn, [r[0] for r in changed])
+
+def mark_offline_ips(ips):
+    """Mark devices currently holding one of these IPs as offline."""
+    if not ips:
+        return
     
-    conn.commit()
-    conn.close()
+    with db.writer() as conn:
+        _load_temp(conn, "scan_silent", "ip", ips)
+        changed = conn.execute('''UPDATE devices SET status='offline'
+            WHERE status != 'offline' AND ip IN (SELECT ip FROM scan_silent)
+            RETURNING mac''').fetchall()
+        _stage_devices(conn, [r[0] for r in changed])
 
 def set_all_offline():
     """Mark all as offline before scan"""
-    conn = get_db()
-    c = conn.cursor()
-    c.execute("UPDATE devices SET status='offline'")
-    conn.commit()
-    conn.close()
+    with db.writer() as conn:
+        changed = conn.execute("UPDATE devices SET status='offline' WHERE status != 'offline' RETURNING mac").fetchall()
+        _stage_devices(conn, [r[0] for r in changed])
 
 init_db()
@@ -0,0 +1,170 @@
+import socket
+import struct
+
+# Minimal DNS wire format codec (RFC 1035), enough for mDNS/NetBIOS name
+# queries and for decoding multicast announcements.
+
+TYPE_A = 1
+TYPE_PTR = 12
+TYPE_TXT = 16
+TYPE_AAAA = 28
+TYPE_SRV = 33
+TYPE_NBSTAT = 33  # NetBIOS node status shares the SRV code point
+TYPE_ANY = 255
+
+CLASS_IN = 1
+MDNS_UNICAST_RESPONSE = 0x8000  # QU bit in the question class
+MDNS_CACHE_FLUSH = 0x8000       # same bit in the answer class
+
+
+class DNSError(ValueError):
+    pass
+
+
+def encode_name(name):
+    out = b""
+    for label in name.strip(".").split("."):
+        if label:
+            raw = label.encode("utf-8")
+            out += bytes([len(raw)]) + raw
+    return out + b"\x00"
+
+
+def decode_name(data, offset):
+    """Return (name, offset after the name). Follows compression pointers."""
+    labels = []
+    end = None
+    jumps = 0
+    while True:
+        if offset >= len(data):
+            raise DNSError("name runs past end of packet")
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if offset + 1 >= len(data):
+                raise DNSError("truncated pointer")
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            jumps += 1
+            if jumps > 32:
+                raise DNSError("pointer loop")
+            continue
+        offset += 1
+        if length == 0:
+            break
+        labels.append(data[offset:offset + length].decode("utf-8", errors="replace"))
+        offset += length
+    return ".".join(labels), (end if end is not None else offset)
+
+
+def build_query(qname, qtype, qid=0, qclass=CLASS_IN, rd=False):
+    flags = 0x0100 if rd else 0
+    header = struct.pack("!HHHHHH", qid, flags, 1, 0, 0, 0)
+    return header + encode_name(qname) + struct.pack("!HH", qtype, qclass)
+
+
+def reverse_name(ip):
+    return ".".join(reversed(ip.split("."))) + ".in-addr.arpa"
+
+
+def _decode_rdata(rtype, data, offset, length):
+    rdata = data[offset:offset + length]
+    if rtype == TYPE_A and length == 4:
+        return socket.inet_ntoa(rdata)
+    if rtype == TYPE_AAAA and length == 16:
+        return socket.inet_ntop(socket.AF_INET6, rdata)
+    if rtype == TYPE_PTR:
+        return decode_name(data, offset)[0]
+    if rtype == TYPE_TXT:
+        strings = []
+        i = 0
+        while i < length:
+            n = rdata[i]
+            strings.append(rdata[i + 1:i + 1 + n].decode("utf-8", errors="replace"))
+            i += n + 1
+        return strings
+    if rtype == TYPE_SRV and length >= 7:
+        priority, weight, port = struct.unpack("!HHH", rdata[:6])
+        return {"priority": priority, "weight": weight, "port": port,
+                "target": decode_name(data, offset + 6)[0]}
+    return rdata
+
+
+def parse_message(data):
+    """
+    Decode a DNS message into
+    {"id", "flags", "questions": [...], "answers": [...], "additional": [...]}.
+    Records are dicts with name/type/class/ttl/data.
+    """
+    if len(data) < 12:
+        raise DNSError("short packet")
+    qid, flags, qd, an, ns, ar = struct.unpack("!HHHHHH", data[:12])
+    offset = 12
+    questions = []
+    for _ in range(qd):
+        name, offset = decode_name(data, offset)
+        if offset + 4 > len(data):
+            raise DNSError("truncated question")
+        qtype, qclass = struct.unpack("!HH", data[offset:offset + 4])
+        offset += 4
+        questions.append({"name": name, "type": qtype, "class": qclass})
+
+    sections = []
+    for count in (an, ns, ar):
+        records = []
+        for _ in range(count):
+            name, offset = decode_name(data, offset)
+            if offset + 10 > len(data):
+                raise DNSError("truncated record")
+            rtype, rclass, ttl, length = struct.unpack("!HHIH", data[offset:offset + 10])
+            offset += 10
+            if offset + length > len(data):
+                raise DNSError("truncated rdata")
+            records.append({
+                "name": name,
+                "type": rtype,
+                "class": rclass & 0x7FFF,
+                "ttl": ttl,
+                "data": _decode_rdata(rtype, data, offset, length)
+            })
+            offset += length
+        sections.append(records)
+
+    return {
+        "id": qid,
+        "flags": flags,
+        "questions": questions,
+        "answers": sections[0],
+        "authority": sections[1],
+        "additional": sections[2]
+    }
+
+
+def _encode_rdata(rtype, value):
+    if rtype == TYPE_A:
+        return socket.inet_aton(value)
+    if rtype == TYPE_AAAA:
+        return socket.inet_pton(socket.AF_INET6, value)
+    if rtype == TYPE_PTR:
+        return encode_name(value)
+    if rtype == TYPE_TXT:
+        out = b""
+        for item in value:
+            raw = item.encode("utf-8")[:255]
+            out += bytes([len(raw)]) + raw
+        return out or b"\x00"
+    if rtype == TYPE_SRV:
+        return struct.pack("!HHH", value.get("priority", 0), value.get("weight", 0),
+                           value["port"]) + encode_name(value["target"])
+    return bytes(value)
+
+
+def build_response(answers, qid=0, flags=0x8400, additional=()):
+    """Encode an (uncompressed) response. Records use the parse_message layout."""
+    def record(r):
+        rdata = _encode_rdata(r["type"], r["data"])
+        return encode_name(r["name"]) + struct.pack("!HHIH", r["type"], r.get("class", CLASS_IN),
+                                                   r.get("ttl", 120), len(rdata)) + rdata
+
+    header = struct.pack("!HHHHHH", qid, flags, 0, len(answers), 0, len(additional))
+    return header + b"".join(record(r) for r in answers) + b"".join(record(r) for r in additional)
@@ -0,0 +1,84 @@
+import asyncio
+import json
+import threading
+
+# Fan-out of events from worker threads (scanner, jobs) to asyncio consumers
+# such as Server-Sent Events endpoints.
+
+
+class Subscription:
+    def __init__(self, loop, maxsize):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def _put(self, item):
+        # Slow client: drop the oldest event rather than blocking publishers
+        if self.queue.full():
+            try:
+                self.queue.get_nowait()
+                self.dropped += 1
+            except asyncio.QueueEmpty:
+                pass
+        self.queue.put_nowait(item)
+
+
+class EventChannel:
+    def __init__(self, maxsize=1000):
+        self.maxsize = maxsize
+        self.subscribers = set()
+        self.lock = threading.Lock()
+
+    def subscribe(self):
+        """Must be called from the event loop that will consume the events."""
+        sub = Subscription(asyncio.get_running_loop(), self.maxsize)
+        with self.lock:
+            self.subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub):
+        with self.lock:
+            self.subscribers.discard(sub)
+
+    def publish(self, event, data):
+        """Thread safe, never blocks."""
+        with self.lock:
+            subs = list(self.subscribers)
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub._put, (event, data))
+            except RuntimeError:
+                # Loop already closed
+                self.unsubscribe(sub)
+
+
+def sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def sse_stream(channel, initial=(), keepalive=15.0, until=None):
+    """
+    Async generator of SSE frames for one client. `initial` events are sent
+    first; it may be a callable, evaluated after subscribing so nothing
+    published in between is missed. A comment line keeps idle connections
+    open. Stops after an event whose name is in `until`.
+    """
+    sub = channel.subscribe()
+    try:
+        if callable(initial):
+            initial = initial()
+        for event, data in initial:
+            yield sse(event, data)
+            if until and event in until:
+                return
+        while True:
+            try:
+                event, data = await asyncio.wait_for(sub.queue.get(), keepalive)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            yield sse(event, data)
+            if until and event in until:
+                break
+    finally:
+        channel.unsubscribe(sub)
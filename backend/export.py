@@ -0,0 +1,141 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from backend.database import db
+
+# Streaming exports for SIEM pulls. Rows are read in keyset pages, each on
+# a pooled reader that is returned between pages, so a slow client neither
+# pins a WAL snapshot nor grows memory with the table size.
+
+PAGE_SIZE = 1000
+
+# dataset -> table, keyset column, time column and the format it is stored in
+DATASETS = {
+    "devices": {"table": "devices", "key": "mac", "time": "last_seen", "time_format": "%Y-%m-%d %H:%M:%S"},
+    "known_devices": {"table": "known_devices", "key": "mac", "time": "last_seen", "time_format": None},
+    "bettercap_logs": {"table": "bettercap_logs", "key": "id", "time": "timestamp", "time_format": None},
+}
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+
+def _time_bound(value, time_format):
+    """Normalize an ISO time to the column's text format (None = isoformat)."""
+    if value is None:
+        return None
+    when = datetime.fromisoformat(value)
+    return when.strftime(time_format) if time_format else when.isoformat()
+
+
+def table_rows(dataset, since=None, until=None, page_size=PAGE_SIZE):
+    """Yield (columns, row tuple) for a table export, `since` <= time < `until`."""
+    spec = DATASETS[dataset]
+    since = _time_bound(since, spec["time_format"])
+    until = _time_bound(until, spec["time_format"])
+    where = ""
+    params = []
+    if since:
+        where += f" AND {spec['time']} >= ?"
+        params.append(since)
+    if until:
+        where += f" AND {spec['time']} < ?"
+        params.append(until)
+
+    last = None
+    while True:
+        query = f"SELECT * FROM {spec['table']} WHERE 1=1{where}"
+        page_params = list(params)
+        if last is not None:
+            query += f" AND {spec['key']} > ?"
+            page_params.append(last)
+        query += f" ORDER BY {spec['key']} LIMIT ?"
+        page_params.append(page_size)
+        with db.reader() as conn:
+            cur = conn.execute(query, page_params)
+            columns = [d[0] for d in cur.description]
+            rows = cur.fetchall()
+        for row in rows:
+            yield columns, tuple(row)
+        if len(rows) < page_size:
+            return
+        last = rows[-1][spec["key"]]
+
+
+def intrusion_rows(since=None, until=None):
+    """Honeypot intrusions live in memory (the last 50); same shape as table_rows."""
+    from backend.honeypot import honeypot_runner
+    with honeypot_runner.lock:
+        intrusions = list(honeypot_runner.intrusions)
+    since = _time_bound(since, None)
+    until = _time_bound(until, None)
+    columns = ["timestamp", "time", "ip", "port", "risk"]
+    # Stored newest first
+    for item in reversed(intrusions):
+        ts = item.get("timestamp")
+        if (since and (not ts or ts < since)) or (until and (not ts or ts >= until)):
+            continue
+        yield columns, tuple(item.get(c) for c in columns)
+
+
+def encode(rows, fmt="ndjson"):
+    """Turn (columns, row) pairs into NDJSON lines or CSV with a header."""
+    if fmt == "csv":
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        header = False
+        for columns, row in rows:
+            if not header:
+                writer.writerow(columns)
+                header = True
+            writer.writerow(row)
+            if buf.tell() >= 65536:
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        if buf.tell():
+            yield buf.getvalue()
+        return
+
+    chunk = []
+    size = 0
+    for columns, row in rows:
+        line = json.dumps(dict(zip(columns, row)), default=str) + "\n"
+        chunk.append(line)
+        size += len(line)
+        if size >= 65536:
+            yield "".join(chunk)
+            chunk = []
+            size = 0
+    if chunk:
+        yield "".join(chunk)
+
+
+def gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode("utf-8"))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(dataset, fmt="ndjson", since=None, until=None, gzip=False):
+    """
+    Byte/str chunk generator for one export. Raises KeyError for unknown
+    datasets and ValueError for unknown formats or bad times, before
+    streaming starts.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown format '{fmt}', use one of {', '.join(FORMATS)}")
+    # Validate the bounds now, not halfway through the response
+    _time_bound(since, None)
+    _time_bound(until, None)
+    if dataset == "intrusions":
+        rows = intrusion_rows(since, until)
+    elif dataset in DATASETS:
+        rows = table_rows(dataset, since, until)
+    else:
+        raise KeyError(dataset)
+    chunks = encode(rows, fmt)
+    return gzip_stream(chunks) if gzip else chunks
@@ -0,0 +1,182 @@
+import json
+from datetime import datetime
+from backend.database import db
+
+# Scan history as deltas. Every recorded scan gets a scan_usage row; only
+# devices that joined, left or changed ip/name/vendor since the previous
+# scan are stored in scan_changes. Every CHECKPOINT_EVERY scans the full
+# inventory goes into scan_usage.snapshot so rebuilding a past inventory
+# only replays a bounded number of deltas.
+#
+# history_state mirrors the inventory as of the last recorded scan, which
+# lets the next delta be computed with a few joins.
+
+CHECKPOINT_EVERY = 50
+FIELDS = ("ip", "name", "vendor")
+TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def init_history():
+    with db.writer() as conn:
+        c = conn.cursor()
+        c.execute('''CREATE TABLE IF NOT EXISTS scan_changes (
+            scan_id INTEGER,
+            mac TEXT,
+            change TEXT,
+            ip TEXT,
+            name TEXT,
+            vendor TEXT
+        )''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_scan_changes_scan ON scan_changes (scan_id)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_scan_changes_mac ON scan_changes (mac, scan_id)")
+        c.execute('''CREATE TABLE IF NOT EXISTS history_state (
+            mac TEXT PRIMARY KEY,
+            ip TEXT,
+            name TEXT,
+            vendor TEXT
+        )''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_scan_usage_time ON scan_usage (timestamp)")
+
+
+def record_scan():
+    """
+    Record the current online inventory as a new scan. Returns
+    {"scan_id", "joined", "left", "changed", "checkpoint"}.
+    """
+    now = datetime.now().strftime(TIME_FORMAT)
+    with db.writer() as conn:
+        c = conn.cursor()
+        c.execute("CREATE TEMP TABLE IF NOT EXISTS scan_current (mac TEXT PRIMARY KEY, ip TEXT, name TEXT, vendor TEXT)")
+        c.execute("DELETE FROM scan_current")
+        c.execute("INSERT INTO scan_current SELECT mac, ip, name, vendor FROM devices WHERE status='online'")
+        count = c.execute("SELECT COUNT(*) FROM scan_current").fetchone()[0]
+
+        c.execute("INSERT INTO scan_usage (timestamp, device_count, snapshot) VALUES (?, ?, NULL)", (now, count))
+        scan_id = c.lastrowid
+
+        c.execute('''INSERT INTO scan_changes
+            SELECT ?, n.mac, 'joined', n.ip, n.name, n.vendor FROM scan_current n
+            WHERE n.mac NOT IN (SELECT mac FROM history_state)''', (scan_id,))
+        joined = c.rowcount
+        c.execute('''INSERT INTO scan_changes
+            SELECT ?, s.mac, 'left', s.ip, s.name, s.vendor FROM history_state s
+            WHERE s.mac NOT IN (SELECT mac FROM scan_current)''', (scan_id,))
+        left = c.rowcount
+        c.execute('''INSERT INTO scan_changes
+            SELECT ?, n.mac, 'changed', n.ip, n.name, n.vendor
+            FROM scan_current n JOIN history_state s ON s.mac = n.mac
+            WHERE n.ip IS NOT s.ip OR n.name IS NOT s.name OR n.vendor IS NOT s.vendor''', (scan_id,))
+        changed = c.rowcount
+
+        if joined or left or changed:
+            c.execute("DELETE FROM history_state")
+            c.execute("INSERT INTO history_state SELECT * FROM scan_current")
+
+        # First scan, or CHECKPOINT_EVERY scans since the last checkpoint
+        last = c.execute("SELECT MAX(id) FROM scan_usage WHERE snapshot IS NOT NULL").fetchone()[0]
+        since = c.execute("SELECT COUNT(*) FROM scan_usage WHERE id > ?", (last or 0,)).fetchone()[0]
+        checkpoint = last is None or since >= CHECKPOINT_EVERY
+        if checkpoint:
+            rows = c.execute("SELECT mac, ip, name, vendor FROM history_state ORDER BY mac").fetchall()
+            snapshot = {r["mac"]: [r["ip"], r["name"], r["vendor"]] for r in rows}
+            c.execute("UPDATE scan_usage SET snapshot=? WHERE id=?", (json.dumps(snapshot), scan_id))
+
+    return {"scan_id": scan_id, "joined": joined, "left": left, "changed": changed, "checkpoint": checkpoint}
+
+
+def _normalize_time(when):
+    """Accept ISO strings or unix timestamps, return the stored text format."""
+    if isinstance(when, (int, float)):
+        try:
+            return datetime.fromtimestamp(when).strftime(TIME_FORMAT)
+        except (OverflowError, OSError) as e:
+            # Out of the platform's range (1e20, inf); callers answer bad input on ValueError
+            raise ValueError(f"Timestamp out of range: {when}") from e
+    return datetime.fromisoformat(str(when)).strftime(TIME_FORMAT)
+
+
+def list_scans(limit=100, before=None):
+    """Recorded scans, newest first, with change counts."""
+    query = '''SELECT u.id, u.timestamp, u.device_count, u.snapshot IS NOT NULL AS checkpoint,
+        (SELECT COUNT(*) FROM scan_changes WHERE scan_id=u.id AND change='joined') AS joined,
+        (SELECT COUNT(*) FROM scan_changes WHERE scan_id=u.id AND change='left') AS left,
+        (SELECT COUNT(*) FROM scan_changes WHERE scan_id=u.id AND change='changed') AS changed
+        FROM scan_usage u'''
+    params = []
+    if before is not None:
+        query += " WHERE u.id < ?"
+        params.append(before)
+    query += " ORDER BY u.id DESC LIMIT ?"
+    params.append(limit)
+    with db.reader() as conn:
+        rows = conn.execute(query, params).fetchall()
+    return [dict(r, checkpoint=bool(r["checkpoint"])) for r in rows]
+
+
+def inventory_at(when):
+    """
+    Rebuild the inventory as of the last scan at or before `when`. Returns
+    {"scan_id", "timestamp", "devices": [...]} or None before the first scan.
+    """
+    with db.reader() as conn:
+        scan = conn.execute("SELECT id, timestamp FROM scan_usage WHERE timestamp <= ? "
+                            "ORDER BY id DESC LIMIT 1", (_normalize_time(when),)).fetchone()
+        if scan is None:
+            return None
+        base = conn.execute("SELECT id, snapshot FROM scan_usage WHERE id <= ? AND snapshot IS NOT NULL "
+                            "ORDER BY id DESC LIMIT 1", (scan["id"],)).fetchone()
+        state = {}
+        start = 0
+        if base is not None:
+            start = base["id"]
+            for mac, values in json.loads(base["snapshot"]).items():
+                state[mac] = dict(zip(FIELDS, values))
+        changes = conn.execute("SELECT mac, change, ip, name, vendor FROM scan_changes "
+                               "WHERE scan_id > ? AND scan_id <= ? ORDER BY scan_id",
+                               (start, scan["id"])).fetchall()
+
+    for r in changes:
+        if r["change"] == "left":
+            state.pop(r["mac"], None)
+        else:
+            state[r["mac"]] = {"ip": r["ip"], "name": r["name"], "vendor": r["vendor"]}
+
+    devices = [dict(v, mac=mac) for mac, v in sorted(state.items())]
+    return {"scan_id": scan["id"], "timestamp": scan["timestamp"], "devices": devices}
+
+
+def diff_scans(from_id, to_id):
+    """
+    Net changes between two recorded scans, computed from the deltas only:
+    {"from", "to", "joined": [...], "left": [...], "changed": [{"mac", "before", "after"}]}.
+    """
+    if from_id > to_id:
+        from_id, to_id = to_id, from_id
+    with db.reader() as conn:
+        rows = conn.execute("SELECT scan_id, mac, change, ip, name, vendor FROM scan_changes "
+                            "WHERE scan_id > ? AND scan_id <= ? ORDER BY scan_id",
+                            (from_id, to_id)).fetchall()
+        after = {}
+        for r in rows:
+            after[r["mac"]] = None if r["change"] == "left" else {f: r[f] for f in FIELDS}
+
+        # State of each touched device at from_id: its latest change up to then
+        before = {}
+        for mac in after:
+            r = conn.execute("SELECT change, ip, name, vendor FROM scan_changes WHERE mac=? AND scan_id <= ? "
+                             "ORDER BY scan_id DESC LIMIT 1", (mac, from_id)).fetchone()
+            before[mac] = None if r is None or r["change"] == "left" else {f: r[f] for f in FIELDS}
+
+    result = {"from": from_id, "to": to_id, "joined": [], "left": [], "changed": []}
+    for mac in sorted(after):
+        old, new = before[mac], after[mac]
+        if old is None and new is not None:
+            result["joined"].append(dict(new, mac=mac))
+        elif old is not None and new is None:
+            result["left"].append(dict(old, mac=mac))
+        elif old is not None and old != new:
+            result["changed"].append({"mac": mac, "before": old, "after": new})
+    return result
+
+
+init_history()
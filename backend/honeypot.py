@@ -72,13 +72,15 @@ class HoneyPortService:
                 ip = addr[0]
                 
                 # Log Intrusion
-                timestamp = datetime.now().strftime("%H:%M:%S")
+                now = datetime.now()
+                timestamp = now.strftime("%H:%M:%S")
                 print(f"[!] HONEYPOT PORT {port} TRIGGERED by {ip}")
                 
                 with self.lock:
                     self.intrusions.insert(0, {
                         "ip": ip,
                         "time": timestamp,
+                        "timestamp": now.isoformat(),
                         "port": port,
                         "risk": "CRITICAL" if port in [80, 443] else "HIGH"
                     })
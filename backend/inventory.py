@@ -0,0 +1,172 @@
+import threading
+import time
+from backend.database import db, _device_dict, get_untrusted_devices
+
+# In-memory copy of the devices table for the dashboard endpoints.
+#
+# Write-through: the device writers in backend.database stage the rows they
+# changed (read back inside their transaction, after the version triggers
+# ran) and db.on_change hands them to apply_changes() once the transaction
+# commits, so a running scan never sends reads back to SQLite. The cost is
+# one primary-key read-back of the touched rows per write.
+#
+# Writers in other processes are not seen: they call invalidate() (or
+# POST /api/inventory/invalidate), and the cache re-checks the table on its
+# own every MAX_AGE seconds, pulling only rows whose row_version or
+# last_seen moved.
+
+MAX_AGE = 30.0
+
+
+class InventoryCache:
+    def __init__(self, max_age=MAX_AGE):
+        self.max_age = max_age
+        self.lock = threading.RLock()
+        self.devices = {}        # mac -> device dict, as get_all_devices builds it
+        self.version = None      # inventory_version the cache reflects
+        self.seen_mark = ""      # newest last_seen loaded
+        self.untrusted = []
+        self.untrusted_stale = True
+        self.dirty = True
+        self.reload = True
+        self.checked = 0.0
+        self._ordered = None
+        self._aggregates = None
+        self.counters = {"hits": 0, "refreshes": 0, "reloads": 0, "rows_applied": 0, "writes_applied": 0}
+
+    def invalidate(self):
+        """Drop everything; the next read reloads the table."""
+        with self.lock:
+            self.reload = True
+            self.dirty = True
+
+    def _load(self):
+        with db.reader() as conn:
+            conn.execute("BEGIN")
+            version = conn.execute("SELECT version FROM inventory_version").fetchone()[0]
+            rows = conn.execute("SELECT * FROM devices").fetchall()
+            conn.execute("COMMIT")
+        self.devices = {}
+        self._apply(rows)
+        self.version = version
+        self.counters["reloads"] += 1
+
+    def _refresh(self):
+        # Same-second rows are read again (>=), harmless and cheap
+        with db.reader() as conn:
+            conn.execute("BEGIN")
+            version = conn.execute("SELECT version FROM inventory_version").fetchone()[0]
+            rows = conn.execute("SELECT * FROM devices WHERE row_version > ? OR last_seen >= ?",
+                                (self.version, self.seen_mark)).fetchall()
+            conn.execute("COMMIT")
+        self._apply(rows)
+        self.version = max(self.version, version)
+        self.counters["refreshes"] += 1
+
+    def apply_changes(self, changes):
+        """db.on_change listener: fold committed device rows into the cache."""
+        with self.lock:
+            for kind, payload in changes:
+                if kind == "known_devices":
+                    self.untrusted_stale = True
+                elif kind == "devices" and not self.reload:
+                    version, rows = payload
+                    self._apply(rows)
+                    self.version = max(self.version or 0, version)
+                    self.counters["writes_applied"] += len(rows)
+
+    def _apply(self, rows):
+        for row in rows:
+            d = _device_dict(row)
+            current = self.devices.get(d['mac'])
+            # A refresh snapshot can be older than rows written through meanwhile
+            if current and ((d['row_version'] or 0) < (current['row_version'] or 0)
+                            or (d['last_seen'] or "") < (current['last_seen'] or "")):
+                continue
+            self.devices[d['mac']] = d
+            if d['last_seen'] and d['last_seen'] > self.seen_mark:
+                self.seen_mark = d['last_seen']
+        if rows:
+            self.counters["rows_applied"] += len(rows)
+            self._ordered = None
+            self._aggregates = None
+
+    def _ensure(self):
+        now = time.monotonic()
+        with self.lock:
+            if not self.dirty and now - self.checked < self.max_age:
+                if self.untrusted_stale:
+                    self._load_untrusted()
+                self.counters["hits"] += 1
+                return
+            self.dirty = False
+            self.checked = now
+            try:
+                if self.reload:
+                    self._load()
+                    self.reload = False
+                else:
+                    self._refresh()
+            except:
+                self.dirty = True
+                raise
+            self._load_untrusted()
+
+    def _load_untrusted(self):
+        self.untrusted_stale = False
+        try:
+            self.untrusted = get_untrusted_devices()
+        except Exception:
+            # known_devices is created by the bettercap service
+            self.untrusted = []
+        self._aggregates = None
+
+    def get_devices(self):
+        """All devices, newest last_seen first. Treat the result as read-only."""
+        self._ensure()
+        with self.lock:
+            if self._ordered is None:
+                self._ordered = sorted(self.devices.values(), key=lambda d: d['last_seen'] or "", reverse=True)
+            return self._ordered
+
+    def get_version(self):
+        self._ensure()
+        return self.version
+
+    def get_tag_state(self):
+        """(inventory version, newest last_seen) for ETags."""
+        self._ensure()
+        with self.lock:
+            return self.version, self.seen_mark
+
+    def get_untrusted(self):
+        self._ensure()
+        return self.untrusted
+
+    def get_aggregates(self):
+        self._ensure()
+        with self.lock:
+            if self._aggregates is None:
+                by_type = {}
+                online = 0
+                for d in self.devices.values():
+                    if d['status'] == 'online':
+                        online += 1
+                    by_type[d['type'] or 'unknown'] = by_type.get(d['type'] or 'unknown', 0) + 1
+                self._aggregates = {
+                    "version": self.version,
+                    "total": len(self.devices),
+                    "online": online,
+                    "offline": len(self.devices) - online,
+                    "untrusted": len(self.untrusted),
+                    "by_type": by_type
+                }
+            return self._aggregates
+
+    def stats(self):
+        with self.lock:
+            return dict(self.counters, devices=len(self.devices), version=self.version, dirty=self.dirty)
+
+
+inventory = InventoryCache()
+db.on_change(inventory.apply_changes)
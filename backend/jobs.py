@@ -0,0 +1,186 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from backend.events import EventChannel
+
+# Background jobs for slow /api/execute commands. A job runs on a bounded
+# executor and records its output lines as they arrive; clients poll
+# /api/jobs/{id}, stream it over SSE, cancel it, or fetch the finished
+# result again later without re-running the command.
+#
+#   NETGUARDIAN_JOB_WORKERS   concurrent jobs, default 4
+#   NETGUARDIAN_JOB_QUEUE     queued jobs beyond that before refusing, default 32
+
+MAX_OUTPUT_LINES = 5000
+KEEP_FINISHED = 200      # finished jobs kept for re-fetch
+FINISHED_TTL = 3600      # seconds
+
+
+class JobQueueFull(RuntimeError):
+    pass
+
+
+class Job:
+    def __init__(self, command, args, parser=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.command = command
+        self.args = args
+        self.status = "queued"   # queued, running, done, error, cancelled
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.output = []
+        self.truncated = 0
+        self.result = None
+        self.error = None
+        self.parser = parser     # output line -> progress dict (hop N, RTT, ...)
+        self.progress = None     # latest progress event
+        self.cancel_event = threading.Event()
+        self.events = EventChannel()
+        self.lock = threading.Lock()
+
+    @property
+    def done(self):
+        return self.status in ("done", "error", "cancelled")
+
+    def emit(self, line):
+        """Record one line of partial output (passed to tools as on_line)."""
+        line = line.rstrip("\r\n")
+        with self.lock:
+            seq = len(self.output) + self.truncated
+            self.output.append(line)
+            if len(self.output) > MAX_OUTPUT_LINES:
+                self.output.pop(0)
+                self.truncated += 1
+        self.events.publish("output", {"seq": seq, "line": line})
+        if self.parser:
+            try:
+                progress = self.parser(line)
+            except Exception:
+                progress = None
+            if progress:
+                self.progress = progress
+                self.events.publish("progress", progress)
+
+    def lines_since(self, offset=0):
+        """(lines, next offset). Offsets count every line ever emitted."""
+        with self.lock:
+            start = max(0, offset - self.truncated)
+            return list(self.output[start:]), self.truncated + len(self.output)
+
+    def _finish(self, status, result=None, error=None):
+        with self.lock:
+            if self.done:
+                return
+            self.status = status
+            self.result = result
+            self.error = error
+            self.finished = time.time()
+        self.events.publish("end", self.to_dict(with_result=True))
+
+    def to_dict(self, with_result=False):
+        d = {
+            "id": self.id,
+            "command": self.command,
+            "args": self.args,
+            "status": self.status,
+            "created": datetime.fromtimestamp(self.created).isoformat(),
+            "started": datetime.fromtimestamp(self.started).isoformat() if self.started else None,
+            "finished": datetime.fromtimestamp(self.finished).isoformat() if self.finished else None,
+            "lines": self.truncated + len(self.output),
+            "progress": self.progress,
+            "error": self.error
+        }
+        if with_result:
+            d["result"] = self.result
+        return d
+
+
+class JobManager:
+    def __init__(self, workers=4, max_queue=32):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(workers=int(os.environ.get("NETGUARDIAN_JOB_WORKERS", 4)),
+                   max_queue=int(os.environ.get("NETGUARDIAN_JOB_QUEUE", 32)))
+
+    def _prune(self):
+        now = time.time()
+        finished = sorted((j for j in self.jobs.values() if j.done), key=lambda j: j.finished)
+        excess = len(finished) - KEEP_FINISHED
+        for j in finished:
+            if excess > 0 or now - j.finished > FINISHED_TTL:
+                del self.jobs[j.id]
+                excess -= 1
+
+    def submit(self, command, args, fn, parser=None):
+        """
+        Queue fn(job) and return the Job at once. fn returns the result and
+        may use job.emit / job.cancel_event. Raises JobQueueFull.
+        """
+        with self.lock:
+            self._prune()
+            waiting = sum(1 for j in self.jobs.values() if j.status == "queued")
+            if waiting >= self.max_queue:
+                raise JobQueueFull(f"{waiting} jobs waiting")
+            job = Job(command, args, parser)
+            self.jobs[job.id] = job
+        self.executor.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job, fn):
+        with job.lock:
+            # Cancelled while queued: cancel() already finished it
+            if job.status != "queued" or job.cancel_event.is_set():
+                return
+            job.status = "running"
+            job.started = time.time()
+        job.events.publish("status", job.to_dict())
+        try:
+            result = fn(job)
+        except Exception as e:
+            job._finish("error", error=str(e))
+            return
+        if job.cancel_event.is_set():
+            # Commands that cannot be interrupted finish, their result is dropped
+            job._finish("cancelled")
+        else:
+            job._finish("done", result=result)
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is None:
+            return None
+        with job.lock:
+            job.cancel_event.set()
+            queued = job.status == "queued"
+        if queued:
+            job._finish("cancelled")
+        return job
+
+    def list(self):
+        with self.lock:
+            jobs = sorted(self.jobs.values(), key=lambda j: j.created, reverse=True)
+        return [j.to_dict() for j in jobs]
+
+    def stats(self):
+        with self.lock:
+            counts = {}
+            for j in self.jobs.values():
+                counts[j.status] = counts.get(j.status, 0) + 1
+        return {"workers": self.workers, "max_queue": self.max_queue, "jobs": counts}
+
+
+jobs = JobManager.from_env()
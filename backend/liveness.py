@@ -0,0 +1,148 @@
+import time
+import ipaddress
+import threading
+from datetime import datetime
+
+# Adaptive re-probe interval (seconds). A host that keeps the same state
+# backs off towards MAX_INTERVAL, any state change resets it to MIN_INTERVAL.
+MIN_INTERVAL = 30
+MAX_INTERVAL = 15 * 60
+BACKOFF = 2.0
+
+# A host that changed state within this window counts as "recently changed"
+CHANGE_WINDOW = 10 * 60
+
+
+class HostState:
+    __slots__ = ("alive", "last_probe", "last_change", "interval", "flaps")
+
+    def __init__(self):
+        self.alive = None       # None = never probed
+        self.last_probe = 0.0
+        self.last_change = 0.0
+        self.interval = MIN_INTERVAL
+        self.flaps = 0          # state changes, halved on every stable probe
+
+    def due_at(self):
+        return self.last_probe + self.interval
+
+
+class LivenessTracker:
+    """
+    Per-address liveness history used by incremental scans.
+    Decides which addresses to probe next: unknown ones first, then
+    recently changed (flapping) ones, then stale ones by how overdue they are.
+    """
+
+    def __init__(self):
+        self.hosts = {}  # ip -> HostState
+        self.lock = threading.Lock()
+        self.seeded = False
+        self._cursor = None
+        self._cursor_key = None
+        self._exhausted_at = 0.0
+
+    def seed_from_db(self):
+        """Start from what the devices table already knows."""
+        from backend.database import get_all_devices
+        with self.lock:
+            if self.seeded:
+                return
+            self.seeded = True
+        try:
+            for d in get_all_devices():
+                if not d.get('ip'):
+                    continue
+                try:
+                    seen = datetime.strptime(d['last_seen'], "%Y-%m-%d %H:%M:%S").timestamp()
+                except (TypeError, ValueError):
+                    seen = 0.0
+                with self.lock:
+                    state = self.hosts.setdefault(d['ip'], HostState())
+                    state.alive = d.get('status') == 'online'
+                    # last_seen is not when the status flipped; leave last_change
+                    # unset so a restart does not make every host look recently changed
+                    state.last_probe = seen
+        except Exception as e:
+            print(f"Liveness seed error: {e}")
+
+    def record(self, ip, alive, now=None):
+        now = now or time.time()
+        with self.lock:
+            state = self.hosts.get(ip)
+            if state is None:
+                state = self.hosts[ip] = HostState()
+            if state.alive is None:
+                state.interval = MIN_INTERVAL
+            elif state.alive != alive:
+                state.flaps += 1
+                state.last_change = now
+                state.interval = MIN_INTERVAL
+            else:
+                state.flaps //= 2
+                state.interval = min(state.interval * BACKOFF, MAX_INTERVAL)
+            state.alive = alive
+            state.last_probe = now
+
+    def get(self, ip):
+        with self.lock:
+            return self.hosts.get(ip)
+
+    def _unknown(self, networks, limit, now):
+        """Pull up to `limit` never-probed addresses, resuming where we stopped."""
+        from backend.scanner import iter_hosts
+        key = tuple(networks)
+        if self._cursor_key != key:
+            self._cursor_key = key
+            self._cursor = iter_hosts(networks)
+        elif self._cursor is None:
+            # Ranges were fully walked; look again now and then for addresses
+            # that were planned but never probed (cancelled scans)
+            if now - self._exhausted_at < MAX_INTERVAL:
+                return []
+            self._cursor = iter_hosts(networks)
+        found = []
+        while len(found) < limit:
+            try:
+                ip = next(self._cursor)
+            except StopIteration:
+                self._cursor = None
+                self._exhausted_at = now
+                break
+            if ip not in self.hosts:
+                found.append(ip)
+        return found
+
+    def plan(self, networks, budget, now=None):
+        """Return at most `budget` addresses that should be probed now, most urgent first."""
+        now = now or time.time()
+        if not self.seeded:
+            self.seed_from_db()
+
+        with self.lock:
+            due = []
+            for ip, state in self.hosts.items():
+                if state.due_at() > now:
+                    continue
+                addr = ipaddress.ip_address(ip)
+                if not any(addr in n for n in networks):
+                    continue
+                recent = now - state.last_change < CHANGE_WINDOW
+                overdue = (now - state.last_probe) / state.interval
+                # Recently changed first, then by how overdue (flapping hosts weigh more)
+                due.append((0 if recent else 1, -(overdue * (1 + state.flaps)), ip))
+            due.sort()
+
+            # Unknown addresses get up to half the budget, more if little is due
+            unknown_quota = max(budget // 2, budget - len(due))
+            unknown = self._unknown(networks, unknown_quota, now)
+
+        return unknown + [ip for _, _, ip in due[:budget - len(unknown)]]
+
+    def stats(self):
+        with self.lock:
+            alive = sum(1 for s in self.hosts.values() if s.alive)
+            return {"tracked": len(self.hosts), "alive": alive}
+
+
+liveness = LivenessTracker()
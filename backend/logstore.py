@@ -0,0 +1,269 @@
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from backend.database import db
+
+# Housekeeping for bettercap_logs, which gets one row per sniffed DNS/SNI
+# line. A background job:
+#   1. rolls raw rows up into bettercap_logs_hourly (count per hour, device,
+#      platform and traffic type), tracked by a high-water mark on the id
+#   2. deletes raw rows older than the retention window, in small batches
+#      so scans and the dashboard are not locked out meanwhile
+#   3. drops rollups past their own (much longer) retention
+#   4. returns free pages to the filesystem with an incremental vacuum
+#      (databases created before this need a one-time full VACUUM to switch
+#      mode; it blocks every writer while it runs, so it is opt-in)
+# Summaries over long periods read the rollups plus the not yet rolled tail.
+#
+#   NETGUARDIAN_LOG_RETENTION_DAYS       raw rows, default 7
+#   NETGUARDIAN_ROLLUP_RETENTION_DAYS    hourly rollups, default 365
+#   NETGUARDIAN_LOG_MAINTENANCE_INTERVAL seconds between runs, default 900, 0 disables
+#   NETGUARDIAN_VACUUM_CONVERT           1 = do the one-time full VACUUM on the next run
+
+BATCH_SIZE = 5000
+VACUUM_PAGES = 2000      # pages released per incremental vacuum step
+GROUP_COLUMNS = ("device_ip", "device_mac", "platform", "traffic_type")
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _hour(ts):
+    # ISO timestamps, bucketed the way the rollup SQL does it
+    return str(ts)[:13].replace(" ", "T") + ":00:00"
+
+
+def init_logstore():
+    with db.writer() as conn:
+        c = conn.cursor()
+        c.execute('''CREATE TABLE IF NOT EXISTS bettercap_logs_hourly (
+            hour TEXT,
+            device_ip TEXT,
+            device_mac TEXT,
+            platform TEXT,
+            traffic_type TEXT,
+            count INTEGER,
+            PRIMARY KEY (hour, device_ip, device_mac, platform, traffic_type)
+        )''')
+        c.execute('''CREATE TABLE IF NOT EXISTS log_rollup_state (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            last_id INTEGER
+        )''')
+        c.execute("INSERT OR IGNORE INTO log_rollup_state VALUES (1, 0)")
+        try:
+            c.execute("CREATE INDEX IF NOT EXISTS idx_bettercap_logs_time ON bettercap_logs (timestamp)")
+        except Exception:
+            # bettercap_logs is created by the bettercap service
+            pass
+
+
+class LogMaintenance:
+    def __init__(self, interval=900, retention_days=7, rollup_retention_days=365, convert_vacuum=False):
+        self.interval = interval
+        self.retention_days = retention_days
+        self.rollup_retention_days = rollup_retention_days
+        self.convert_vacuum = convert_vacuum
+        self.vacuum_mode = None
+        self.warned = False
+        self.thread = None
+        self.wake = threading.Event()
+        self.stopped = False
+        self.last_run = None
+        self.last_result = None
+
+    @classmethod
+    def from_env(cls):
+        return cls(interval=_env_float("NETGUARDIAN_LOG_MAINTENANCE_INTERVAL", 900),
+                   retention_days=_env_float("NETGUARDIAN_LOG_RETENTION_DAYS", 7),
+                   rollup_retention_days=_env_float("NETGUARDIAN_ROLLUP_RETENTION_DAYS", 365),
+                   convert_vacuum=os.environ.get("NETGUARDIAN_VACUUM_CONVERT", "0") == "1")
+
+    def rollup(self):
+        """Fold raw rows above the high-water mark into the hourly table. Returns rows folded."""
+        total = 0
+        while True:
+            with db.writer() as conn:
+                last = conn.execute("SELECT last_id FROM log_rollup_state").fetchone()[0]
+                top = conn.execute("SELECT MAX(id) FROM bettercap_logs").fetchone()[0] or 0
+                if top <= last:
+                    return total
+                upper = min(top, last + BATCH_SIZE)
+                conn.execute('''INSERT INTO bettercap_logs_hourly
+                    (hour, device_ip, device_mac, platform, traffic_type, count)
+                    SELECT substr(timestamp, 1, 13) || ':00:00', COALESCE(device_ip, ''),
+                           COALESCE(device_mac, ''), COALESCE(platform, ''),
+                           COALESCE(traffic_type, ''), COUNT(*)
+                    FROM bettercap_logs WHERE id > ? AND id <= ?
+                    GROUP BY 1, 2, 3, 4, 5
+                    ON CONFLICT (hour, device_ip, device_mac, platform, traffic_type)
+                    DO UPDATE SET count = count + excluded.count''', (last, upper))
+                total += conn.execute("SELECT COUNT(*) FROM bettercap_logs WHERE id > ? AND id <= ?",
+                                      (last, upper)).fetchone()[0]
+                conn.execute("UPDATE log_rollup_state SET last_id = ?", (upper,))
+
+    def prune(self):
+        """Delete expired raw rows (only ones already rolled up) and old rollups."""
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+        deleted = 0
+        while not self.stopped:
+            with db.writer() as conn:
+                c = conn.execute('''DELETE FROM bettercap_logs WHERE id IN (
+                    SELECT id FROM bettercap_logs
+                    WHERE id <= (SELECT last_id FROM log_rollup_state) AND timestamp < ?
+                    ORDER BY id LIMIT ?)''', (cutoff, BATCH_SIZE))
+                deleted += c.rowcount
+            if c.rowcount < BATCH_SIZE:
+                break
+            # Let queued writers in between batches
+            time.sleep(0.05)
+
+        rollup_cutoff = _hour(datetime.now() - timedelta(days=self.rollup_retention_days))
+        with db.writer() as conn:
+            conn.execute("DELETE FROM bettercap_logs_hourly WHERE hour < ?", (rollup_cutoff,))
+        return deleted
+
+    def vacuum(self, convert=None):
+        """
+        Incremental vacuum. Databases created before auto_vacuum was enabled
+        need one full VACUUM to switch modes, which rewrites the whole file
+        with every writer blocked; it only runs when asked for (convert or
+        NETGUARDIAN_VACUUM_CONVERT), otherwise freed pages stay in the file.
+        """
+        with db.writer() as conn:
+            mode = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        self.vacuum_mode = mode
+        if mode != 2:
+            if not (self.convert_vacuum if convert is None else convert):
+                if not self.warned:
+                    size = os.path.getsize(db.path) // (1024 * 1024) if os.path.exists(db.path) else 0
+                    print(f"[!] Incremental vacuum skipped: the database ({size} MB) needs a one-time full "
+                          f"VACUUM that blocks all writers. Run POST /api/logs/maintenance?convert_vacuum=true "
+                          f"or set NETGUARDIAN_VACUUM_CONVERT=1 when the sensor is idle.")
+                    self.warned = True
+                return 0
+            print("[*] Enabling incremental auto_vacuum (one-time full VACUUM)...")
+            with db.exclusive() as conn:
+                conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+                conn.execute("VACUUM")
+            self.convert_vacuum = False
+            self.vacuum_mode = 2
+            return 0
+
+        freed = 0
+        while not self.stopped:
+            with db.writer() as conn:
+                free = conn.execute("PRAGMA freelist_count").fetchone()[0]
+                if not free:
+                    break
+                conn.execute(f"PRAGMA incremental_vacuum({VACUUM_PAGES})").fetchall()
+                freed += min(free, VACUUM_PAGES)
+            time.sleep(0.05)
+        return freed
+
+    def run_once(self, convert_vacuum=None):
+        started = time.time()
+        result = {"rolled_up": 0, "deleted": 0, "pages_freed": 0, "error": None}
+        try:
+            init_logstore()
+            result["rolled_up"] = self.rollup()
+            result["deleted"] = self.prune()
+            result["pages_freed"] = self.vacuum(convert_vacuum)
+        except Exception as e:
+            print(f"Log maintenance error: {e}")
+            result["error"] = str(e)
+        result["duration"] = round(time.time() - started, 3)
+        self.last_run = started
+        self.last_result = result
+        return result
+
+    def start(self):
+        if not self.interval or (self.thread and self.thread.is_alive()):
+            return
+        self.stopped = False
+        self.wake.clear()
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped = True
+        self.wake.set()
+
+    def _loop(self):
+        while not self.stopped:
+            self.run_once()
+            self.wake.wait(self.interval)
+
+    def status(self):
+        return {
+            "enabled": bool(self.interval) and not self.stopped and bool(self.thread and self.thread.is_alive()),
+            "interval": self.interval,
+            "retention_days": self.retention_days,
+            "rollup_retention_days": self.rollup_retention_days,
+            "incremental_vacuum": None if self.vacuum_mode is None else self.vacuum_mode == 2,
+            "last_run": datetime.fromtimestamp(self.last_run).isoformat() if self.last_run else None,
+            "last_result": self.last_result
+        }
+
+
+RAW_HOUR = "substr(timestamp, 1, 13) || ':00:00'"
+
+
+def _filters(since, until, equals=()):
+    """(rollup WHERE, raw WHERE, params) for an hour range and column = value pairs."""
+    rollup, raw, params = "", "", []
+    for column, value in equals:
+        if value:
+            rollup += f" AND {column} = ?"
+            raw += f" AND {column} = ?"
+            params.append(value)
+    if since:
+        rollup += " AND hour >= ?"
+        raw += f" AND {RAW_HOUR} >= ?"
+        params.append(_hour(since))
+    if until:
+        rollup += " AND hour <= ?"
+        raw += f" AND {RAW_HOUR} <= ?"
+        params.append(_hour(until))
+    return rollup, raw, params
+
+
+def traffic_summary(since=None, until=None, by=("platform",)):
+    """
+    Log counts grouped by `by` (any of device_ip, device_mac, platform,
+    traffic_type) between two ISO times, hour granularity. Reads the hourly
+    rollups and only the raw rows that have not been rolled up yet.
+    """
+    by = [b for b in by if b in GROUP_COLUMNS] or ["platform"]
+    columns = ", ".join(by)
+    raw_columns = ", ".join(f"COALESCE({b}, '') AS {b}" for b in by)
+    rollup_where, raw_where, params = _filters(since, until)
+    with db.reader() as conn:
+        rows = conn.execute(f'''SELECT {columns}, SUM(count) AS count FROM (
+                SELECT {columns}, count FROM bettercap_logs_hourly WHERE 1=1 {rollup_where}
+                UNION ALL
+                SELECT {raw_columns}, 1 FROM bettercap_logs
+                WHERE id > (SELECT last_id FROM log_rollup_state) {raw_where}
+            ) GROUP BY {columns} ORDER BY count DESC''', params + params).fetchall()
+    return [dict(r) for r in rows]
+
+
+def traffic_timeline(since=None, until=None, platform=None, device_ip=None):
+    """Hourly counts, optionally for one platform or device."""
+    rollup_where, raw_where, params = _filters(since, until, (("platform", platform), ("device_ip", device_ip)))
+    with db.reader() as conn:
+        rows = conn.execute(f'''SELECT hour, SUM(count) AS count FROM (
+                SELECT hour, count FROM bettercap_logs_hourly WHERE 1=1 {rollup_where}
+                UNION ALL
+                SELECT {RAW_HOUR} AS hour, 1 FROM bettercap_logs
+                WHERE id > (SELECT last_id FROM log_rollup_state) {raw_where}
+            ) GROUP BY hour ORDER BY hour''', params + params).fetchall()
+    return [dict(r) for r in rows]
+
+
+init_logstore()
+log_maintenance = LogMaintenance.from_env()
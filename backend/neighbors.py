@@ -0,0 +1,160 @@
+import os
+import re
+import shutil
+import platform
+import subprocess
+
+# Neighbor (ARP) table readers. Every source returns a list of entries:
+# {"ip": "192.168.1.1", "mac": "BC:62:0E:12:35:01", "interface": "eth0", "state": "reachable"}
+# MACs are upper-case and colon separated; incomplete entries and
+# broadcast/multicast addresses are dropped.
+
+PROC_NET_ARP = "/proc/net/arp"
+
+ATF_COM = 0x02  # completed entry flag in /proc/net/arp
+
+MAC_RE = re.compile(r'^([0-9a-fA-F]{1,2}[:-]){5}[0-9a-fA-F]{1,2}$')
+
+
+def normalize_mac(mac):
+    parts = re.split(r'[:-]', mac)
+    return ":".join(p.zfill(2) for p in parts).upper()
+
+
+def _valid_mac(mac):
+    if not MAC_RE.match(mac):
+        return False
+    mac = normalize_mac(mac)
+    # Group bit set = broadcast or multicast (01:00:5E..., 33:33:...), not a host
+    return mac != "00:00:00:00:00:00" and not int(mac[:2], 16) & 0x01
+
+
+def parse_proc_net_arp(text):
+    """Parse the contents of /proc/net/arp."""
+    entries = []
+    lines = text.splitlines()
+    for line in lines[1:]:  # skip header
+        parts = line.split()
+        if len(parts) < 6:
+            continue
+        ip, _hw_type, flags, mac, _mask, device = parts[:6]
+        try:
+            flags = int(flags, 16)
+        except ValueError:
+            continue
+        if not flags & ATF_COM or not _valid_mac(mac):
+            continue
+        entries.append({
+            "ip": ip,
+            "mac": normalize_mac(mac),
+            "interface": device,
+            "state": "permanent" if flags & 0x04 else "reachable"
+        })
+    return entries
+
+
+def parse_ip_neigh(text):
+    """Parse `ip neigh show` output (IPv4 entries only)."""
+    entries = []
+    for line in text.splitlines():
+        parts = line.split()
+        if not parts or ":" in parts[0]:
+            continue  # empty line or IPv6
+        if "lladdr" not in parts:
+            continue  # FAILED / INCOMPLETE
+        mac = parts[parts.index("lladdr") + 1]
+        if not _valid_mac(mac):
+            continue
+        device = parts[parts.index("dev") + 1] if "dev" in parts else ""
+        state = parts[-1].lower() if parts[-1].isupper() else "unknown"
+        if state in ("failed", "incomplete"):
+            continue
+        entries.append({
+            "ip": parts[0],
+            "mac": normalize_mac(mac),
+            "interface": device,
+            "state": state
+        })
+    return entries
+
+
+def parse_arp_a(text):
+    """Parse `arp -a` output (Windows and BSD/macOS layouts)."""
+    entries = []
+    interface = ""
+    for line in text.splitlines():
+        line = line.strip()
+        # Windows section header: "Interface: 192.168.1.10 --- 0x4"
+        if line.lower().startswith("interface:"):
+            interface = line.split(":", 1)[1].split("---")[0].strip()
+            continue
+        # Windows: 192.168.1.1       bc-62-0e-12-35-01     dynamic
+        match = re.search(r'^(\d+\.\d+\.\d+\.\d+)\s+([0-9a-fA-F:-]+)\s+(\w+)', line)
+        if match:
+            ip, mac, state = match.groups()
+            if _valid_mac(mac):
+                entries.append({"ip": ip, "mac": normalize_mac(mac), "interface": interface, "state": state.lower()})
+            continue
+        # BSD/macOS: host (192.168.1.1) at bc:62:e:12:35:1 on en0 ifscope [ethernet]
+        match = re.search(r'\((\d+\.\d+\.\d+\.\d+)\) at ([0-9a-fA-F:]+) on (\S+)', line)
+        if match:
+            ip, mac, device = match.groups()
+            if _valid_mac(mac):
+                entries.append({"ip": ip, "mac": normalize_mac(mac), "interface": device, "state": "reachable"})
+    return entries
+
+
+class ProcNetArpSource:
+    name = "proc"
+
+    def __init__(self, path=PROC_NET_ARP):
+        self.path = path
+
+    def available(self):
+        return os.path.exists(self.path)
+
+    def read(self):
+        with open(self.path) as f:
+            return parse_proc_net_arp(f.read())
+
+
+class IpNeighSource:
+    name = "ip-neigh"
+
+    def available(self):
+        return shutil.which("ip") is not None
+
+    def read(self):
+        out = subprocess.check_output(["ip", "-4", "neigh", "show"], stderr=subprocess.DEVNULL, timeout=5)
+        return parse_ip_neigh(out.decode("utf-8", errors="ignore"))
+
+
+class ArpCommandSource:
+    name = "arp"
+
+    def available(self):
+        return shutil.which("arp") is not None
+
+    def read(self):
+        startupinfo = None
+        if platform.system().lower() == 'windows':
+            startupinfo = subprocess.STARTUPINFO()
+            startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
+        out = subprocess.check_output(["arp", "-a"], stderr=subprocess.DEVNULL, timeout=10, startupinfo=startupinfo)
+        return parse_arp_a(out.decode("cp850", errors="ignore"))
+
+
+# Tried in order, first available source that reads successfully wins
+NEIGHBOR_SOURCES = [ProcNetArpSource(), IpNeighSource(), ArpCommandSource()]
+
+
+def read_neighbors(sources=None):
+    """Return the current neighbor table from the first working source."""
+    for source in (sources or NEIGHBOR_SOURCES):
+        if not source.available():
+            continue
+        try:
+            return source.read()
+        except Exception as e:
+            print(f"Neighbor source '{source.name}' failed: {e}")
+    return []
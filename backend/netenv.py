@@ -0,0 +1,306 @@
+import os
+import select
+import socket
+import struct
+import subprocess
+import threading
+import time
+from datetime import datetime
+
+# Network environment: interfaces, addresses, default gateway and SSID,
+# kept in memory by a background thread so /api/network and /api/health
+# do not spawn ipconfig/netsh on every poll.
+#
+# On Linux the gateway comes from /proc/net/route and the interface list
+# from /proc/net/dev; a netlink socket subscribed to link, address and
+# route changes wakes the refresh as soon as something changes. Elsewhere
+# (Windows) the old ipconfig/netsh parsing runs on the refresh interval.
+#
+#   NETGUARDIAN_NETENV_INTERVAL   seconds between periodic refreshes, default 30
+
+PROC_ROUTE = "/proc/net/route"
+PROC_DEV = "/proc/net/dev"
+PROC_WIRELESS = "/proc/net/wireless"
+
+RTF_UP, RTF_GATEWAY = 0x1, 0x2
+# rtnetlink multicast groups: links, IPv4/IPv6 addresses, IPv4 routes
+RTMGRP_LINK, RTMGRP_IPV4_IFADDR, RTMGRP_IPV4_ROUTE, RTMGRP_IPV6_IFADDR = 0x1, 0x10, 0x40, 0x100
+NETLINK_SETTLE = 0.5     # changes arrive in bursts, refresh once they stop
+NETLINK_MAX_SETTLE = 2 * NETLINK_SETTLE   # ...or after this long, under constant churn
+UNKNOWN_SSID = "Unknown / Wired"
+PLACEHOLDER = {"ip": "Unknown", "gateway": "Unknown", "gateway_interface": None,
+               "ssid": UNKNOWN_SSID, "interfaces": []}
+
+
+def _hex_ip(value):
+    # /proc/net/route stores addresses as little-endian hex
+    return socket.inet_ntoa(struct.pack("<L", int(value, 16)))
+
+
+def read_routes(path=PROC_ROUTE):
+    """IPv4 routes from /proc/net/route as dicts."""
+    routes = []
+    with open(path) as f:
+        next(f)
+        for line in f:
+            parts = line.split()
+            if len(parts) < 8:
+                continue
+            routes.append({
+                "iface": parts[0],
+                "destination": _hex_ip(parts[1]),
+                "gateway": _hex_ip(parts[2]),
+                "flags": int(parts[3], 16),
+                "metric": int(parts[6]),
+                "mask": _hex_ip(parts[7])
+            })
+    return routes
+
+
+def default_route(routes):
+    """(gateway, interface) of the preferred default route, or (None, None)."""
+    defaults = [r for r in routes if r["destination"] == "0.0.0.0" and r["mask"] == "0.0.0.0"
+                and r["flags"] & RTF_UP and r["flags"] & RTF_GATEWAY]
+    if not defaults:
+        return None, None
+    best = min(defaults, key=lambda r: r["metric"])
+    return best["gateway"], best["iface"]
+
+
+def read_proc_net_dev(path=PROC_DEV):
+    """
+    Interface counters from /proc/net/dev: name -> (rx_bytes, rx_packets,
+    rx_errs, rx_drop, tx_bytes, tx_packets, tx_errs, tx_drop).
+    """
+    counters = {}
+    with open(path) as f:
+        for line in f:
+            if ":" not in line:
+                continue
+            name, data = line.split(":", 1)
+            v = data.split()
+            if len(v) < 12:
+                continue
+            counters[name.strip()] = (int(v[0]), int(v[1]), int(v[2]), int(v[3]),
+                                      int(v[8]), int(v[9]), int(v[10]), int(v[11]))
+    return counters
+
+
+def _wireless_interfaces(path=PROC_WIRELESS):
+    try:
+        with open(path) as f:
+            return [line.split(":", 1)[0].strip() for line in f if ":" in line]
+    except OSError:
+        return []
+
+
+def _linux_ssid(iface):
+    try:
+        out = subprocess.check_output(["iwgetid", iface, "-r"], stderr=subprocess.DEVNULL, timeout=3)
+        return out.decode(errors="ignore").strip() or None
+    except Exception:
+        return None
+
+
+def _windows_ssid():
+    try:
+        out = subprocess.check_output("netsh wlan show interfaces", shell=True, timeout=5).decode('cp850', errors='ignore')
+        for line in out.split('\n'):
+            line = line.strip()
+            if line.startswith("SSID") and ":" in line:
+                return line.split(":")[1].strip()
+    except:
+        pass
+    return None
+
+
+def _interfaces():
+    import psutil
+    addrs = psutil.net_if_addrs()
+    stats = psutil.net_if_stats()
+    result = {}
+    for name, items in addrs.items():
+        st = stats.get(name)
+        iface = {"name": name, "mac": None, "ipv4": [], "ipv6": [],
+                 "up": st.isup if st else None, "speed": st.speed if st else None,
+                 "mtu": st.mtu if st else None}
+        for a in items:
+            if a.family == socket.AF_INET:
+                iface["ipv4"].append({"address": a.address, "netmask": a.netmask})
+            elif a.family == socket.AF_INET6:
+                iface["ipv6"].append({"address": a.address.split("%")[0], "netmask": a.netmask})
+            elif a.family == getattr(psutil, "AF_LINK", None) or a.family == getattr(socket, "AF_PACKET", None):
+                iface["mac"] = a.address
+        result[name] = iface
+    return result
+
+
+class NetworkEnvironment:
+    def __init__(self, interval=30):
+        self.interval = interval
+        self.linux = os.path.exists(PROC_ROUTE)
+        self.lock = threading.Lock()
+        self.snapshot = None
+        self.version = 0
+        self.changed = None
+        self.refreshes = 0
+        self.thread = None
+        self.stopped = False
+        self.wake = threading.Event()
+        self.wake_pipe = None    # (read fd, write fd), interrupts the netlink select()
+
+    @classmethod
+    def from_env(cls):
+        try:
+            interval = float(os.environ.get("NETGUARDIAN_NETENV_INTERVAL", 30))
+        except ValueError:
+            interval = 30
+        return cls(interval=interval)
+
+    def _collect(self):
+        gateway = gateway_iface = None
+        interfaces = {}
+        try:
+            interfaces = _interfaces()
+        except Exception as e:
+            print(f"Interface read error: {e}")
+
+        if self.linux:
+            try:
+                gateway, gateway_iface = default_route(read_routes())
+            except Exception as e:
+                print(f"Route read error: {e}")
+            try:
+                # Interfaces without addresses still show up in /proc/net/dev
+                for name in read_proc_net_dev():
+                    interfaces.setdefault(name, {"name": name, "mac": None, "ipv4": [], "ipv6": [],
+                                                 "up": None, "speed": None, "mtu": None})
+            except Exception:
+                pass
+            ssid = None
+            wireless = _wireless_interfaces()
+            for name in ([gateway_iface] if gateway_iface in wireless else []) + wireless:
+                ssid = _linux_ssid(name)
+                if ssid:
+                    break
+        else:
+            from backend.scanner import get_gateway
+            gateway = get_gateway()
+            gateway = None if gateway == "Unknown" else gateway
+            ssid = _windows_ssid()
+
+        ip = None
+        if gateway_iface in interfaces and interfaces[gateway_iface]["ipv4"]:
+            ip = interfaces[gateway_iface]["ipv4"][0]["address"]
+        if ip is None:
+            from backend.scanner import get_local_ip
+            ip = get_local_ip()
+
+        return {
+            "ip": ip,
+            "gateway": gateway or "Unknown",
+            "gateway_interface": gateway_iface,
+            "ssid": ssid or UNKNOWN_SSID,
+            "interfaces": sorted(interfaces.values(), key=lambda i: i["name"])
+        }
+
+    def refresh(self):
+        """Re-read the environment; returns True when it changed."""
+        current = self._collect()
+        with self.lock:
+            self.refreshes += 1
+            if current == self.snapshot:
+                return False
+            first = self.snapshot is None
+            self.snapshot = current
+            self.version += 1
+            self.changed = time.time()
+        if not first:
+            print(f"[*] Network changed: ip {current['ip']}, gateway {current['gateway']}, ssid {current['ssid']}")
+        return True
+
+    def get(self):
+        """
+        The cached environment. Never refreshes inline (that may spawn
+        ipconfig/netsh); until the first refresh lands it is a placeholder.
+        """
+        with self.lock:
+            snapshot = self.snapshot or PLACEHOLDER
+            return dict(snapshot, version=self.version,
+                        changed=datetime.fromtimestamp(self.changed).isoformat() if self.changed else None)
+
+    def start(self):
+        if self.thread and self.thread.is_alive():
+            return
+        self.stopped = False
+        self.wake.clear()
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped = True
+        self.wake.set()
+        if self.wake_pipe:
+            try:
+                os.write(self.wake_pipe[1], b"x")
+            except OSError:
+                pass
+
+    def _netlink(self):
+        if not self.linux or not hasattr(socket, "AF_NETLINK"):
+            return None
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+            sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV4_ROUTE | RTMGRP_IPV6_IFADDR))
+            sock.setblocking(False)
+            return sock
+        except OSError as e:
+            print(f"Netlink unavailable, polling every {self.interval}s: {e}")
+            return None
+
+    def _drain(self, sock, settle, limit=NETLINK_MAX_SETTLE):
+        # Swallow a burst of notifications; the content is re-read from /proc anyway
+        end = time.monotonic() + limit
+        while True:
+            remaining = end - time.monotonic()
+            if remaining <= 0 or not select.select([sock], [], [], min(settle, remaining))[0]:
+                return
+            try:
+                sock.recv(65536)
+            except OSError:
+                return
+
+    def _loop(self):
+        sock = self._netlink()
+        if sock is not None:
+            self.wake_pipe = os.pipe()
+        try:
+            while not self.stopped:
+                try:
+                    self.refresh()
+                except Exception as e:
+                    print(f"Network environment refresh error: {e}")
+                if sock is None:
+                    self.wake.wait(self.interval)
+                    continue
+                ready = select.select([sock, self.wake_pipe[0]], [], [], self.interval)[0]
+                if sock in ready and not self.stopped:
+                    self._drain(sock, NETLINK_SETTLE)
+        finally:
+            if sock is not None:
+                sock.close()
+                pipe, self.wake_pipe = self.wake_pipe, None
+                for fd in pipe:
+                    os.close(fd)
+
+    def status(self):
+        return {
+            "running": bool(self.thread and self.thread.is_alive()),
+            "source": "proc+netlink" if self.linux else "ipconfig/netsh",
+            "interval": self.interval,
+            "version": self.version,
+            "refreshes": self.refreshes
+        }
+
+
+netenv = NetworkEnvironment.from_env()
@@ -0,0 +1,289 @@
+import os
+import threading
+import time
+from array import array
+from datetime import datetime
+
+from backend.netenv import PROC_DEV, read_proc_net_dev
+
+# Per-interface throughput history. A background thread samples interface
+# counters every second and feeds the deltas into fixed-size ring buffers
+# (the array module, no per-sample objects) at three resolutions:
+#   1s   for the last hour
+#   1m   for the last day
+#   1h   for the last 30 days
+# Each bucket stores per-second rates averaged over the bucket, so memory
+# is fixed per interface however long the sensor runs.
+#
+#   NETGUARDIAN_NETSTATS_INTERVAL   seconds between samples, default 1, 0 disables
+
+FIELDS = ("rx_bytes", "rx_packets", "rx_errs", "rx_drop",
+          "tx_bytes", "tx_packets", "tx_errs", "tx_drop")
+RATE_FIELDS = tuple(f + "_per_s" for f in FIELDS)
+# name, bucket seconds, buckets kept
+TIERS = (("1s", 1, 3600), ("1m", 60, 1440), ("1h", 3600, 720))
+MAX_INTERFACES = 32      # series kept at once (container veths, tun devices...)
+EVICT_AFTER = 60         # samples an interface must be gone before its series can be dropped
+SKIP_INTERFACES = ("lo",)
+
+
+def parse_duration(value):
+    """'90', '15m', '6h', '7d' -> seconds. Raises ValueError."""
+    value = str(value).strip().lower()
+    units = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+    if value and value[-1] in units:
+        return float(value[:-1]) * units[value[-1]]
+    return float(value)
+
+
+def read_counters():
+    """name -> counter tuple in FIELDS order."""
+    if os.path.exists(PROC_DEV):
+        return read_proc_net_dev()
+    import psutil
+    return {name: (c.bytes_recv, c.packets_recv, c.errin, c.dropin,
+                   c.bytes_sent, c.packets_sent, c.errout, c.dropout)
+            for name, c in psutil.net_io_counters(pernic=True).items()}
+
+
+class Tier:
+    """Ring buffer of bucket start times and per-second rates for one resolution."""
+
+    def __init__(self, name, step, size):
+        self.name = name
+        self.step = step
+        self.size = size
+        self.times = array("d", bytes(8 * size))
+        self.values = array("f", bytes(4 * size * len(FIELDS)))   # size x FIELDS, row major
+        self.head = 0       # next slot to write
+        self.count = 0
+        # Bucket being filled: start time, elapsed seconds, summed deltas
+        self.bucket = None
+        self.elapsed = 0.0
+        self.acc = [0] * len(FIELDS)
+
+    def add(self, ts, dt, deltas):
+        bucket = ts - ts % self.step
+        if self.bucket is not None and bucket != self.bucket:
+            self._flush()
+        self.bucket = bucket
+        self.elapsed += dt
+        for i, d in enumerate(deltas):
+            self.acc[i] += d
+
+    def _flush(self):
+        if self.elapsed > 0:
+            self.times[self.head] = self.bucket
+            base = self.head * len(FIELDS)
+            for i, total in enumerate(self.acc):
+                self.values[base + i] = total / self.elapsed
+            self.head = (self.head + 1) % self.size
+            self.count = min(self.count + 1, self.size)
+        self.elapsed = 0.0
+        self.acc = [0] * len(FIELDS)
+
+    def points(self, since):
+        """(bucket start, rates tuple) oldest first, for buckets starting at or after since."""
+        out = []
+        n = len(FIELDS)
+        for k in range(self.count):
+            slot = (self.head - self.count + k) % self.size
+            t = self.times[slot]
+            if t >= since:
+                out.append((t, tuple(self.values[slot * n:(slot + 1) * n])))
+        return out
+
+    def latest(self):
+        if not self.count:
+            return None
+        slot = (self.head - 1) % self.size
+        n = len(FIELDS)
+        return self.times[slot], tuple(self.values[slot * n:(slot + 1) * n])
+
+
+class ThroughputSampler:
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.series = {}     # iface -> {tier name: Tier}
+        self.last = {}       # iface -> (monotonic time, counters)
+        self.lock = threading.Lock()
+        self.thread = None
+        self.stopped = False
+        self.wake = threading.Event()
+        self.samples = 0
+        self.missing = {}    # tracked iface -> consecutive samples it was absent
+        self.skipped = set() # present now but untracked, all slots held by live interfaces
+        self.evicted = 0
+        self.total = None    # (rx_bytes, tx_bytes) over all non-loopback interfaces at the last sample
+
+    @classmethod
+    def from_env(cls):
+        try:
+            interval = float(os.environ.get("NETGUARDIAN_NETSTATS_INTERVAL", 1))
+        except ValueError:
+            interval = 1.0
+        return cls(interval=interval)
+
+    def sample(self, counters=None, now=None, mono=None):
+        """Take one sample. Arguments are for feeding recorded counters."""
+        counters = read_counters() if counters is None else counters
+        now = time.time() if now is None else now
+        mono = time.monotonic() if mono is None else mono
+        with self.lock:
+            for name in self.series:
+                if name in counters:
+                    self.missing.pop(name, None)
+                else:
+                    self.missing[name] = self.missing.get(name, 0) + 1
+            skipped = set()
+            for name, values in counters.items():
+                if name in SKIP_INTERFACES:
+                    continue
+                if name not in self.series:
+                    if len(self.series) >= MAX_INTERFACES and not self._evict():
+                        skipped.add(name)
+                        continue
+                    self.series[name] = {t[0]: Tier(*t) for t in TIERS}
+                previous = self.last.get(name)
+                self.last[name] = (mono, values)
+                if previous is None:
+                    continue
+                dt = mono - previous[0]
+                if dt <= 0:
+                    continue
+                # A counter going backwards means the interface was reset or wrapped
+                deltas = [v - p if v >= p else 0 for v, p in zip(values, previous[1])]
+                for tier in self.series[name].values():
+                    tier.add(now, dt, deltas)
+            self.skipped = skipped
+            # Tracked or not, every interface counts towards the host totals
+            self.total = tuple(sum(values[i] for name, values in counters.items() if name not in SKIP_INTERFACES)
+                               for i in (FIELDS.index("rx_bytes"), FIELDS.index("tx_bytes")))
+            self.samples += 1
+
+    def _evict(self):
+        """Drop the series of the interface gone longest, if gone EVICT_AFTER samples."""
+        gone = [(n, name) for name, n in self.missing.items() if n >= EVICT_AFTER]
+        if not gone:
+            return False
+        name = max(gone)[1]
+        del self.series[name]
+        del self.missing[name]
+        self.last.pop(name, None)
+        self.evicted += 1
+        return True
+
+    def interfaces(self):
+        with self.lock:
+            return sorted(self.series)
+
+    def _tier_for(self, window, resolution):
+        if resolution and resolution != "auto":
+            for name, step, size in TIERS:
+                if name == resolution:
+                    return name
+            raise ValueError(f"Unknown resolution '{resolution}', use one of {', '.join(t[0] for t in TIERS)} or auto")
+        # Finest tier that covers the whole window
+        for name, step, size in TIERS:
+            if step * size >= window:
+                return name
+        return TIERS[-1][0]
+
+    def history(self, iface=None, window=3600, resolution=None):
+        """
+        Rates (per second) over the last `window` seconds. iface=None sums
+        all tracked interfaces. Raises KeyError for unknown interfaces and
+        ValueError for unknown resolutions.
+        """
+        tier_name = self._tier_for(window, resolution)
+        since = time.time() - window
+        with self.lock:
+            if iface:
+                if iface not in self.series:
+                    raise KeyError(iface)
+                points = self.series[iface][tier_name].points(since)
+            else:
+                summed = {}
+                for tiers in self.series.values():
+                    for t, rates in tiers[tier_name].points(since):
+                        current = summed.get(t)
+                        summed[t] = rates if current is None else tuple(a + b for a, b in zip(current, rates))
+                points = sorted(summed.items())
+        step = {n: s for n, s, _ in TIERS}[tier_name]
+        return {
+            "iface": iface,
+            "window": window,
+            "resolution": tier_name,
+            "step": step,
+            "points": [dict(zip(RATE_FIELDS, (round(v, 2) for v in rates)), t=datetime.fromtimestamp(t).isoformat())
+                       for t, rates in points]
+        }
+
+    def latest(self):
+        """Most recent 1s rates per interface."""
+        out = {}
+        with self.lock:
+            for name, tiers in self.series.items():
+                last = tiers[TIERS[0][0]].latest()
+                if last:
+                    out[name] = {f: round(v, 2) for f, v in zip(RATE_FIELDS, last[1])}
+        return out
+
+    def totals(self):
+        """
+        Cumulative bytes received/sent by the host as of the last sample.
+        Reads the counters directly only when the sampler is disabled.
+        """
+        with self.lock:
+            total = self.total
+        if total is None and not self.interval:
+            counters = read_counters()
+            total = tuple(sum(v[i] for name, v in counters.items() if name not in SKIP_INTERFACES)
+                          for i in (FIELDS.index("rx_bytes"), FIELDS.index("tx_bytes")))
+        rx, tx = total or (0, 0)
+        return {"bytes_recv": rx, "bytes_sent": tx}
+
+    def start(self):
+        if not self.interval or (self.thread and self.thread.is_alive()):
+            return
+        self.stopped = False
+        self.wake.clear()
+        self.thread = threading.Thread(target=self._loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.stopped = True
+        self.wake.set()
+
+    def _loop(self):
+        next_at = time.monotonic()
+        while not self.stopped:
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"Throughput sample error: {e}")
+            # Fixed cadence, not drifting by the time a sample takes
+            next_at += self.interval
+            delay = next_at - time.monotonic()
+            if delay < 0:
+                next_at = time.monotonic()
+                delay = 0
+            self.wake.wait(delay)
+
+    def stats(self):
+        with self.lock:
+            count = len(self.series)
+        per_iface = sum(8 * size + 4 * size * len(FIELDS) for _, _, size in TIERS)
+        return {
+            "running": bool(self.thread and self.thread.is_alive()),
+            "interval": self.interval,
+            "interfaces": count,
+            "untracked": sorted(self.skipped),
+            "evicted": self.evicted,
+            "samples": self.samples,
+            "tiers": [{"resolution": n, "step": s, "buckets": z} for n, s, z in TIERS],
+            "buffer_bytes": count * per_iface
+        }
+
+
+sampler = ThroughputSampler.from_env()
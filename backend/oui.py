@@ -0,0 +1,161 @@
+import os
+import mmap
+import struct
+import threading
+import functools
+
+# Offline IEEE vendor index (MA-L / MA-M / MA-S), generated by build_oui_index.py.
+#
+# Layout (big-endian):
+#   header   "OUIX" | version u16 | count24 u32 | count28 u32 | count36 u32 | strings_offset u32
+#   tables   three sorted arrays of (prefix u64, string offset u32) records,
+#            for 24, 28 and 36 bit prefixes in that order
+#   strings  u8 length + UTF-8 bytes, deduplicated
+#
+# The file is memory-mapped and searched in place, nothing is parsed at startup.
+
+INDEX_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "oui.bin")
+
+MAGIC = b"OUIX"
+VERSION = 1
+HEADER = struct.Struct(">4sHIIII")
+RECORD = struct.Struct(">QI")
+PREFIX_BITS = (24, 28, 36)
+
+
+def mac_to_int(mac):
+    digits = "".join(c for c in mac if c.isalnum())
+    if len(digits) != 12:
+        raise ValueError(f"invalid MAC: {mac}")
+    return int(digits, 16)
+
+
+class OUIIndex:
+    def __init__(self, path=INDEX_PATH):
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, c24, c28, c36, strings = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path} is not an OUI index (v{VERSION})")
+        self.strings = strings
+        # (bits, first record offset, record count), most specific first
+        tables = []
+        offset = HEADER.size
+        for bits, count in zip(PREFIX_BITS, (c24, c28, c36)):
+            tables.append((bits, offset, count))
+            offset += count * RECORD.size
+        self.tables = tables[::-1]
+        self.size = c24 + c28 + c36
+
+    def _search(self, base, count, key):
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            prefix, ref = RECORD.unpack_from(self._map, base + mid * RECORD.size)
+            if prefix < key:
+                lo = mid + 1
+            elif prefix > key:
+                hi = mid
+            else:
+                return ref
+        return None
+
+    def _string(self, ref):
+        pos = self.strings + ref
+        length = self._map[pos]
+        return self._map[pos + 1:pos + 1 + length].decode("utf-8", errors="replace")
+
+    def lookup_int(self, value):
+        """Longest-prefix match for a 48 bit MAC value."""
+        for bits, base, count in self.tables:
+            ref = self._search(base, count, value >> (48 - bits))
+            if ref is not None:
+                return self._string(ref)
+        return None
+
+    def lookup(self, mac):
+        return self.lookup_int(mac_to_int(mac))
+
+    def close(self):
+        try:
+            self._map.close()
+        except Exception:
+            pass
+        self._file.close()
+
+
+def write_index(entries, path=INDEX_PATH):
+    """entries: iterable of (prefix int, bits, vendor). Later duplicates win."""
+    tables = {bits: {} for bits in PREFIX_BITS}
+    for prefix, bits, vendor in entries:
+        tables[bits][prefix] = vendor.strip()
+
+    strings = bytearray()
+    string_refs = {}
+
+    def ref(vendor):
+        if vendor not in string_refs:
+            raw = vendor.encode("utf-8")[:255]
+            string_refs[vendor] = len(strings)
+            strings.append(len(raw))
+            strings.extend(raw)
+        return string_refs[vendor]
+
+    body = bytearray()
+    counts = []
+    for bits in PREFIX_BITS:
+        items = sorted(tables[bits].items())
+        counts.append(len(items))
+        for prefix, vendor in items:
+            body += RECORD.pack(prefix, ref(vendor))
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, *counts, HEADER.size + len(body)))
+        f.write(body)
+        f.write(strings)
+    os.replace(tmp, path)
+    return sum(counts)
+
+
+_index = None
+_index_lock = threading.Lock()
+_index_missing = False
+
+
+def get_index():
+    """Shared index instance, or None if the index file has not been built."""
+    global _index, _index_missing
+    if _index is None and not _index_missing:
+        with _index_lock:
+            if _index is None and not _index_missing:
+                try:
+                    _index = OUIIndex()
+                except (OSError, ValueError) as e:
+                    # Once per process: without the index only the small built-in
+                    # vendor table in scanner.py is consulted
+                    print(f"[!] OUI vendor index unavailable ({e}). Most devices will show "
+                          f"'Unknown Vendor' until it is built: python build_oui_index.py")
+                    _index_missing = True
+    return _index
+
+
+@functools.lru_cache(maxsize=8192)
+def _lookup_prefix(prefix36):
+    index = get_index()
+    if index is None:
+        return None
+    # Pad the 36 bit prefix back to a full MAC value
+    return index.lookup_int(prefix36 << 12)
+
+
+def lookup_vendor(mac):
+    """Vendor for a MAC address, or None. Memoised on the 36 bit prefix."""
+    try:
+        value = mac_to_int(mac)
+    except ValueError:
+        return None
+    return _lookup_prefix(value >> 12)
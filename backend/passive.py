@@ -0,0 +1,343 @@
+import socket
+import struct
+import selectors
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlparse
+
+from backend import dnswire
+
+# Passive discovery: listen to mDNS (5353) and SSDP (1900) multicast traffic
+# and keep the devices table fresh without sending a single probe.
+
+MDNS_GROUP, MDNS_PORT = "224.0.0.251", 5353
+SSDP_GROUP, SSDP_PORT = "239.255.255.250", 1900
+
+# Do not rewrite the same device more often than this
+UPSERT_INTERVAL = 60
+# Announcements from hosts whose MAC is not in the neighbor table yet are kept this long
+PENDING_TTL = 60
+NEIGHBOR_REFRESH = 2.0
+
+# TXT keys that carry a model string (AirPlay/RAOP, Google Cast, printers, HAP)
+MODEL_KEYS = ("md", "model", "am", "ty", "usb_mdl", "product")
+
+
+def _txt_dict(strings):
+    out = {}
+    for item in strings:
+        if "=" in item:
+            k, v = item.split("=", 1)
+            out[k.lower()] = v
+    return out
+
+
+def _strip_local(name):
+    name = name.rstrip(".")
+    return name[:-6] if name.endswith(".local") else name
+
+
+def parse_mdns(data, src_ip):
+    """
+    Decode an mDNS response into announcements:
+    [{"ip", "name", "model", "source": "mdns"}], one per announced address.
+    """
+    msg = dnswire.parse_message(data)
+    if not msg["flags"] & 0x8000:
+        return []  # queries carry no announcements
+    records = msg["answers"] + msg["additional"]
+
+    hosts = {}    # hostname -> ip
+    targets = {}  # service instance -> hostname (SRV)
+    models = {}   # service instance -> (instance as sent, model) (TXT)
+    for r in records:
+        if r["type"] == dnswire.TYPE_A:
+            hosts[r["name"].lower()] = (r["name"], r["data"])
+        elif r["type"] == dnswire.TYPE_SRV and isinstance(r["data"], dict):
+            targets[r["name"].lower()] = r["data"]["target"].lower()
+        elif r["type"] == dnswire.TYPE_TXT and isinstance(r["data"], list):
+            txt = _txt_dict(r["data"])
+            for key in MODEL_KEYS:
+                if txt.get(key):
+                    models[r["name"].lower()] = (r["name"], txt[key])
+                    break
+
+    # Attach models to hosts through their SRV records
+    host_models = {}
+    for instance, (_, model) in models.items():
+        host = targets.get(instance)
+        if host:
+            host_models[host] = model
+
+    announcements = []
+    for key, (name, ip) in hosts.items():
+        announcements.append({"ip": ip, "name": _strip_local(name),
+                              "model": host_models.get(key), "source": "mdns"})
+
+    # Service-only announcement (no A record): attribute it to the sender
+    if not announcements and models:
+        instance, model = next(iter(models.values()))
+        label = instance.split("._", 1)[0]
+        announcements.append({"ip": src_ip, "name": label, "model": model, "source": "mdns"})
+    return announcements
+
+
+def parse_ssdp(data, src_ip):
+    """Decode an SSDP NOTIFY or M-SEARCH response into announcements."""
+    text = data.decode("utf-8", errors="ignore")
+    lines = text.split("\r\n") if "\r\n" in text else text.split("\n")
+    if not lines:
+        return []
+    start = lines[0].upper()
+    if not (start.startswith("NOTIFY") or start.startswith("HTTP/1.1 200")):
+        return []
+    headers = {}
+    for line in lines[1:]:
+        if ":" in line:
+            k, v = line.split(":", 1)
+            headers[k.strip().upper()] = v.strip()
+
+    alive = headers.get("NTS", "ssdp:alive").lower() != "ssdp:byebye"
+    # SERVER looks like "Linux/3.14 UPnP/1.0 Roku/9.4" - the product is the last token
+    server = headers.get("SERVER", "")
+    model = server.split()[-1] if server else None
+    usn = headers.get("USN", "")
+    # The LOCATION URL names the device itself; fall back to the sender
+    ip = src_ip
+    location = headers.get("LOCATION")
+    if location:
+        host = urlparse(location).hostname
+        try:
+            socket.inet_aton(host)
+            ip = host
+        except (OSError, TypeError):
+            pass
+    return [{
+        "ip": ip,
+        "name": None,
+        "model": model,
+        "usn": usn,
+        "location": location,
+        "alive": alive,
+        "source": "ssdp"
+    }]
+
+
+def _multicast_socket(group, port):
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_UDP)
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    if hasattr(socket, "SO_REUSEPORT"):
+        try:
+            s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        except OSError:
+            pass
+    s.bind(("", port))
+    mreq = struct.pack("4s4s", socket.inet_aton(group), socket.inet_aton("0.0.0.0"))
+    s.setsockopt(socket.IPPROTO_IP, socket.IP_ADD_MEMBERSHIP, mreq)
+    s.setblocking(False)
+    return s
+
+
+class PassiveDiscoveryService:
+    def __init__(self):
+        self.running = False
+        self.sockets = []
+        self.lock = threading.Lock()
+        self.neighbors = {}       # ip -> mac
+        self.neighbors_at = 0.0
+        self.pending = {}         # ip -> (announcement, first seen)
+        self.last_write = {}      # mac -> (time, name, model)
+        self.stats = {"packets": 0, "announcements": 0, "upserts": 0, "errors": 0,
+                      "pending": 0, "started": None}
+
+    def start(self, groups=((MDNS_GROUP, MDNS_PORT, "mdns"), (SSDP_GROUP, SSDP_PORT, "ssdp"))):
+        if self.running:
+            return False, "Already running"
+        selector = selectors.DefaultSelector()
+        status = []
+        for group, port, kind in groups:
+            try:
+                s = _multicast_socket(group, port)
+                self.sockets.append(s)
+                selector.register(s, selectors.EVENT_READ, kind)
+                status.append(f"{kind} (OK)")
+            except OSError as e:
+                status.append(f"{kind} (FAIL: {e})")
+        if not self.sockets:
+            return False, f"Could not join any group: {', '.join(status)}"
+
+        self.running = True
+        self.stats["started"] = datetime.now().isoformat()
+        t = threading.Thread(target=self._listen_loop, args=(selector,))
+        t.daemon = True
+        t.start()
+        print(f"[*] Passive discovery listening: {', '.join(status)}")
+        return True, f"Passive discovery active: {', '.join(status)}"
+
+    def stop(self):
+        self.running = False
+        for s in self.sockets:
+            try:
+                s.close()
+            except:
+                pass
+        self.sockets = []
+
+    def _listen_loop(self, selector):
+        while self.running:
+            try:
+                events = selector.select(timeout=1.0)  # check running flag every second
+            except (OSError, ValueError):
+                break
+            for key, _ in events:
+                try:
+                    data, addr = key.fileobj.recvfrom(9000)
+                except (BlockingIOError, OSError):
+                    continue
+                self.handle_packet(key.data, data, addr[0])
+            self._retry_pending()
+        selector.close()
+
+    def handle_packet(self, kind, data, src_ip):
+        self.stats["packets"] += 1
+        try:
+            if kind == "mdns":
+                announcements = parse_mdns(data, src_ip)
+            else:
+                announcements = parse_ssdp(data, src_ip)
+        except Exception:
+            self.stats["errors"] += 1
+            return
+        for a in announcements:
+            self.stats["announcements"] += 1
+            self._ingest(a)
+
+    def _mac_for(self, ip, refresh=True):
+        mac = self.neighbors.get(ip)
+        if mac is None and refresh and time.monotonic() - self.neighbors_at >= NEIGHBOR_REFRESH:
+            from backend.neighbors import read_neighbors
+            self.neighbors = {e["ip"]: e["mac"] for e in read_neighbors()}
+            self.neighbors_at = time.monotonic()
+            mac = self.neighbors.get(ip)
+        return mac
+
+    def _ingest(self, a):
+        ip = a["ip"]
+        if ip.startswith("127.") or ip.startswith("169.254."):
+            return
+        mac = self._mac_for(ip)
+        if mac is None:
+            with self.lock:
+                self.pending[ip] = (a, self.pending.get(ip, (None, time.time()))[1])
+                self.stats["pending"] = len(self.pending)
+            return
+        self._store(mac, a)
+
+    def _retry_pending(self):
+        if not self.pending:
+            return
+        now = time.time()
+        with self.lock:
+            items = list(self.pending.items())
+        for ip, (a, first) in items:
+            mac = self._mac_for(ip)
+            if mac or now - first > PENDING_TTL:
+                with self.lock:
+                    self.pending.pop(ip, None)
+                    self.stats["pending"] = len(self.pending)
+                if mac:
+                    self._store(mac, a)
+
+    def _store(self, mac, a):
+        from backend.scanner import get_vendor, guess_type
+        from backend.database import record_sighting, mark_offline_ips
+        from backend.liveness import liveness
+
+        if a.get("alive") is False:
+            mark_offline_ips([a["ip"]])
+            self.last_write.pop(mac, None)
+            return
+
+        liveness.record(a["ip"], True)
+        name = a.get("name") or f"Device-{a['ip'].split('.')[-1]}"
+        model = a.get("model")
+        prev = self.last_write.get(mac)
+        if prev and time.time() - prev[0] < UPSERT_INTERVAL and prev[1:] == (name, model):
+            return
+
+        vendor = get_vendor(mac)
+        try:
+            record_sighting({
+                "mac": mac,
+                "ip": a["ip"],
+                "name": name,
+                "vendor": vendor,
+                "type": guess_type(name, vendor),
+                "model": model
+            }, weak_model=a["source"] == "ssdp")
+            self.last_write[mac] = (time.time(), name, model)
+            self.stats["upserts"] += 1
+        except Exception as e:
+            self.stats["errors"] += 1
+            print(f"Passive discovery DB error: {e}")
+
+    def get_stats(self):
+        return dict(self.stats, running=self.running)
+
+
+passive_discovery = PassiveDiscoveryService()
+
+
+# --- Local packet generator, for testing the listener without real devices ---
+
+def build_mdns_announcement(hostname, ip, model=None, service="_http._tcp"):
+    host = f"{hostname}.local"
+    instance = f"{hostname}.{service}.local"
+    answers = [
+        {"name": f"{service}.local", "type": dnswire.TYPE_PTR, "ttl": 4500, "data": instance},
+        {"name": instance, "type": dnswire.TYPE_SRV, "ttl": 120, "data": {"port": 80, "target": host}},
+        {"name": instance, "type": dnswire.TYPE_TXT, "ttl": 4500, "data": [f"md={model}"] if model else []},
+        {"name": host, "type": dnswire.TYPE_A, "ttl": 120, "data": ip},
+    ]
+    return dnswire.build_response(answers)
+
+
+def build_ssdp_notify(ip, server="Linux/5.10 UPnP/1.0 NetGuardianTest/1.0", alive=True):
+    nts = "ssdp:alive" if alive else "ssdp:byebye"
+    return (
+        "NOTIFY * HTTP/1.1\r\n"
+        f"HOST: {SSDP_GROUP}:{SSDP_PORT}\r\n"
+        "CACHE-CONTROL: max-age=1800\r\n"
+        f"LOCATION: http://{ip}:49152/description.xml\r\n"
+        "NT: upnp:rootdevice\r\n"
+        f"NTS: {nts}\r\n"
+        f"SERVER: {server}\r\n"
+        f"USN: uuid:{ip.replace('.', '-')}::upnp:rootdevice\r\n\r\n"
+    ).encode()
+
+
+def send_test_packets(target="127.0.0.1", hostname="test-device", ip="192.0.2.10", model="TestModel"):
+    """Send one mDNS and one SSDP announcement to `target` ("multicast" or a host)."""
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    s.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+    s.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_LOOP, 1)
+    try:
+        mdns_dest = MDNS_GROUP if target == "multicast" else target
+        ssdp_dest = SSDP_GROUP if target == "multicast" else target
+        s.sendto(build_mdns_announcement(hostname, ip, model), (mdns_dest, MDNS_PORT))
+        s.sendto(build_ssdp_notify(ip), (ssdp_dest, SSDP_PORT))
+    finally:
+        s.close()
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Send test mDNS/SSDP announcements.")
+    parser.add_argument("--target", default="multicast", help="'multicast' or a unicast address")
+    parser.add_argument("--name", default="test-device")
+    parser.add_argument("--ip", default="192.0.2.10", help="address to announce")
+    parser.add_argument("--model", default="TestModel")
+    args = parser.parse_args()
+    send_test_packets(args.target, args.name, args.ip, args.model)
+    print("[+] Sent mDNS and SSDP announcements")
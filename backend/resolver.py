@@ -0,0 +1,247 @@
+import os
+import socket
+import struct
+import threading
+import time
+import concurrent.futures
+
+from backend import dnswire
+
+POSITIVE_TTL = 60 * 60   # keep resolved names for an hour
+NEGATIVE_TTL = 5 * 60    # retry hosts without a name after 5 minutes
+LOOKUP_TIMEOUT = 2.0     # per-lookup deadline, shared by all methods
+MAX_CACHE = 65536
+RESOLV_CONF = "/etc/resolv.conf"
+PTR_ATTEMPTS = 2         # queries per PTR lookup, retried on the next nameserver
+
+
+def system_nameservers(path=RESOLV_CONF):
+    servers = []
+    try:
+        with open(path) as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0] == "nameserver":
+                    servers.append(parts[1].split("%")[0])
+    except OSError:
+        pass
+    return servers
+
+
+def _query_ptr(ip, server, timeout):
+    family = socket.AF_INET6 if ":" in server else socket.AF_INET
+    s = socket.socket(family, socket.SOCK_DGRAM)
+    try:
+        s.settimeout(timeout)
+        qid = int.from_bytes(os.urandom(2), "big")
+        s.sendto(dnswire.build_query(dnswire.reverse_name(ip), dnswire.TYPE_PTR, qid, rd=True), (server, 53))
+        deadline = time.monotonic() + timeout
+        while True:
+            data, _ = s.recvfrom(4096)
+            msg = dnswire.parse_message(data)
+            if msg["id"] == qid:
+                break
+            # Stray reply to an earlier query, keep waiting for ours
+            s.settimeout(max(deadline - time.monotonic(), 0.001))
+        for rec in msg["answers"]:
+            if rec["type"] == dnswire.TYPE_PTR and rec["data"]:
+                return rec["data"]
+        return ""    # answered, but no name
+    finally:
+        s.close()
+
+
+def lookup_ptr(ip, timeout, nameservers=None):
+    """
+    Reverse DNS sent straight to the configured nameservers, so it honours
+    `timeout`: at most PTR_ATTEMPTS queries, sharing the time left between
+    them. Without a resolv.conf (Windows) the system resolver is used,
+    which cannot be cut short.
+    """
+    servers = system_nameservers() if nameservers is None else nameservers
+    if not servers:
+        try:
+            return socket.gethostbyaddr(ip)[0]
+        except (OSError, UnicodeError):
+            return None
+    deadline = time.monotonic() + timeout
+    attempts = [servers[i % len(servers)] for i in range(PTR_ATTEMPTS)]
+    for i, server in enumerate(attempts):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            name = _query_ptr(ip, server, remaining / (len(attempts) - i))
+        except (OSError, dnswire.DNSError):
+            continue
+        return name or None
+    return None
+
+
+def lookup_mdns(ip, timeout):
+    """Unicast mDNS reverse query sent straight to the host's port 5353."""
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.settimeout(timeout)
+        qid = int.from_bytes(os.urandom(2), "big")
+        s.sendto(dnswire.build_query(dnswire.reverse_name(ip), dnswire.TYPE_PTR, qid), (ip, 5353))
+        data, _ = s.recvfrom(4096)
+        msg = dnswire.parse_message(data)
+        for rec in msg["answers"]:
+            if rec["type"] == dnswire.TYPE_PTR and rec["data"]:
+                name = rec["data"]
+                return name[:-6] if name.endswith(".local") else name
+    except (OSError, dnswire.DNSError):
+        pass
+    finally:
+        s.close()
+    return None
+
+
+def _netbios_query():
+    # Node status request for the wildcard name "*", first-level encoded
+    raw = b"*" + b"\x00" * 15
+    encoded = b"".join(bytes([0x41 + (c >> 4), 0x41 + (c & 0x0F)]) for c in raw)
+    tid = int.from_bytes(os.urandom(2), "big")
+    return struct.pack("!HHHHHH", tid, 0, 1, 0, 0, 0) + b"\x20" + encoded + b"\x00" + struct.pack("!HH", dnswire.TYPE_NBSTAT, 1)
+
+
+def parse_netbios_status(data):
+    """Return the unique workstation name from a node status response."""
+    _, offset = dnswire.decode_name(data, 12)
+    offset += 10  # type, class, ttl, rdlength
+    count = data[offset]
+    offset += 1
+    for _ in range(count):
+        entry = data[offset:offset + 18]
+        if len(entry) < 18:
+            break
+        name = entry[:15].decode("ascii", errors="ignore").strip()
+        suffix = entry[15]
+        flags = struct.unpack("!H", entry[16:18])[0]
+        if suffix == 0x00 and not flags & 0x8000 and name:
+            return name
+        offset += 18
+    return None
+
+
+def lookup_netbios(ip, timeout):
+    s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        s.settimeout(timeout)
+        s.sendto(_netbios_query(), (ip, 137))
+        data, _ = s.recvfrom(1024)
+        return parse_netbios_status(data)
+    except (OSError, IndexError, dnswire.DNSError):
+        return None
+    finally:
+        s.close()
+
+
+METHODS = {
+    "ptr": lookup_ptr,
+    "mdns": lookup_mdns,
+    "netbios": lookup_netbios,
+}
+
+
+class NameResolver:
+    """
+    Concurrent reverse name resolution with a positive/negative TTL cache.
+    Lookups run on a small thread pool; callers wait only as long as they
+    want and can attach callbacks for names that arrive later.
+    """
+
+    def __init__(self, methods=("ptr", "mdns", "netbios"), workers=32,
+                 timeout=LOOKUP_TIMEOUT, positive_ttl=POSITIVE_TTL, negative_ttl=NEGATIVE_TTL):
+        self.methods = [METHODS[m] if isinstance(m, str) else m for m in methods]
+        self.timeout = timeout
+        self.positive_ttl = positive_ttl
+        self.negative_ttl = negative_ttl
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=workers, thread_name_prefix="resolver")
+        self.cache = {}     # ip -> (name or None, expires)
+        self.inflight = {}  # ip -> Future
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _lookup(self, ip):
+        deadline = time.monotonic() + self.timeout
+        for method in self.methods:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            name = method(ip, remaining)
+            if name:
+                return name
+        return None
+
+    def _store(self, ip, future):
+        try:
+            name = future.result()
+        except Exception:
+            name = None
+        ttl = self.positive_ttl if name else self.negative_ttl
+        with self.lock:
+            self.inflight.pop(ip, None)
+            self.cache[ip] = (name, time.time() + ttl)
+            if len(self.cache) > MAX_CACHE:
+                self._trim()
+
+    def _trim(self):
+        now = time.time()
+        for ip in [ip for ip, (_, exp) in self.cache.items() if exp < now]:
+            del self.cache[ip]
+        # Still too big: drop the oldest insertions
+        while len(self.cache) > MAX_CACHE:
+            del self.cache[next(iter(self.cache))]
+
+    def cached(self, ip):
+        """Return (hit, name). name may be None for a cached negative answer."""
+        with self.lock:
+            entry = self.cache.get(ip)
+            if entry and entry[1] > time.time():
+                return True, entry[0]
+        return False, None
+
+    def submit(self, ip):
+        """Future resolving to the host name (or None). Deduplicates in-flight lookups."""
+        with self.lock:
+            entry = self.cache.get(ip)
+            if entry and entry[1] > time.time():
+                self.hits += 1
+                f = concurrent.futures.Future()
+                f.set_result(entry[0])
+                return f
+            f = self.inflight.get(ip)
+            if f is not None:
+                return f
+            self.misses += 1
+            f = self.executor.submit(self._lookup, ip)
+            self.inflight[ip] = f
+        f.add_done_callback(lambda fut, ip=ip: self._store(ip, fut))
+        return f
+
+    def resolve_many(self, ips, timeout):
+        """
+        Resolve concurrently, waiting at most `timeout` seconds in total.
+        Returns ({ip: name} for finished lookups, {ip: future} still pending).
+        """
+        futures = {ip: self.submit(ip) for ip in ips}
+        if futures:
+            concurrent.futures.wait(futures.values(), timeout=timeout)
+        names, pending = {}, {}
+        for ip, f in futures.items():
+            if f.done():
+                names[ip] = f.result()
+            else:
+                pending[ip] = f
+        return names, pending
+
+    def stats(self):
+        with self.lock:
+            return {"cached": len(self.cache), "inflight": len(self.inflight),
+                    "hits": self.hits, "misses": self.misses}
+
+
+resolver = NameResolver()
@@ -4,13 +4,21 @@ import re
 import platform
 import threading
 import time
-import concurrent.futures
 import os
+import math
+import ipaddress
 from datetime import datetime
-from backend.database import upsert_device, set_all_offline, get_db
-import sqlite3
+from backend.database import (upsert_devices, record_known_devices, set_all_offline,
+                              mark_offline_ips, update_online_status, update_device_name)
+from backend.history import record_scan
+from backend.sweep import sweep_hosts
+from backend.neighbors import read_neighbors
+from backend.liveness import liveness
+from backend.resolver import resolver
+from backend.oui import lookup_vendor
+from backend.events import EventChannel
 
-# Simple common vendor mapping for offline fallback
+# Simple common vendor mapping, used when the OUI index has no match
 COMMON_VENDORS = {
     "BC:62:0E": "TP-Link",
     "44:F0:22": "Apple",
@@ -22,15 +30,17 @@ COMMON_VENDORS = {
 def get_vendor(mac):
     # Normalize
     mac_clean = mac.upper().replace("-", ":")
-    prefix = mac_clean[:8] # XX:XX:XX
+    
+    # Offline IEEE index (backend/data/oui.bin), binary search + memo
+    vendor = lookup_vendor(mac_clean)
+    if vendor:
+        return vendor
     
     # Check simple list
     for k, v in COMMON_VENDORS.items():
         if mac_clean.startswith(k):
             return v
     
-    # Try online API if available (optional)
-    # Here we stick to offline as requested - returning generic if unknown
     return "Unknown Vendor"
 
 def get_local_ip():
@@ -61,183 +71,458 @@ def get_gateway():
     except:
         return "Unknown"
 
-def ping_host(ip):
-    # Optimized ping for network scanning
-    param = '-n' if platform.system().lower() == 'windows' else '-c'
-    timeout_param = '-w' if platform.system().lower() == 'windows' else '-W'
-    # 200ms timeout for speed, enough for LAN
-    timeout_val = '200' 
+def ping_host(ip, timeout=0.2):
+    # Optimized ping for network scanning; `timeout` in seconds (200ms is enough for a LAN)
+    system = platform.system().lower()
+    param = '-n' if system == 'windows' else '-c'
+    if system == 'windows':
+        timeout_args = ['-w', str(max(1, int(timeout * 1000)))]             # milliseconds
+    elif system == 'darwin':
+        timeout_args = ['-W', str(max(1, int(timeout * 1000)))]             # milliseconds
+    else:
+        timeout_args = ['-W', str(max(1, math.ceil(timeout)))]              # whole seconds (iputils)
     
     # Hide window in Windows
     startupinfo = None
-    if platform.system().lower() == 'windows':
+    if system == 'windows':
         startupinfo = subprocess.STARTUPINFO()
         startupinfo.dwFlags |= subprocess.STARTF_USESHOWWINDOW
     
     try:
-        command = ['ping', param, '1', timeout_param, timeout_val, ip]
-        return subprocess.call(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, startupinfo=startupinfo) == 0
+        command = ['ping', param, '1'] + timeout_args + [ip]
+        # Backstop for pings that ignore their own wait option
+        return subprocess.call(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                               startupinfo=startupinfo, timeout=timeout + 1) == 0
     except:
         return False
 
-def run_network_scan():
+def guess_type(name, vendor):
+    """Helper to determine device type"""
+    n = name.lower()
+    v = vendor.lower()
+    if "phone" in n or "apple" in v or "samsung" in v or "xiaomi" in v: return "phone"
+    if "desktop" in n or "win" in n or "dell" in v or "msi" in v: return "desktop"
+    if "laptop" in n or "macbook" in n: return "laptop"
+    if "tv" in n or "lg" in v: return "iot"
+    if "gateway" in n or "router" in n or "modem" in n: return "router"
+    return "iot" # default fallback
+
+# Addresses probed per incremental scan round
+INCREMENTAL_BUDGET = 256
+
+# How long a scan waits for names of a batch before storing placeholders
+NAME_DEADLINE = 1.5
+
+# Time budget per scan phase (seconds)
+PHASE_BUDGETS = {"sweep": 600, "neighbors": 60}
+
+# A run still going this long after its budgets is treated as hung
+HUNG_GRACE = 60
+
+# Minimum spacing of progress events during the sweep
+PROGRESS_INTERVAL = 0.25
+
+# How often the neighbor table is re-read while the sweep is still running
+NEIGHBOR_POLL_INTERVAL = 0.5
+
+def resolve_targets(targets=None, interfaces=None):
     """
-    1. Determine Subnet
-    2. Ping Sweep (thread pool)
-    3. Read ARP Table
-    4. Save to DB
+    Turn CIDR strings and interface names into a list of IPv4 networks.
+    Defaults to the /24 around get_local_ip() when nothing is given.
     """
-    local_ip = get_local_ip()
-    if local_ip == "127.0.0.1":
-        return []
+    networks = []
+    for t in targets or []:
+        try:
+            networks.append(ipaddress.ip_network(t.strip(), strict=False))
+        except ValueError:
+            print(f"Invalid scan target: {t}")
 
-    subnet_base = ".".join(local_ip.split(".")[:3])
-    
-    # 1. Ping Sweep to populate ARP
-    # Using threads for speed - optimized for stability
-    with concurrent.futures.ThreadPoolExecutor(max_workers=40) as executor:
-        futures = []
-        for i in range(1, 255):
-            futures.append(executor.submit(ping_host, f"{subnet_base}.{i}"))
-        
-        # Wait for completion to ensure ARP table is populated
-        concurrent.futures.wait(futures, timeout=10) 
+    if interfaces:
+        import psutil
+        addrs = psutil.net_if_addrs()
+        for iface in interfaces:
+            for addr in addrs.get(iface, []):
+                if addr.family == socket.AF_INET and addr.netmask:
+                    networks.append(ipaddress.ip_interface(f"{addr.address}/{addr.netmask}").network)
+
+    if not networks and not targets and not interfaces:
+        local_ip = get_local_ip()
+        if local_ip != "127.0.0.1":
+            networks.append(ipaddress.ip_network(f"{local_ip}/24", strict=False))
+
+    # IPv4 only, drop duplicates and ranges already covered by a larger one
+    networks = sorted({n for n in networks if n.version == 4}, key=lambda n: n.prefixlen)
+    result = []
+    for n in networks:
+        if not any(n.subnet_of(r) for r in result):
+            result.append(n)
+    return result
+
+def count_hosts(networks):
+    return sum(n.num_addresses if n.prefixlen >= 31 else n.num_addresses - 2 for n in networks)
 
-    # 2. Read ARP
-    devices = []
+def iter_hosts(networks):
+    """Lazily yield host addresses, round-robin across networks."""
+    iterators = [n.hosts() for n in networks]
+    while iterators:
+        for it in list(iterators):
+            try:
+                yield str(next(it))
+            except StopIteration:
+                iterators.remove(it)
+
+def _in_targets(ip, networks):
     try:
-        # -a displays all interfaces
-        output = subprocess.check_output("arp -a", shell=True).decode('cp850', errors='ignore')
+        addr = ipaddress.ip_address(ip)
+    except ValueError:
+        return False
+    if addr.is_multicast or str(addr) == "255.255.255.255":
+        return False
+    for n in networks:
+        if addr in n:
+            return addr != n.broadcast_address or n.prefixlen >= 31
+    return False
+
+def _fill_name_later(mac, vendor):
+    """Callback for names that resolve after the device was already stored."""
+    def done(future):
+        try:
+            name = future.result()
+        except Exception:
+            return
+        if name:
+            update_device_name(mac, name, guess_type(name, vendor))
+    return done
+
+def _collect_devices(networks, rtts, seen, only=None, deadline=None, stop_event=None):
+    """Classify, store and yield neighbor entries not reported yet."""
+    entries = []
+    for entry in read_neighbors():
+        ip = entry["ip"]
+        mac = entry["mac"]
+        if mac in seen or not _in_targets(ip, networks):
+            continue
+        if only is not None and ip not in only:
+            continue
+        entries.append(entry)
+
+    # Resolve the whole batch concurrently; stragglers are filled in later
+    wait = NAME_DEADLINE
+    if deadline is not None:
+        wait = max(0.0, min(wait, deadline - time.monotonic()))
+    names, pending = resolver.resolve_many([e["ip"] for e in entries], wait)
+
+    batch = []
+    for entry in entries:
+        if stop_event is not None and stop_event.is_set():
+            break
+        if deadline is not None and time.monotonic() >= deadline:
+            break
+        ip = entry["ip"]
+        mac = entry["mac"]
+        seen.add(mac)
+        hostname = names.get(ip) or f"Device-{ip.split('.')[-1]}"
+        
+        vendor = get_vendor(mac)
+        dev_type = guess_type(hostname, vendor)
         
-        # Helper to determine device type
-        def guess_type(name, vendor):
-            n = name.lower()
-            v = vendor.lower()
-            if "phone" in n or "apple" in v or "samsung" in v or "xiaomi" in v: return "phone"
-            if "desktop" in n or "win" in n or "dell" in v or "msi" in v: return "desktop"
-            if "laptop" in n or "macbook" in n: return "laptop"
-            if "tv" in n or "lg" in v: return "iot"
-            if "gateway" in n or "router" in n or "modem" in n: return "router"
-            return "iot" # default fallback
-                    
-        # ... logic continues below as original processing ...
+        device = {
+            "ip": ip,
+            "mac": mac,
+            "name": hostname,
+            "vendor": vendor,
+            "type": dev_type,
+            "status": "online",
+            "os": "Unknown",
+            "rtt": rtts.get(ip)
+        }
+        batch.append(device)
 
-        for line in output.split('\n'):
-            line = line.strip()
-            # Regex for IP and MAC
-            # 192.168.1.1       bc-62-0e-12-35-01     dynamic
-            match = re.search(r'(\d+\.\d+\.\d+\.\d+)\s+([0-9a-fA-F-]+)\s+(\w+)', line)
-            if match:
-                ip, mac, type_ = match.groups()
-                mac = mac.replace("-", ":").upper()
-                
-                # Filter multicast/broadcast/invalid
-                if ip.startswith("224.") or ip == "255.255.255.255":
-                    continue
-                if not (ip.startswith("192.") or ip.startswith("10.") or ip.startswith("172.")):
-                    continue
-                    
-                # Try hostname
-                try:
-                    hostname = socket.gethostbyaddr(ip)[0]
-                except:
-                    hostname = f"Device-{ip.split('.')[-1]}"
-                
-                vendor = get_vendor(mac)
-                dev_type = guess_type(hostname, vendor)
-                
-                device = {
-                    "ip": ip,
-                    "mac": mac,
-                    "name": hostname,
-                    "vendor": vendor,
-                    "type": dev_type,
-                    "status": "online",
-                    "os": "Unknown"
-                }
-                
-                # Save to DB
-                upsert_device(device)
-                
-                # Check Rogue Status
-                check_rogue_status(device)
-                
-                devices.append(device)
-                
+    # Save to DB, one transaction per batch
+    upsert_devices(batch)
+    
+    # Check Rogue Status
+    check_rogue_batch(batch)
+
+    for device in batch:
+        if device["ip"] in pending:
+            pending[device["ip"]].add_done_callback(_fill_name_later(device["mac"], device["vendor"]))
+        yield device
+
+def scan_network(targets=None, interfaces=None, incremental=False, budget=INCREMENTAL_BUDGET,
+                 silent=None, progress=None, stop_event=None, budgets=None, outcome=None,
+                 **sweep_options):
+    """
+    Generator over discovered devices.
+    1. Resolve targets (CIDR ranges / interfaces)
+    2. Ping Sweep (asyncio ICMP), one in-flight budget shared by all ranges.
+       Incremental scans only probe up to `budget` addresses picked by the
+       liveness tracker (unknown, recently changed, stale).
+    3. Read Neighbor Table while replies come in, and once more at the end
+    4. Save to DB and yield each device as it is classified
+    Probed addresses that did not answer are added to `silent` if given.
+    `progress(phase, probed, total)` is called on phase changes and
+    periodically during the sweep.
+
+    Each phase runs within its time budget (PHASE_BUDGETS, overridable via
+    `budgets`) and everything stops once `stop_event` is set. Devices are
+    stored as they are found, so a cut-short scan keeps its partial results.
+    `outcome["status"]` ends up as "complete", "cancelled" or "timeout".
+    """
+    report = progress or (lambda phase, probed, total: None)
+    budgets = dict(PHASE_BUDGETS, **(budgets or {}))
+    outcome = outcome if outcome is not None else {}
+    outcome["status"] = "complete"
+    networks = resolve_targets(targets, interfaces)
+    if not networks:
+        return
+
+    if incremental:
+        hosts = liveness.plan(networks, budget)
+        only = set(hosts)
+        total = len(hosts)
+    else:
+        hosts = iter_hosts(networks)
+        only = None
+        total = count_hosts(networks)
+
+    rtts = {}
+    seen = set()
+    probed = 0
+    last_poll = last_report = time.monotonic()
+    sweep_deadline = last_poll + budgets["sweep"]
+    report("sweep", 0, total)
+    try:
+        for ip, rtt in sweep_hosts(hosts, stop_event=stop_event, deadline=sweep_deadline, **sweep_options):
+            probed += 1
+            liveness.record(ip, rtt is not None)
+            now = time.monotonic()
+            if now - last_report >= PROGRESS_INTERVAL:
+                last_report = now
+                report("sweep", probed, total)
+            if rtt is None:
+                if silent is not None:
+                    silent.add(ip)
+                continue
+            rtts[ip] = rtt
+            if now - last_poll >= NEIGHBOR_POLL_INTERVAL:
+                last_poll = now
+                yield from _collect_devices(networks, rtts, seen, only, sweep_deadline, stop_event)
+
+        if stop_event is not None and stop_event.is_set():
+            outcome["status"] = "cancelled"
+            return
+        if probed < total:
+            outcome["status"] = "timeout"
+
+        # Final read picks up hosts that only answered ARP
+        report("neighbors", probed, total)
+        neighbor_deadline = time.monotonic() + budgets["neighbors"]
+        yield from _collect_devices(networks, rtts, seen, only, neighbor_deadline, stop_event)
+        if stop_event is not None and stop_event.is_set():
+            outcome["status"] = "cancelled"
+        elif time.monotonic() >= neighbor_deadline:
+            outcome["status"] = "timeout"
     except Exception as e:
+        outcome["status"] = "error"
         print(f"Error scanning: {e}")
+
+def run_network_scan(targets=None, interfaces=None, incremental=False, progress=None,
+                     on_device=None, stop_event=None, budgets=None, outcome=None, **sweep_options):
+    """Run a scan to completion and sync online status. Returns device count."""
+    found = {}
+    silent = set() if incremental else None
+    outcome = outcome if outcome is not None else {}
+    for device in scan_network(targets, interfaces, incremental, silent=silent, progress=progress,
+                               stop_event=stop_event, budgets=budgets, outcome=outcome,
+                               **sweep_options):
+        found[device['ip']] = device['mac']
+        if on_device:
+            on_device(device)
+    
+    if incremental:
+        # Only addresses probed in this round can go offline
+        silent.difference_update(found)
+        if silent:
+            mark_offline_ips(list(silent))
+    elif found and outcome.get("status") == "complete":
+        # Sync status: Mark devices not found in this scan as OFFLINE.
+        # Skipped for cut-short sweeps, unprobed hosts are not evidence.
+        update_online_status(list(found.values()))
     
-    # Sync status: Mark devices not found in this scan as OFFLINE
-    if devices:
-        found_macs = [d['mac'] for d in devices]
-        from backend.database import update_online_status
-        update_online_status(found_macs)
+    # Delta against the previous scan for the history
+    try:
+        record_scan()
+    except Exception as e:
+        print(f"History error: {e}")
         
-    return devices
+    return len(found)
 
 def check_rogue_status(device):
-    """
-    Check if device is known using backend.database logic (implied or direct).
-    For now, we do a direct SQLite check here or assume upsert_device handles it?
-    Actually, let's do a direct check to update the 'is_new' flag or alert.
-    But since we don't have the DB connection here comfortably without import, 
-    let's add this logic to database.py or do it here.
-    """
+    check_rogue_batch([device])
+
+def check_rogue_batch(devices):
+    """Record devices in known_devices and alert on the ones never seen before."""
     try:
-        conn = sqlite3.connect("netguardian.db")
-        c = conn.cursor()
-        
-        # Check if exists
-        c.execute("SELECT first_seen FROM known_devices WHERE mac = ?", (device['mac'],))
-        row = c.fetchone()
-        
-        now = datetime.now().isoformat()
-        
-        if row:
-            # Known device, update last seen
-            c.execute("UPDATE known_devices SET last_seen = ? WHERE mac = ?", (now, device['mac']))
-        else:
-            # New Rogue Device!
-            msg = f"ROGUE DEVICE: {device['mac']} ({device['vendor']})"
-            print(f"[!] {msg}")
-            
-            # Inject into GUI stream
-            try:
-                from backend.bettercap_service import bettercap_runner
-                bettercap_runner.add_event("security", msg)
-            except:
-                pass
-                
-            c.execute("INSERT INTO known_devices (mac, first_seen, last_seen, vendor, is_trusted) VALUES (?, ?, ?, ?, 0)",
-                      (device['mac'], now, now, device['vendor']))
-        
-        conn.commit()
-        conn.close()
+        new = record_known_devices(devices)
     except:
-        pass
+        # known_devices is created by the bettercap service
+        return
+    
+    for device in new:
+        # New Rogue Device!
+        msg = f"ROGUE DEVICE: {device['mac']} ({device['vendor']})"
+        print(f"[!] {msg}")
+        
+        # Inject into GUI stream
+        try:
+            from backend.bettercap_service import bettercap_runner
+            bettercap_runner.add_event("security", msg)
+        except:
+            pass
+
+class ScanRun:
+    """One scan execution. Triggers that arrive while it runs join it."""
+    _ids = 0
+
+    def __init__(self, targets, interfaces, incremental, budgets=None):
+        ScanRun._ids += 1
+        self.id = ScanRun._ids
+        self.targets = targets
+        self.interfaces = interfaces
+        self.incremental = incremental
+        self.started = time.time()
+        self.finished = None
+        self.devices = 0
+        self.joined = 0
+        self.error = None
+        self.status = "running"
+        self.budgets = dict(PHASE_BUDGETS, **(budgets or {}))
+        self.cancel_event = threading.Event()
+        self._done = threading.Event()
+
+    @property
+    def done(self):
+        return self._done.is_set()
+
+    @property
+    def duration(self):
+        return ((self.finished or time.time()) - self.started)
+
+    def wait(self, timeout=None):
+        return self._done.wait(timeout)
+
+    def cancel(self):
+        """Ask the run to stop; it releases probes and keeps what it found."""
+        self.cancel_event.set()
+
+    def hung(self):
+        return not self.done and self.duration > sum(self.budgets.values()) + HUNG_GRACE
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "mode": "incremental" if self.incremental else "full",
+            "targets": self.targets,
+            "interfaces": self.interfaces,
+            "started": datetime.fromtimestamp(self.started).isoformat(),
+            "finished": datetime.fromtimestamp(self.finished).isoformat() if self.finished else None,
+            "duration": round(self.duration, 3),
+            "devices": self.devices,
+            "joined": self.joined,
+            "status": self.status,
+            "error": self.error
+        }
 
 class NetworkScanner:
-    def __init__(self):
-        self.scanning = False
-        
-    def start_scan(self):
-        if self.scanning:
-            return
-        self.scanning = True
+    def __init__(self, targets=None, interfaces=None):
+        self.lock = threading.Lock()
+        self.current = None   # running ScanRun
+        self.last_run = None  # last finished ScanRun
+        # Default scan scope, overridable per scan
+        self.targets = targets or []
+        self.interfaces = interfaces or []
+        # Live progress for /api/scan/stream
+        self.events = EventChannel()
+        self.progress = {"phase": "idle", "probed": 0, "total": 0, "devices": 0}
+
+    @property
+    def scanning(self):
+        return self.current is not None
+
+    def ensure_scan(self, targets=None, interfaces=None, incremental=False, budgets=None, **sweep_options):
+        """
+        Single-flight scan trigger. Returns (run, started): a new background
+        run, or the one already in progress if another trigger got there first.
+        """
+        with self.lock:
+            if self.current is not None and self.current.hung():
+                # Its thread is stuck past every deadline; stop waiting for it
+                print(f"Scan {self.current.id} hung, abandoning it")
+                self.current.cancel()
+                self.current.status = "hung"
+                self.last_run = self.current
+                self.current = None
+            if self.current is not None:
+                self.current.joined += 1
+                return self.current, False
+            run = ScanRun(targets or self.targets, interfaces or self.interfaces, incremental, budgets)
+            self.current = run
+        self.progress = {"phase": "starting", "probed": 0, "total": 0, "devices": 0}
         
         # Run in background thread
-        t = threading.Thread(target=self._scan_thread)
+        t = threading.Thread(target=self._scan_thread, args=(run,), kwargs=sweep_options)
         t.daemon = True
         t.start()
+        return run, True
+        
+    def start_scan(self, targets=None, interfaces=None, incremental=False, **sweep_options):
+        """
+        Start a background scan. Full sweeps probe every address in scope;
+        incremental ones probe only what the liveness history marks as due.
+        """
+        return self.ensure_scan(targets, interfaces, incremental, **sweep_options)[0]
+
+    def stop_scan(self):
+        """Cancel the running scan, if any. Returns it."""
+        run = self.current
+        if run is not None:
+            run.cancel()
+        return run
+
+    def _on_progress(self, phase, probed, total):
+        self.progress = dict(self.progress, phase=phase, probed=probed, total=total)
+        self.events.publish("progress", self.progress)
+
+    def _on_device(self, device):
+        self.progress = dict(self.progress, devices=self.progress["devices"] + 1)
+        self.events.publish("device", device)
         
-    def _scan_thread(self):
+    def _scan_thread(self, run, **sweep_options):
         try:
             # First mark all as offline (optional, or rely on update)
             # set_all_offline() 
             # Actually, let's keep them and update status 'online' for found ones
             
-            run_network_scan()
+            outcome = {}
+            run.devices = run_network_scan(run.targets, run.interfaces, run.incremental,
+                                           progress=self._on_progress, on_device=self._on_device,
+                                           stop_event=run.cancel_event, budgets=run.budgets,
+                                           outcome=outcome, **sweep_options)
+            run.status = outcome.get("status", "complete")
+        except Exception as e:
+            run.error = str(e)
+            run.status = "error"
+            print(f"Scan {run.id} failed: {e}")
         finally:
-            self.scanning = False
+            run.finished = time.time()
+            with self.lock:
+                # A hung run may already have been replaced
+                if self.current is run:
+                    self.current = None
+                    self.last_run = run
+            run._done.set()
+            self.progress = dict(self.progress, phase="done", status=run.status)
+            self.events.publish("done", self.progress)
 
 scanner = NetworkScanner()
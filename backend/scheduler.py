@@ -0,0 +1,119 @@
+import os
+import random
+import threading
+import time
+from datetime import datetime
+from backend.scanner import scanner, HUNG_GRACE
+
+# Periodic scans for headless sensors. Configured through the API or env:
+#   NETGUARDIAN_SCAN_INTERVAL  seconds between scans, 0 disables (default)
+#   NETGUARDIAN_SCAN_JITTER    +/- fraction of the interval, default 0.1
+#   NETGUARDIAN_SCAN_MODE      "incremental" (default) or "full"
+#   NETGUARDIAN_FULL_EVERY     every Nth scheduled scan is a full sweep, default 10
+
+
+def _env_float(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+class ScanScheduler:
+    def __init__(self, scanner, interval=0, jitter=0.1, incremental=True, full_every=10):
+        self.scanner = scanner
+        self.interval = interval
+        self.jitter = jitter
+        self.incremental = incremental
+        self.full_every = full_every
+        self.next_run = None
+        self.runs = 0
+        self.thread = None
+        self.wake = threading.Condition()
+        self.stopped = False
+
+    @classmethod
+    def from_env(cls, scanner):
+        return cls(scanner,
+                   interval=_env_float("NETGUARDIAN_SCAN_INTERVAL", 0),
+                   jitter=_env_float("NETGUARDIAN_SCAN_JITTER", 0.1),
+                   incremental=os.environ.get("NETGUARDIAN_SCAN_MODE", "incremental") != "full",
+                   full_every=int(_env_float("NETGUARDIAN_FULL_EVERY", 10)))
+
+    def _delay(self):
+        spread = self.interval * max(0.0, min(self.jitter, 0.5))
+        return self.interval + random.uniform(-spread, spread)
+
+    def configure(self, interval=None, jitter=None, incremental=None, full_every=None):
+        with self.wake:
+            if interval is not None:
+                self.interval = max(0, interval)
+            if jitter is not None:
+                self.jitter = jitter
+            if incremental is not None:
+                self.incremental = incremental
+            if full_every is not None:
+                self.full_every = full_every
+            self.next_run = time.time() + self._delay() if self.interval else None
+            self.wake.notify_all()
+        if self.interval:
+            self.start()
+
+    def start(self):
+        with self.wake:
+            self.stopped = False
+            if self.thread and self.thread.is_alive():
+                return
+            if self.interval and self.next_run is None:
+                self.next_run = time.time() + self._delay()
+            self.thread = threading.Thread(target=self._loop, daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        with self.wake:
+            self.stopped = True
+            self.next_run = None
+            self.wake.notify_all()
+
+    def _loop(self):
+        while True:
+            with self.wake:
+                while not self.stopped and (not self.interval or self.next_run is None
+                                            or time.time() < self.next_run):
+                    timeout = None if not self.next_run else max(0, self.next_run - time.time())
+                    self.wake.wait(timeout)
+                if self.stopped:
+                    return
+                self.runs += 1
+                full = not self.incremental or (self.full_every and (self.runs - 1) % self.full_every == 0)
+
+            # Joins a scan already started from the API instead of overlapping it
+            run, _ = self.scanner.ensure_scan(incremental=not full)
+            if not run.wait(sum(run.budgets.values()) + HUNG_GRACE):
+                # Do not let a stuck scan hold back the schedule
+                run.cancel()
+                run.wait(HUNG_GRACE)
+
+            with self.wake:
+                if self.interval:
+                    self.next_run = time.time() + self._delay()
+
+    def status(self):
+        last = self.scanner.last_run
+        current = self.scanner.current
+        return {
+            "enabled": bool(self.interval) and not self.stopped,
+            "interval": self.interval,
+            "jitter": self.jitter,
+            "mode": "incremental" if self.incremental else "full",
+            "full_every": self.full_every,
+            "scanning": current is not None,
+            "current": current.to_dict() if current else None,
+            "last_run": datetime.fromtimestamp(last.started).isoformat() if last else None,
+            "last_duration": round(last.duration, 3) if last else None,
+            "last_devices": last.devices if last else None,
+            "next_run": datetime.fromtimestamp(self.next_run).isoformat() if self.next_run else None
+        }
+
+
+scheduler = ScanScheduler.from_env(scanner)
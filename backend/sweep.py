@@ -0,0 +1,293 @@
+import asyncio
+import socket
+import struct
+import time
+import queue
+import threading
+import platform
+import concurrent.futures
+
+# ICMP echo over unprivileged datagram sockets (Linux, net.ipv4.ping_group_range).
+# The kernel owns the identifier field (it is rewritten to the socket's local port)
+# and only hands us replies addressed to that socket, so probes are matched on
+# (source ip, sequence).
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+
+DEFAULT_TIMEOUT = 1.0      # seconds to wait for a reply
+DEFAULT_RATE = 2000        # probes per second, 0 = unlimited
+DEFAULT_IN_FLIGHT = 4096   # outstanding probes
+STOP_POLL_INTERVAL = 0.1   # how often a running sweep checks for stop/deadline
+
+
+def _checksum(data):
+    if len(data) % 2:
+        data += b"\x00"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def build_echo_request(seq, payload=b"netguardian"):
+    header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, 0, seq)
+    csum = _checksum(header + payload)
+    return struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, csum, 0, seq) + payload
+
+
+class ICMPSocketBackend:
+    """Probe hosts with one shared non-blocking ICMP datagram socket."""
+
+    name = "icmp"
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+        self.sock.setblocking(False)
+        self.loop = None
+        self.pending = {}  # (ip, seq) -> future
+        self.seq = 0
+
+    @classmethod
+    def available(cls):
+        if platform.system().lower() != "linux":
+            return False
+        try:
+            socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP).close()
+            return True
+        except OSError:
+            return False
+
+    def start(self, loop):
+        self.loop = loop
+        loop.add_reader(self.sock.fileno(), self._on_readable)
+
+    def _on_readable(self):
+        while True:
+            try:
+                data, addr = self.sock.recvfrom(1024)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            if len(data) < 8 or data[0] != ICMP_ECHO_REPLY:
+                continue
+            seq = struct.unpack("!H", data[6:8])[0]
+            fut = self.pending.pop((addr[0], seq), None)
+            if fut and not fut.done():
+                fut.set_result(time.perf_counter())
+
+    def _next_seq(self, ip):
+        # 16 bit sequence space, skip ones still waiting for a reply from ip
+        self.seq = (self.seq + 1) & 0xFFFF
+        while (ip, self.seq) in self.pending:
+            self.seq = (self.seq + 1) & 0xFFFF
+        return self.seq
+
+    async def probe(self, ip, timeout):
+        seq = self._next_seq(ip)
+        fut = self.loop.create_future()
+        self.pending[(ip, seq)] = fut
+        sent = time.perf_counter()
+        try:
+            await self.loop.sock_sendto(self.sock, build_echo_request(seq), (ip, 0))
+            received = await asyncio.wait_for(fut, timeout)
+            return (received - sent) * 1000.0
+        except (asyncio.TimeoutError, OSError):
+            return None
+        finally:
+            self.pending.pop((ip, seq), None)
+
+    def close(self):
+        if self.loop:
+            try:
+                self.loop.remove_reader(self.sock.fileno())
+            except Exception:
+                pass
+        for fut in self.pending.values():
+            if not fut.done():
+                fut.cancel()
+        self.pending.clear()
+        self.sock.close()
+
+
+class SubprocessBackend:
+    """Fallback: one `ping` process per probe, bounded by a thread pool."""
+
+    name = "subprocess"
+
+    def __init__(self, max_workers=40):
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        self.loop = None
+
+    @classmethod
+    def available(cls):
+        return True
+
+    def start(self, loop):
+        self.loop = loop
+
+    async def probe(self, ip, timeout):
+        from backend.scanner import ping_host
+        sent = time.perf_counter()
+        alive = await self.loop.run_in_executor(self.executor, ping_host, ip, timeout)
+        if not alive:
+            return None
+        # Wall time around the process, so this includes fork/exec overhead
+        return (time.perf_counter() - sent) * 1000.0
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+BACKENDS = {
+    "icmp": ICMPSocketBackend,
+    "subprocess": SubprocessBackend,
+}
+
+
+def create_backend(name="auto"):
+    if name == "auto":
+        name = "icmp" if ICMPSocketBackend.available() else "subprocess"
+    return BACKENDS[name]()
+
+
+class ICMPSweeper:
+    """
+    Asyncio ping sweep. Keeps up to `max_in_flight` probes outstanding,
+    paces new probes at `rate` per second and yields (ip, rtt_ms) as soon
+    as each probe finishes. rtt_ms is None for hosts that did not answer.
+    """
+
+    def __init__(self, timeout=DEFAULT_TIMEOUT, rate=DEFAULT_RATE,
+                 max_in_flight=DEFAULT_IN_FLIGHT, retries=0, backend="auto"):
+        self.timeout = timeout
+        self.rate = rate
+        self.max_in_flight = max_in_flight
+        self.retries = retries
+        self.backend = backend  # backend name or a backend instance
+        self.rtts = {}  # ip -> last rtt in ms, alive hosts only
+
+    async def _probe(self, backend, ip):
+        for _ in range(self.retries + 1):
+            rtt = await backend.probe(ip, self.timeout)
+            if rtt is not None:
+                return rtt
+        return None
+
+    async def sweep(self, hosts):
+        loop = asyncio.get_running_loop()
+        backend = self.backend
+        if isinstance(backend, str):
+            backend = create_backend(backend)
+        backend.start(loop)
+
+        results = asyncio.Queue()
+        slots = asyncio.Semaphore(self.max_in_flight)
+        tasks = set()
+        done_marker = object()
+
+        async def run_probe(ip):
+            rtt = None
+            try:
+                rtt = await self._probe(backend, ip)
+            except Exception:
+                pass
+            finally:
+                slots.release()
+                results.put_nowait((ip, rtt))
+
+        async def feed():
+            interval = 1.0 / self.rate if self.rate else 0
+            next_send = loop.time()
+            try:
+                for ip in hosts:
+                    await slots.acquire()
+                    if interval:
+                        delay = next_send - loop.time()
+                        if delay > 0.001:
+                            await asyncio.sleep(delay)
+                        next_send = max(next_send, loop.time()) + interval
+                    t = loop.create_task(run_probe(str(ip)))
+                    tasks.add(t)
+                    t.add_done_callback(tasks.discard)
+                if tasks:
+                    await asyncio.gather(*list(tasks), return_exceptions=True)
+            finally:
+                results.put_nowait(done_marker)
+
+        feeder = loop.create_task(feed())
+        try:
+            while True:
+                item = await results.get()
+                if item is done_marker:
+                    break
+                ip, rtt = item
+                if rtt is not None:
+                    self.rtts[ip] = rtt
+                yield ip, rtt
+        finally:
+            feeder.cancel()
+            for t in list(tasks):
+                t.cancel()
+            await asyncio.gather(feeder, *list(tasks), return_exceptions=True)
+            backend.close()
+
+
+def sweep_hosts(hosts, stop_event=None, deadline=None, **options):
+    """
+    Blocking wrapper around ICMPSweeper for thread based callers.
+    The event loop runs in its own thread so slow consumers never stall
+    in-flight probes; results are handed over through a queue.
+    The sweep is cut short when `stop_event` is set or the monotonic
+    `deadline` passes: outstanding probes are cancelled and the socket
+    (or ping worker pool) is released before the generator finishes.
+    """
+    sweeper = ICMPSweeper(**options)
+    out = queue.Queue()
+    done_marker = object()
+    closed = threading.Event()
+
+    def should_stop():
+        if closed.is_set() or (stop_event is not None and stop_event.is_set()):
+            return True
+        return deadline is not None and time.monotonic() >= deadline
+
+    async def pump():
+        agen = sweeper.sweep(hosts)
+
+        async def consume():
+            async for item in agen:
+                out.put(item)
+
+        task = asyncio.ensure_future(consume())
+        try:
+            while not task.done():
+                if should_stop():
+                    task.cancel()
+                    break
+                await asyncio.wait({task}, timeout=STOP_POLL_INTERVAL)
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        finally:
+            await agen.aclose()
+
+    def runner():
+        try:
+            asyncio.run(pump())
+        except Exception as e:
+            print(f"Sweep error: {e}")
+        finally:
+            out.put(done_marker)
+
+    t = threading.Thread(target=runner, daemon=True)
+    t.start()
+    try:
+        while True:
+            item = out.get()
+            if item is done_marker:
+                break
+            yield item
+    finally:
+        closed.set()
@@ -1,19 +1,90 @@
 import platform
+import re
 import subprocess
 import socket
 import threading
-
-def ping_host(target: str) -> str:
+import time
+
+def iter_command(cmd, stop_event=None, timeout=None, shell=False):
+    """
+    Run a command and yield its output line by line as it is produced
+    (stderr merged). The child is killed when `stop_event` is set, when
+    `timeout` seconds pass, or when the caller stops iterating.
+    """
+    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, shell=shell)
+    done = threading.Event()
+
+    def watchdog():
+        deadline = time.monotonic() + timeout if timeout else None
+        while not done.wait(0.2):
+            if (stop_event is not None and stop_event.is_set()) or \
+                    (deadline is not None and time.monotonic() >= deadline):
+                proc.kill()
+                return
+
+    if stop_event is not None or timeout:
+        threading.Thread(target=watchdog, daemon=True).start()
+    try:
+        for raw in proc.stdout:
+            yield raw.decode('cp850', errors='ignore')
+    finally:
+        done.set()
+        if proc.poll() is None:
+            proc.kill()
+        proc.stdout.close()
+        proc.wait()
+
+def _collect(cmd, on_line=None, stop_event=None, shell=False):
+    """Run cmd via iter_command; feed lines to on_line and return the full output."""
+    lines = []
+    for line in iter_command(cmd, stop_event=stop_event, shell=shell):
+        lines.append(line)
+        if on_line:
+            on_line(line)
+    return "".join(lines)
+
+_RTT = re.compile(r"time\s*([=<])\s*([\d.]+)\s*ms", re.I)
+_SEQ = re.compile(r"icmp_seq=(\d+)")
+_HOP = re.compile(r"^\s*(\d+)\s+(.*)$")
+_HOP_RTT = re.compile(r"(<?[\d.]+)\s*ms")
+_IPV4 = re.compile(r"\b(\d{1,3}(?:\.\d{1,3}){3})\b")
+
+def parse_ping_line(line):
+    """Progress event for one ping output line: a reply with its RTT, or a timeout."""
+    m = _RTT.search(line)
+    if m:
+        seq = _SEQ.search(line)
+        ip = _IPV4.search(line)
+        return {"type": "reply", "seq": int(seq.group(1)) if seq else None,
+                "host": ip.group(1) if ip else None, "rtt_ms": float(m.group(2))}
+    lower = line.lower()
+    if "timed out" in lower or "unreachable" in lower:
+        return {"type": "timeout"}
+    return None
+
+def parse_trace_line(line):
+    """Progress event for one traceroute/tracert hop line: hop number, host and RTTs."""
+    m = _HOP.match(line)
+    if not m:
+        return None
+    rest = m.group(2)
+    ip = _IPV4.search(rest)
+    rtts = [1.0 if r.startswith("<") else float(r) for r in _HOP_RTT.findall(rest)]
+    if not ip and not rtts and "*" not in rest:
+        return None
+    return {"type": "hop", "hop": int(m.group(1)), "host": ip.group(1) if ip else None,
+            "rtt_ms": rtts, "timeout": not rtts}
+
+def ping_host(target: str, on_line=None, stop_event=None) -> str:
     """Run a ping command and return output."""
     param = '-n' if platform.system().lower() == 'windows' else '-c'
     cmd = ['ping', param, '4', target]
     try:
-        output = subprocess.check_output(cmd, stderr=subprocess.STDOUT).decode('cp850', errors='ignore')
-        return output
-    except subprocess.CalledProcessError as e:
-        return e.output.decode('cp850', errors='ignore') if e.output else "Ping failed."
+        return _collect(cmd, on_line, stop_event) or "Ping failed."
+    except OSError:
+        return "Ping failed."
 
-def traceroute_host(target: str) -> str:
+def traceroute_host(target: str, on_line=None, stop_event=None) -> str:
     """Run a traceroute."""
     cmd = ['tracert', '-d', target] if platform.system().lower() == 'windows' else ['traceroute', '-n', target]
     try:
@@ -23,10 +94,9 @@ def traceroute_host(target: str) -> str:
         else:
             cmd.extend(['-m', '10'])
             
-        output = subprocess.check_output(cmd, stderr=subprocess.STDOUT).decode('cp850', errors='ignore')
-        return output
-    except subprocess.CalledProcessError as e:
-        return e.output.decode('cp850', errors='ignore') if e.output else "Trace failed."
+        return _collect(cmd, on_line, stop_event) or "Trace failed."
+    except OSError:
+        return "Trace failed."
 
 def scan_ports(target: str) -> list:
     """Scan top 50 common ports with service/banner detection."""
@@ -96,11 +166,11 @@ def scan_ports(target: str) -> list:
         
     return sorted(open_ports, key=lambda x: x['port'])
 
-def get_ifconfig() -> str:
+def get_ifconfig(on_line=None, stop_event=None) -> str:
     """Get network interface details."""
     cmd = 'ipconfig /all' if platform.system().lower() == 'windows' else 'ifconfig -a'
     try:
-        return subprocess.check_output(cmd, shell=True).decode('cp850', errors='ignore')
+        return _collect(cmd, on_line, stop_event, shell=True)
     except Exception as e:
         return str(e)
 
@@ -224,7 +294,7 @@ def check_vulnerabilities(target: str) -> str:
         return f"Target {target} appears clean. No common high-risk ports found."
     return "VULNERABILITIES DETECTED:\n" + "\n".join(found)
 
-def run_stress_test(target: str) -> str:
+def run_stress_test(target: str, on_line=None, stop_event=None) -> str:
     """Run a latency stress test (Safe DoS simulation)."""
     # Ping with larger packet size (1024 bytes) for 5 seconds
     param = '-n' if platform.system().lower() == 'windows' else '-c'
@@ -235,8 +305,7 @@ def run_stress_test(target: str) -> str:
     
     cmd = ['ping', param, count, '-l' if platform.system().lower()=='windows' else '-s', packet_size, target]
     try:
-        output = subprocess.check_output(cmd, stderr=subprocess.STDOUT).decode('cp850', errors='ignore')
-        return output
+        return _collect(cmd, on_line, stop_event)
     except Exception as e:
         return str(e)
 
@@ -0,0 +1,194 @@
+import argparse
+import asyncio
+import ipaddress
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+# Scanner benchmark against a simulated LAN. The ping, neighbor table and
+# reverse DNS backends are replaced with deterministic in-process stand-ins,
+# so results only depend on the scanner code and the scenario parameters.
+#
+#   python bench_scanner.py                       # /24, /22 and /16
+#   python bench_scanner.py -s 24 -o bench.json   # one scenario, JSON to file
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SCENARIOS = {
+    "24": {"cidr": "10.20.0.0/24", "up": 0.25},
+    "22": {"cidr": "10.20.0.0/22", "up": 0.15},
+    "16": {"cidr": "10.20.0.0/16", "up": 0.03},
+}
+
+
+class SimulatedLAN:
+    """Which hosts exist, how they answer, and what their names look like."""
+
+    def __init__(self, cidr, up_ratio, loss=0.02, latency=(0.5, 5.0), slow_ptr=0.2,
+                 ptr_delay=2.0, seed=1):
+        rng = random.Random(seed)
+        network = ipaddress.ip_network(cidr)
+        self.hosts = {}
+        for addr in network.hosts():
+            if rng.random() < up_ratio:
+                ip = str(addr)
+                mac = "02:" + ":".join(f"{rng.randrange(256):02X}" for _ in range(5))
+                self.hosts[ip] = {
+                    "mac": mac,
+                    "latency": rng.uniform(*latency) / 1000.0,
+                    "slow_ptr": rng.random() < slow_ptr,
+                    "name": f"host-{ip.replace('.', '-')}" if rng.random() < 0.6 else None,
+                }
+        self.loss = loss
+        self.ptr_delay = ptr_delay
+        self.rng = random.Random(seed + 1)
+        self.arp = {}  # ip -> mac, filled as hosts answer
+        self.probes = 0
+
+
+class SimPingBackend:
+    """Stands in for the ICMP socket backend."""
+
+    name = "simulated"
+
+    def __init__(self, lan):
+        self.lan = lan
+
+    def start(self, loop):
+        pass
+
+    async def probe(self, ip, timeout):
+        self.lan.probes += 1
+        host = self.lan.hosts.get(ip)
+        if host is None or self.lan.rng.random() < self.lan.loss:
+            await asyncio.sleep(timeout)
+            return None
+        await asyncio.sleep(host["latency"])
+        # A reply means the kernel resolved the neighbor
+        self.lan.arp[ip] = host["mac"]
+        return host["latency"] * 1000.0
+
+    def close(self):
+        pass
+
+
+class SimNeighborSource:
+    name = "simulated"
+
+    def __init__(self, lan):
+        self.lan = lan
+
+    def available(self):
+        return True
+
+    def read(self):
+        return [{"ip": ip, "mac": mac, "interface": "sim0", "state": "reachable"}
+                for ip, mac in list(self.lan.arp.items())]
+
+
+def sim_ptr(lan):
+    def lookup(ip, timeout):
+        host = lan.hosts.get(ip)
+        if host and host["slow_ptr"]:
+            # Slow PTR servers block the worker until they give up
+            time.sleep(min(lan.ptr_delay, timeout))
+            return None
+        return host["name"] if host else None
+    return lookup
+
+
+def run_scenario(name, params, args):
+    from backend import scanner, neighbors, resolver as resolver_mod
+
+    lan = SimulatedLAN(params["cidr"], params["up"], loss=args.loss,
+                       latency=(args.min_latency, args.max_latency),
+                       slow_ptr=args.slow_ptr, ptr_delay=args.ptr_delay, seed=args.seed)
+    neighbors.NEIGHBOR_SOURCES[:] = [SimNeighborSource(lan)]
+    resolver_mod.resolver = resolver_mod.NameResolver(methods=[sim_ptr(lan)])
+    scanner.resolver = resolver_mod.resolver
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+
+    found = scanner.run_network_scan([params["cidr"]], backend=SimPingBackend(lan),
+                                     rate=args.rate, max_in_flight=args.in_flight,
+                                     timeout=args.timeout)
+
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    peak = None
+    if args.tracemalloc:
+        peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+
+    return {
+        "scenario": f"/{name}",
+        "cidr": params["cidr"],
+        "addresses": scanner.count_hosts([ipaddress.ip_network(params["cidr"])]),
+        "hosts_up": len(lan.hosts),
+        "devices_found": found,
+        "probes": lan.probes,
+        "wall_s": round(wall, 3),
+        "probes_per_s": round(lan.probes / wall, 1) if wall else None,
+        "cpu_s": round(cpu, 3),
+        "peak_mem_mb": round(peak, 2) if peak is not None else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark backend/scanner.py against a simulated LAN.")
+    parser.add_argument("-s", "--scenario", action="append", choices=sorted(SCENARIOS),
+                        help="prefix length to run (repeatable, default: all)")
+    parser.add_argument("-o", "--output", help="write JSON results to this file")
+    parser.add_argument("--loss", type=float, default=0.02, help="probe loss rate")
+    parser.add_argument("--min-latency", type=float, default=0.5, help="ms")
+    parser.add_argument("--max-latency", type=float, default=5.0, help="ms")
+    parser.add_argument("--slow-ptr", type=float, default=0.2, help="share of hosts with slow PTR lookups")
+    parser.add_argument("--ptr-delay", type=float, default=2.0, help="seconds a slow PTR lookup takes")
+    parser.add_argument("--timeout", type=float, default=0.2, help="probe timeout in seconds")
+    parser.add_argument("--rate", type=float, default=0, help="probes per second, 0 = unlimited")
+    parser.add_argument("--in-flight", type=int, default=4096)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-tracemalloc", dest="tracemalloc", action="store_false",
+                        help="skip peak memory tracking (it slows the run down)")
+    args = parser.parse_args()
+
+    # Scans write to the database; point it at a scratch file before any
+    # backend module is imported (database reads NETGUARDIAN_DB at import)
+    os.environ["NETGUARDIAN_DB"] = os.path.join(tempfile.mkdtemp(prefix="netguardian-bench-"), "netguardian.db")
+    sys.path.insert(0, REPO_DIR)
+
+    results = []
+    for name in args.scenario or ["24", "22", "16"]:
+        result = run_scenario(name, SCENARIOS[name], args)
+        print(f"[*] {result['scenario']:>4}: {result['wall_s']:8.3f}s wall  "
+              f"{result['probes_per_s']:>10} probes/s  {result['cpu_s']:7.3f}s cpu  "
+              f"{result['peak_mem_mb']} MB peak  {result['devices_found']}/{result['hosts_up']} found")
+        results.append(result)
+
+    report = {
+        "benchmark": "scanner",
+        "timestamp": datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {k: v for k, v in vars(args).items() if k not in ("output", "scenario")},
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"[+] Results written to {args.output}")
+    else:
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
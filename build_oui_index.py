@@ -0,0 +1,102 @@
+import argparse
+import csv
+import io
+import os
+import random
+import sys
+import time
+
+from backend.oui import write_index, OUIIndex, INDEX_PATH
+
+# IEEE public registries: MA-L (24 bit), MA-M (28 bit), MA-S (36 bit)
+REGISTRIES = {
+    "oui.csv": "https://standards-oui.ieee.org/oui/oui.csv",
+    "mam.csv": "https://standards-oui.ieee.org/oui28/mam.csv",
+    "oui36.csv": "https://standards-oui.ieee.org/oui36/oui36.csv",
+}
+
+
+def parse_registry(text):
+    """Yield (prefix int, bits, organization) from an IEEE registry CSV."""
+    reader = csv.reader(io.StringIO(text))
+    next(reader, None)  # header
+    for row in reader:
+        if len(row) < 3:
+            continue
+        assignment = row[1].strip()
+        org = row[2].strip()
+        if not assignment or not org:
+            continue
+        try:
+            prefix = int(assignment, 16)
+        except ValueError:
+            continue
+        bits = len(assignment) * 4
+        if bits in (24, 28, 36):
+            yield prefix, bits, org
+
+
+def load_sources(paths):
+    texts = []
+    if paths:
+        for p in paths:
+            with open(p, encoding="utf-8", errors="replace") as f:
+                texts.append(f.read())
+        return texts
+
+    import requests
+    for name, url in REGISTRIES.items():
+        print(f"[*] Downloading {url}...")
+        r = requests.get(url, timeout=60, headers={"User-Agent": "netguardian-oui-builder"})
+        r.raise_for_status()
+        texts.append(r.content.decode("utf-8", errors="replace"))
+    return texts
+
+
+def build(paths, output):
+    entries = []
+    for text in load_sources(paths):
+        entries.extend(parse_registry(text))
+    count = write_index(entries, output)
+    print(f"[+] Wrote {count} prefixes to {output} ({os.path.getsize(output) // 1024} KB)")
+
+
+def bench(path, n=200000):
+    index = OUIIndex(path)
+    rng = random.Random(1)
+    macs = [rng.getrandbits(48) for _ in range(n)]
+
+    start = time.perf_counter()
+    for m in macs:
+        index.lookup_int(m)
+    raw = n / (time.perf_counter() - start)
+
+    import backend.oui as oui
+    oui._index = index
+    text = [f"{m:012X}" for m in macs[:1000]] * (n // 1000)
+    start = time.perf_counter()
+    for m in text:
+        oui.lookup_vendor(m)
+    memo = len(text) / (time.perf_counter() - start)
+
+    print(f"[*] {index.size} prefixes")
+    print(f"[*] index lookups:    {raw:,.0f}/s")
+    print(f"[*] memoised lookups: {memo:,.0f}/s (1000 distinct MACs)")
+    index.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the offline OUI vendor index.")
+    parser.add_argument("csv", nargs="*", help="local IEEE registry CSVs (default: download oui/mam/oui36)")
+    parser.add_argument("-o", "--output", default=INDEX_PATH)
+    parser.add_argument("--bench", action="store_true", help="benchmark lookups against the index")
+    args = parser.parse_args()
+
+    try:
+        if not args.bench or not os.path.exists(args.output):
+            build(args.csv, args.output)
+        if args.bench:
+            bench(args.output)
+    except Exception as e:
+        print(f"[-] Failed: {e}")
+        sys.exit(1)
@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# Tests import the backend package from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# backend.database opens its database at import time; keep it away from the real one
+os.environ.setdefault("NETGUARDIAN_DB", os.path.join(tempfile.mkdtemp(prefix="netguardian-test-"), "netguardian.db"))
@@ -0,0 +1,129 @@
+import asyncio
+import json
+import time
+
+import pytest
+
+from backend.admission import AdmissionController, AdmissionMiddleware, TokenBucket, HEAVY_WAIT
+from backend.commands import registry
+
+
+def _admit(controller, method, path, body=None, client="10.0.0.1"):
+    return asyncio.run(controller.admit(client, method, path, body))
+
+
+def test_bucket_empties_and_reports_the_wait():
+    bucket = TokenBucket(rate=1, burst=3)
+    assert [bucket.take() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.take() == pytest.approx(1.0, abs=0.01)
+    bucket.refund()
+    assert bucket.take() == 0.0
+
+
+def test_reserves_shed_heavy_before_normal_before_interactive():
+    # Burst 10: heavy needs 5 tokens left over, normal 2, interactive none
+    controller = AdmissionController(global_rate=5, client_rate=1000)
+    outcomes = []
+    for cls, method, path in [("heavy", "POST", "/api/scan")] * 6 + [("normal", "POST", "/api/honeypot/start")] * 4 \
+            + [("interactive", "GET", "/api/devices")] * 3:
+        got, rejected = _admit(controller, method, path)
+        assert got == cls
+        outcomes.append((cls, rejected[0] if rejected else "ok"))
+        if cls == "heavy" and not rejected:
+            controller.release(cls)
+
+    assert outcomes == [("heavy", "ok")] * 5 + [("heavy", "server busy")] \
+        + [("normal", "ok")] * 3 + [("normal", "server busy")] \
+        + [("interactive", "ok")] * 2 + [("interactive", "server busy")]
+
+
+def test_global_refusal_keeps_the_client_token():
+    controller = AdmissionController(global_rate=1, client_rate=5)
+    controller.global_bucket.tokens = 0
+    assert _admit(controller, "GET", "/api/devices")[1][0] == "server busy"
+    assert controller.clients["10.0.0.1"].tokens == pytest.approx(10, abs=0.01)
+
+
+def test_client_limit_applies_per_address():
+    controller = AdmissionController(global_rate=1000, client_rate=1)
+    assert [_admit(controller, "GET", "/api/devices")[1] for _ in range(2)] == [None, None]
+    assert _admit(controller, "GET", "/api/devices")[1][0] == "client rate limit"
+    assert _admit(controller, "GET", "/api/devices", client="10.0.0.2")[1] is None
+
+
+def test_heavy_queue_rejects_beyond_its_depth():
+    async def scenario():
+        controller = AdmissionController(global_rate=1000, client_rate=1000, heavy_slots=1, heavy_queue=1)
+        first = await controller.admit("a", "POST", "/api/scan")
+        queued = asyncio.create_task(controller.admit("b", "POST", "/api/scan"))
+        await asyncio.sleep(0)
+        third = await controller.admit("c", "POST", "/api/scan")
+        controller.release("heavy")
+        return first, await queued, third, controller
+
+    first, queued, third, controller = asyncio.run(scenario())
+    assert first == ("heavy", None) and queued == ("heavy", None)
+    assert third == ("heavy", ("heavy request queue full", HEAVY_WAIT))
+    assert controller.metrics["heavy"]["rejected_queue"] == 1
+
+
+def test_commands_are_classified_by_their_cost():
+    controller = AdmissionController()
+    classify = lambda body: controller.classify("POST", "/api/execute", body)
+    assert classify({"command": "ports", "args": ["10.0.0.1"]}) == "heavy"
+    assert classify({"command": "generate_payload", "args": ["hello"]}) == "normal"
+    assert classify({"command": "ports", "args": ["10.0.0.1"], "background": True}) == "normal"
+    assert classify({"command": "nope"}) == "normal"
+    assert classify({"command": "ports"}) == "normal"   # missing target, answered at once
+    assert classify(None) == "heavy"                    # body not readable
+
+
+def test_cached_command_is_not_heavy(monkeypatch):
+    monkeypatch.setitem(registry.cache, ("nslookup", "example.com"), (time.monotonic() + 60, {"type": "output"}))
+    controller = AdmissionController()
+    assert controller.classify("POST", "/api/execute", {"command": "nslookup", "args": ["example.com"]}) == "normal"
+    assert controller.classify("POST", "/api/execute", {"command": "nslookup", "args": ["example.org"]}) == "heavy"
+
+
+def _call(middleware, method, path, chunks):
+    """Run one request through the middleware; returns (messages sent, body the app read)."""
+    messages = [{"type": "http.request", "body": c, "more_body": i < len(chunks) - 1} for i, c in enumerate(chunks)]
+    sent, seen = [], []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    async def app(scope, receive, send):
+        while True:
+            message = await receive()
+            seen.append(message.get("body", b""))
+            if not message.get("more_body"):
+                break
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    asyncio.run(AdmissionMiddleware(app, middleware)({"type": "http", "method": method, "path": path,
+                                                      "client": ("10.0.0.1", 5000)}, receive, send))
+    return sent, b"".join(seen)
+
+
+def test_middleware_replays_the_command_body_and_frees_the_slot():
+    controller = AdmissionController()
+    body = json.dumps({"command": "ports", "args": ["10.0.0.1"]}).encode()
+    sent, seen = _call(controller, "POST", "/api/execute", [body[:10], body[10:]])
+
+    assert seen == body
+    assert sent[0]["status"] == 200
+    assert controller.metrics["heavy"]["admitted"] == 1 and controller.heavy.active == 0
+
+
+def test_middleware_answers_429_with_retry_after():
+    controller = AdmissionController(global_rate=1000, client_rate=1000, heavy_slots=1, heavy_queue=0)
+    asyncio.run(controller.heavy.acquire())
+    sent, seen = _call(controller, "POST", "/api/scan", [b""])
+
+    assert sent[0]["status"] == 429 and (b"retry-after", str(int(HEAVY_WAIT)).encode()) in sent[0]["headers"]
+    assert json.loads(sent[1]["body"])["message"] == "Too many requests: heavy request queue full"
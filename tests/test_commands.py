@@ -0,0 +1,56 @@
+import threading
+import time
+
+from backend.commands import Arg, CommandRegistry
+
+
+def test_handler_runs_in_the_calling_thread():
+    registry = CommandRegistry()
+    seen = []
+    registry.register("where", lambda a, hooks: seen.append(threading.current_thread()) or {"type": "output"})
+
+    assert registry.execute("where") == {"type": "output"}
+    assert seen == [threading.current_thread()]
+
+
+def test_timed_out_stream_stops_and_frees_its_slot():
+    registry = CommandRegistry()
+
+    def until_stopped(a, hooks):
+        while not hooks["stop_event"].is_set():
+            time.sleep(0.01)
+        return {"type": "output", "output": "partial"}
+
+    cmd = registry.register("slow", until_stopped, timeout=0.2, max_concurrency=1, streams=True)
+    response = registry.execute("slow")
+
+    assert response["type"] == "error" and "timed out" in response["output"]
+    assert cmd.counters["timeouts"] == 1
+    assert cmd.slots.acquire(blocking=False)
+
+
+def test_identical_requests_share_one_run():
+    registry = CommandRegistry()
+    gate = threading.Event()
+    runs = []
+
+    def lookup(a, hooks):
+        runs.append(a["target"])
+        gate.wait(5)
+        return {"type": "output", "output": a["target"]}
+
+    registry.register("lookup", lookup, args=[Arg("target")], ttl=60)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.execute("lookup", ["example.com"])))
+               for _ in range(5)]
+    for t in threads:
+        t.start()
+    while registry.stats()["inflight"] == 0:
+        time.sleep(0.01)
+    time.sleep(0.05)
+    gate.set()
+    for t in threads:
+        t.join()
+
+    assert runs == ["example.com"]
+    assert results == [{"type": "output", "output": "example.com"}] * 5
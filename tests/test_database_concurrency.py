@@ -0,0 +1,76 @@
+import threading
+
+import pytest
+
+from backend import database, history
+from backend.database import ConnectionManager, _create_tables, upsert_devices, get_all_devices, get_devices_page
+
+WRITERS = 4
+READERS = 6
+BATCHES = 10
+BATCH_SIZE = 25
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    cm = ConnectionManager(str(tmp_path / "hammer.db"))
+    with cm.writer() as conn:
+        _create_tables(conn.cursor())
+    monkeypatch.setattr(database, "db", cm)
+    monkeypatch.setattr(history, "db", cm)
+    history.init_history()
+    yield cm
+    cm.close()
+
+
+def _device(writer, n):
+    mac = f"02:00:00:{writer:02X}:{n // 256:02X}:{n % 256:02X}"
+    return {"mac": mac, "ip": f"10.{writer}.{n // 256}.{n % 256}", "name": f"Device-{n}",
+            "vendor": "Test", "type": "unknown", "status": "online"}
+
+
+def test_writers_and_readers_do_not_lock(manager):
+    errors = []
+    scans = []
+    done = threading.Event()
+
+    def writer(w):
+        try:
+            for b in range(BATCHES):
+                upsert_devices([_device(w, b * BATCH_SIZE + i) for i in range(BATCH_SIZE)])
+                scans.append(history.record_scan())
+        except Exception as e:
+            errors.append(e)
+
+    def reader():
+        try:
+            while not done.is_set():
+                get_all_devices()
+                cursor = None
+                while True:
+                    _, cursor = get_devices_page(cursor, limit=50)
+                    if cursor is None:
+                        break
+        except Exception as e:
+            errors.append(e)
+
+    readers = [threading.Thread(target=reader) for _ in range(READERS)]
+    writers = [threading.Thread(target=writer, args=(w,)) for w in range(WRITERS)]
+    for t in readers + writers:
+        t.start()
+    for t in writers:
+        t.join()
+    done.set()
+    for t in readers:
+        t.join()
+
+    assert not [e for e in errors if "locked" in str(e)]
+    assert not errors
+
+    total = WRITERS * BATCHES * BATCH_SIZE
+    assert len(get_all_devices()) == total
+    assert len(scans) == WRITERS * BATCHES
+    with manager.reader() as conn:
+        assert conn.execute("SELECT COUNT(*) FROM scan_usage").fetchone()[0] == WRITERS * BATCHES
+        # Every device joins the history exactly once
+        assert conn.execute("SELECT COUNT(*) FROM scan_changes WHERE change='joined'").fetchone()[0] == total
@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend import database, history
+from backend.database import ConnectionManager, _create_tables, upsert_devices
+from backend.history import CHECKPOINT_EVERY, record_scan, inventory_at, diff_scans
+
+SCANS = CHECKPOINT_EVERY + 15
+DEVICES = 10
+
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    cm = ConnectionManager(str(tmp_path / "history.db"))
+    with cm.writer() as conn:
+        _create_tables(conn.cursor())
+    monkeypatch.setattr(database, "db", cm)
+    monkeypatch.setattr(history, "db", cm)
+    history.init_history()
+    yield cm
+    cm.close()
+
+
+def _device(k, scan):
+    """Device k at a scan: each is offline one scan in five, device 0 is renamed every 7 scans."""
+    return {"mac": f"02:00:00:CC:00:{k:02X}", "ip": f"10.1.0.{k + 1}",
+            "name": f"host-{k}-{scan // 7}" if k == 0 else f"host-{k}", "vendor": "Test",
+            "type": "unknown", "status": "offline" if (k + scan) % 5 == 0 else "online"}
+
+
+def _state(scan):
+    """Expected online inventory at a scan."""
+    devices = [_device(k, scan) for k in range(DEVICES)]
+    return {d["mac"]: {f: d[f] for f in ("ip", "name", "vendor")} for d in devices if d["status"] == "online"}
+
+
+def _record_all(manager):
+    results = []
+    for scan in range(1, SCANS + 1):
+        upsert_devices([_device(k, scan) for k in range(DEVICES)])
+        results.append(record_scan())
+    # One scan per minute, so each can be addressed by time
+    with manager.writer() as conn:
+        conn.execute("UPDATE scan_usage SET timestamp = datetime('2026-01-01', '+' || id || ' minutes')")
+    return results
+
+
+def _at(scan, seconds=0):
+    return (datetime(2026, 1, 1) + timedelta(minutes=scan, seconds=seconds)).isoformat()
+
+
+def test_record_scan_stores_deltas_and_checkpoints(manager):
+    results = _record_all(manager)
+    assert [r["scan_id"] for r in results] == list(range(1, SCANS + 1))
+    assert [r["scan_id"] for r in results if r["checkpoint"]] == [1, CHECKPOINT_EVERY + 1]
+    assert (results[0]["joined"], results[0]["left"]) == (len(_state(1)), 0)
+    # Scan 2 drops the devices with (k + 2) % 5 == 0 and adds back those of scan 1
+    assert (results[1]["joined"], results[1]["left"]) == (2, 2)
+
+
+def test_inventory_at_replays_across_a_checkpoint(manager):
+    _record_all(manager)
+    assert inventory_at("2025-12-31 23:59:00") is None
+    for scan in (1, 2, CHECKPOINT_EVERY, CHECKPOINT_EVERY + 1, CHECKPOINT_EVERY + 2, SCANS):
+        result = inventory_at(_at(scan))
+        assert result["scan_id"] == scan
+        assert {d.pop("mac"): d for d in result["devices"]} == _state(scan)
+    # Between two scans: the earlier one
+    assert inventory_at(_at(CHECKPOINT_EVERY + 3, seconds=30))["scan_id"] == CHECKPOINT_EVERY + 3
+
+
+def test_diff_scans_across_a_checkpoint(manager):
+    _record_all(manager)
+    low, high = CHECKPOINT_EVERY - 4, CHECKPOINT_EVERY + 9
+    old, new = _state(low), _state(high)
+    diff = diff_scans(high, low)
+
+    assert (diff["from"], diff["to"]) == (low, high)
+    assert [d["mac"] for d in diff["joined"]] == sorted(set(new) - set(old))
+    assert [d["mac"] for d in diff["left"]] == sorted(set(old) - set(new))
+    assert diff["changed"] and diff["changed"] == [{"mac": mac, "before": old[mac], "after": new[mac]}
+                               for mac in sorted(set(old) & set(new)) if old[mac] != new[mac]]
+
+
+@pytest.mark.parametrize("when", [1e20, float("inf"), float("nan"), "yesterday"])
+def test_invalid_times_are_value_errors(manager, when):
+    with pytest.raises(ValueError):
+        inventory_at(when)
@@ -0,0 +1,36 @@
+from backend.database import (upsert_devices, update_online_status, mark_offline_ips, update_device_name,
+                              get_all_devices, get_inventory_version)
+from backend.inventory import inventory
+
+
+def _device(n, name=None):
+    return {"mac": f"02:00:00:AA:00:{n:02X}", "ip": f"10.9.0.{n}", "name": name or f"Device-{n}",
+            "vendor": "Test", "type": "unknown", "status": "online"}
+
+
+def _by_mac(devices):
+    return {d["mac"]: d for d in devices}
+
+
+def test_writes_go_through_to_the_cache():
+    upsert_devices([_device(n) for n in range(1, 11)])
+    inventory.get_devices()
+    refreshes = inventory.stats()["refreshes"]
+
+    upsert_devices([_device(n) for n in range(11, 16)])
+    update_online_status([_device(n)["mac"] for n in range(1, 6)])
+    mark_offline_ips(["10.9.0.1"])
+    update_device_name(_device(2)["mac"], "printer")
+
+    assert _by_mac(inventory.get_devices()) == _by_mac(get_all_devices())
+    assert inventory.get_version() == get_inventory_version()
+    # Served from the written rows, not by re-querying the table
+    assert inventory.stats()["refreshes"] == refreshes
+
+
+def test_placeholder_rescan_keeps_resolved_name_and_type():
+    upsert_devices([dict(_device(40, name="nas.lan"), type="storage")])
+    upsert_devices([_device(40)])
+
+    stored = _by_mac(get_all_devices())[_device(40)["mac"]]
+    assert (stored["name"], stored["type"]) == ("nas.lan", "storage")
@@ -0,0 +1,87 @@
+import threading
+from collections import Counter
+
+import pytest
+
+from backend.events import EventChannel
+from backend.jobs import JobManager
+
+
+@pytest.fixture
+def ends(monkeypatch):
+    """Counts "end" events per channel."""
+    counts = Counter()
+    publish = EventChannel.publish
+
+    def recording(channel, event, data):
+        if event == "end":
+            counts[id(channel)] += 1
+        publish(channel, event, data)
+
+    monkeypatch.setattr(EventChannel, "publish", recording)
+    return counts
+
+
+def test_cancelled_queued_job_never_runs(ends):
+    manager = JobManager(workers=1)
+    gate = threading.Event()
+    ran = []
+    blocker = manager.submit("block", [], lambda job: gate.wait(5))
+    queued = manager.submit("queued", [], lambda job: ran.append(True))
+
+    manager.cancel(queued.id)
+    gate.set()
+    manager.executor.shutdown(wait=True)
+
+    assert blocker.status == "done"
+    assert queued.status == "cancelled"
+    assert not ran
+    assert ends[id(queued.events)] == 1
+
+
+def test_cancel_just_before_start_finishes_once(ends):
+    manager = JobManager(workers=1)
+    gate = threading.Event()
+    manager.submit("block", [], lambda job: gate.wait(5))
+    job = manager.submit("queued", [], lambda job: "result")
+
+    class CancelBeforeStart:
+        # The worker's first lock acquisition lets a cancel() from another thread in
+        fired = False
+
+        def __init__(self, lock):
+            self.lock = lock
+
+        def __enter__(self):
+            if not self.fired and threading.current_thread().name.startswith("job"):
+                self.fired = True
+                canceller = threading.Thread(target=manager.cancel, args=(job.id,))
+                canceller.start()
+                canceller.join(1)
+            return self.lock.__enter__()
+
+        def __exit__(self, *exc):
+            return self.lock.__exit__(*exc)
+
+    job.lock = CancelBeforeStart(job.lock)
+    gate.set()
+    manager.executor.shutdown(wait=True)
+
+    assert job.lock.fired
+    assert job.status == "cancelled"
+    assert ends[id(job.events)] == 1
+
+
+def test_cancel_racing_start_finishes_once(ends):
+    manager = JobManager(workers=4, max_queue=1000)
+    jobs = []
+    for _ in range(200):
+        job = manager.submit("race", [], lambda job: "result")
+        manager.cancel(job.id)
+        jobs.append(job)
+    manager.executor.shutdown(wait=True)
+
+    for job in jobs:
+        # Either finished before the cancel arrived, or cancelled; never both
+        assert job.status in ("done", "cancelled")
+        assert ends[id(job.events)] == 1
@@ -0,0 +1,81 @@
+import os
+
+from backend.neighbors import parse_proc_net_arp, parse_ip_neigh, parse_arp_a, normalize_mac
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def _fixture(name):
+    with open(os.path.join(FIXTURES, name), newline="") as f:
+        return f.read()
+
+
+def _pairs(entries):
+    return [(e["ip"], e["mac"]) for e in entries]
+
+
+def test_proc_net_arp():
+    entries = parse_proc_net_arp(_fixture("proc_net_arp.txt"))
+    assert _pairs(entries) == [
+        ("192.168.1.1", "BC:62:0E:12:35:01"),
+        ("192.168.1.23", "3C:22:FB:9A:10:4E"),
+        ("192.168.1.80", "A4:5E:60:D1:0C:7B"),
+        ("10.8.0.1", "52:54:00:7A:1B:02"),
+    ]
+    assert entries[0]["interface"] == "wlan0"
+    assert entries[2]["state"] == "permanent"
+    assert entries[3]["interface"] == "tun0"
+
+
+def test_proc_net_arp_drops_incomplete():
+    # Flags 0x0 (no ATF_COM) with an all-zero MAC is an unresolved entry
+    assert "192.168.1.57" not in [e["ip"] for e in parse_proc_net_arp(_fixture("proc_net_arp.txt"))]
+
+
+def test_ip_neigh():
+    entries = parse_ip_neigh(_fixture("ip_neigh.txt"))
+    assert _pairs(entries) == [
+        ("192.168.1.1", "BC:62:0E:12:35:01"),
+        ("192.168.1.23", "3C:22:FB:9A:10:4E"),
+        ("192.168.1.80", "A4:5E:60:D1:0C:7B"),
+        ("192.168.1.99", "8C:85:90:11:22:33"),
+    ]
+    assert [e["state"] for e in entries] == ["reachable", "stale", "permanent", "delay"]
+
+
+def test_ip_neigh_drops_failed_incomplete_and_ipv6():
+    ips = [e["ip"] for e in parse_ip_neigh(_fixture("ip_neigh.txt"))]
+    assert "192.168.1.57" not in ips      # FAILED
+    assert "192.168.1.61" not in ips      # INCOMPLETE
+    assert not any(":" in ip for ip in ips)
+
+
+def test_arp_a_windows():
+    entries = parse_arp_a(_fixture("arp_a_windows.txt"))
+    assert _pairs(entries) == [
+        ("192.168.1.1", "BC:62:0E:12:35:01"),
+        ("192.168.1.23", "3C:22:FB:9A:10:4E"),
+        ("172.24.20.5", "00:15:5D:A1:B2:C3"),
+    ]
+    assert [e["interface"] for e in entries] == ["192.168.1.10", "192.168.1.10", "172.24.16.1"]
+    assert entries[0]["state"] == "dynamic"
+
+
+def test_arp_a_windows_drops_broadcast_and_multicast():
+    ips = [e["ip"] for e in parse_arp_a(_fixture("arp_a_windows.txt"))]
+    for ip in ("192.168.1.255", "255.255.255.255", "172.24.31.255", "224.0.0.22", "224.0.0.251", "239.255.255.250"):
+        assert ip not in ips
+
+
+def test_arp_a_macos():
+    entries = parse_arp_a(_fixture("arp_a_macos.txt"))
+    assert _pairs(entries) == [
+        ("192.168.1.1", "BC:62:0E:12:35:01"),
+        ("192.168.1.23", "3C:22:FB:9A:10:4E"),
+    ]
+    assert entries[0]["interface"] == "en0"
+
+
+def test_normalize_mac():
+    assert normalize_mac("bc:62:e:12:35:1") == "BC:62:0E:12:35:01"
+    assert normalize_mac("bc-62-0e-12-35-01") == "BC:62:0E:12:35:01"
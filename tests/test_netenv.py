@@ -0,0 +1,37 @@
+import socket
+import threading
+import time
+
+from backend.netenv import NetworkEnvironment
+
+
+def test_drain_gives_up_under_constant_churn():
+    reader, writer = socket.socketpair()
+    stop = threading.Event()
+
+    def churn():
+        while not stop.is_set():
+            writer.send(b"x")
+            time.sleep(0.01)
+
+    thread = threading.Thread(target=churn, daemon=True)
+    thread.start()
+    try:
+        start = time.monotonic()
+        NetworkEnvironment()._drain(reader, settle=0.1, limit=0.3)
+        assert time.monotonic() - start < 0.5
+    finally:
+        stop.set()
+        thread.join()
+        reader.close()
+        writer.close()
+
+
+def test_drain_returns_once_quiet():
+    reader, writer = socket.socketpair()
+    writer.send(b"burst")
+    start = time.monotonic()
+    NetworkEnvironment()._drain(reader, settle=0.05, limit=5)
+    assert time.monotonic() - start < 1
+    reader.close()
+    writer.close()
@@ -0,0 +1,63 @@
+from backend.netstats import ThroughputSampler, MAX_INTERFACES, EVICT_AFTER, parse_duration
+
+
+def _counters(names, n):
+    # 1000 B/s received, 500 B/s sent, 10/5 packets per second
+    return {name: (1000 * n, 10 * n, 0, 0, 500 * n, 5 * n, 0, 0) for name in names}
+
+
+def test_rates_and_downsampling():
+    sampler = ThroughputSampler()
+    start = 1_700_000_000 - 1_700_000_000 % 3600
+    for n in range(7300):
+        sampler.sample(_counters(["eth0", "lo"], n), now=start + n, mono=n)
+
+    assert sampler.interfaces() == ["eth0"]
+    second = sampler.series["eth0"]["1s"].latest()[1]
+    minute = sampler.series["eth0"]["1m"].latest()[1]
+    hour = sampler.series["eth0"]["1h"].latest()[1]
+    for rates in (second, minute, hour):
+        assert rates[0] == 1000 and rates[1] == 10 and rates[4] == 500 and rates[5] == 5
+    assert sampler.series["eth0"]["1s"].count == 3600
+    assert sampler.series["eth0"]["1h"].count == 2
+
+
+def test_counter_reset_is_not_negative():
+    sampler = ThroughputSampler()
+    sampler.sample({"eth0": (5000, 50, 0, 0, 0, 0, 0, 0)}, now=10, mono=0)
+    sampler.sample({"eth0": (100, 1, 0, 0, 0, 0, 0, 0)}, now=11, mono=1)
+    sampler.sample({"eth0": (200, 2, 0, 0, 0, 0, 0, 0)}, now=12, mono=2)
+    tier = sampler.series["eth0"]["1s"]
+    assert [p[1][0] for p in tier.points(0)] == [0]
+
+
+def test_vanished_interfaces_are_evicted():
+    sampler = ThroughputSampler()
+    churn = [f"veth{i}" for i in range(MAX_INTERFACES)]
+    for n in range(3):
+        sampler.sample(_counters(churn, n), now=n, mono=n)
+    assert len(sampler.interfaces()) == MAX_INTERFACES
+
+    # The veths are gone and the real interface shows up
+    for n in range(3, 3 + EVICT_AFTER - 1):
+        sampler.sample(_counters(["eth0"], n), now=n, mono=n)
+        assert sampler.skipped == {"eth0"}
+    n = 3 + EVICT_AFTER
+    sampler.sample(_counters(["eth0"], n), now=n, mono=n)
+    assert "eth0" in sampler.interfaces()
+    assert sampler.skipped == set()
+    assert len(sampler.interfaces()) == MAX_INTERFACES
+
+
+def test_parse_duration():
+    assert parse_duration("90") == 90
+    assert parse_duration("15m") == 900
+    assert parse_duration("7d") == 7 * 86400
+
+
+def test_totals_come_from_the_last_sample():
+    sampler = ThroughputSampler()
+    assert sampler.totals() == {"bytes_recv": 0, "bytes_sent": 0}
+    sampler.sample(_counters(["eth0", "wlan0", "lo"], 3), now=3, mono=3)
+    # Loopback is not host traffic
+    assert sampler.totals() == {"bytes_recv": 6000, "bytes_sent": 3000}
@@ -0,0 +1,116 @@
+import os
+import time
+
+import pytest
+
+from backend import dnswire
+from backend.database import get_all_devices
+from backend.passive import PassiveDiscoveryService, parse_mdns, parse_ssdp
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def _fixture(name):
+    with open(os.path.join(FIXTURES, name), "rb") as f:
+        return f.read()
+
+
+def test_mdns_response_with_compressed_names():
+    # PTR/SRV/TXT/A answers plus AAAA and NSEC extras, names behind pointers
+    assert parse_mdns(_fixture("mdns_appletv.bin"), "192.168.1.99") == [
+        {"ip": "192.168.1.50", "name": "Apple-TV", "model": "AppleTV6,2", "source": "mdns"}
+    ]
+
+
+def test_mdns_service_only_is_attributed_to_the_sender():
+    assert parse_mdns(_fixture("mdns_printer.bin"), "192.168.1.99") == [
+        {"ip": "192.168.1.99", "name": "Office Printer", "model": "HP LaserJet M404", "source": "mdns"}
+    ]
+
+
+def test_mdns_query_has_no_announcements():
+    assert parse_mdns(_fixture("mdns_query.bin"), "192.168.1.99") == []
+
+
+def test_mdns_truncated_packet():
+    with pytest.raises(dnswire.DNSError):
+        parse_mdns(_fixture("mdns_appletv.bin")[:60], "192.168.1.99")
+
+
+def test_ssdp_notify():
+    [a] = parse_ssdp(_fixture("ssdp_notify.txt"), "192.168.1.2")
+    assert (a["ip"], a["model"], a["alive"]) == ("192.168.1.61", "Roku/9.4.0", True)
+    assert a["usn"] == "uuid:roku:ecp:X00400ABCDEF::upnp:rootdevice"
+
+
+def test_ssdp_byebye():
+    [a] = parse_ssdp(_fixture("ssdp_byebye.txt"), "192.168.1.61")
+    assert (a["ip"], a["model"], a["alive"]) == ("192.168.1.61", None, False)
+
+
+def test_ssdp_search_response_with_hostname_location():
+    # A LOCATION naming a host instead of an address falls back to the sender
+    [a] = parse_ssdp(_fixture("ssdp_search_response.txt"), "192.168.1.1")
+    assert (a["ip"], a["model"]) == ("192.168.1.1", "MiniUPnPd/2.2.1")
+
+
+def test_ssdp_msearch_is_ignored():
+    assert parse_ssdp(_fixture("ssdp_msearch.txt"), "192.168.1.30") == []
+
+
+def _service(neighbors):
+    service = PassiveDiscoveryService()
+    # Known neighbor table, fresh enough not to be re-read from the system
+    service.neighbors = dict(neighbors)
+    service.neighbors_at = time.monotonic()
+    return service
+
+
+def _device(mac):
+    return {d["mac"]: d for d in get_all_devices()}.get(mac)
+
+
+def test_announcements_are_stored():
+    mac = "02:00:00:BB:00:32"
+    service = _service({"192.168.1.50": mac})
+    service.handle_packet("mdns", _fixture("mdns_appletv.bin"), "192.168.1.50")
+    service.handle_packet("mdns", _fixture("mdns_appletv.bin"), "192.168.1.50")
+
+    stored = _device(mac)
+    assert (stored["ip"], stored["name"], stored["model"], stored["status"]) == \
+        ("192.168.1.50", "Apple-TV", "AppleTV6,2", "online")
+    # The repeat inside UPSERT_INTERVAL is not written again
+    assert service.stats["upserts"] == 1
+
+
+def test_ssdp_model_does_not_replace_mdns_model():
+    mac = "02:00:00:BB:00:3D"
+    service = _service({"192.168.1.61": mac})
+    service.handle_packet("mdns", dnswire.build_response([
+        {"name": "Roku.local", "type": dnswire.TYPE_A, "data": "192.168.1.61"},
+        {"name": "Roku._airplay._tcp.local", "type": dnswire.TYPE_SRV, "data": {"port": 7000, "target": "Roku.local"}},
+        {"name": "Roku._airplay._tcp.local", "type": dnswire.TYPE_TXT, "data": ["model=3941X"]},
+    ]), "192.168.1.61")
+    service.handle_packet("ssdp", _fixture("ssdp_notify.txt"), "192.168.1.61")
+    assert _device(mac)["model"] == "3941X"
+
+    service.handle_packet("ssdp", _fixture("ssdp_byebye.txt"), "192.168.1.61")
+    assert _device(mac)["status"] == "offline"
+
+
+def test_unknown_neighbor_waits_in_pending():
+    mac = "02:00:00:BB:00:33"
+    service = _service({})
+    service.handle_packet("mdns", _fixture("mdns_printer.bin"), "192.168.1.51")
+    assert service.stats["pending"] == 1 and _device(mac) is None
+
+    service.neighbors["192.168.1.51"] = mac
+    service._retry_pending()
+    assert service.stats["pending"] == 0
+    assert _device(mac)["name"] == "Office Printer"
+
+
+def test_malformed_packet_counts_an_error():
+    service = _service({})
+    service.handle_packet("mdns", b"\x00\x00\x84\x00\x00\x01", "192.168.1.50")
+    assert service.stats["errors"] == 1 and service.stats["announcements"] == 0